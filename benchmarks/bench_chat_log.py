@@ -0,0 +1,70 @@
+"""
+Compare the old open-append-close chat log with the buffered JSONL logger.
+
+Write throughput is measured for --records log calls. Tail latency is measured on a log grown
+to --size-mb (1 GB by default): the old viewer read the whole file to show its last 3000
+characters, the new one seeks from the end. Needs free disk space of about --size-mb.
+
+    python -m benchmarks.bench_chat_log [--records 20000] [--size-mb 1024]
+"""
+import os
+import time
+import argparse
+import tempfile
+from core.chat_logger import ChatLogger, read_tail
+
+TEXT = "Sure! Here is a short and friendly answer about that topic for you, with a few more words. " * 2
+
+def old_log(path, records):
+    for i in range(records):
+        with open(path, "a", encoding="utf-8") as logf:
+            logf.write(f"[12:{i % 60:02d}] ASSISTANT: {TEXT}\n")
+
+def new_log(log_dir, records):
+    logger = ChatLogger(log_dir, max_bytes=1 << 40, rotate_seconds=0)
+    for i in range(records):
+        logger.log("assistant", TEXT, model="llama3.2:1b", character="Lumin", latency=1.25)
+    call_seconds = time.perf_counter()
+    logger.close()
+    return logger, call_seconds
+
+def grow(path, size):
+    line = ('{"ts": "2026-01-01T12:00:00", "role": "assistant", "text": "%s", "model": "llama3.2:1b"}\n' % TEXT).encode()
+    block = line * max(1, (8 * 1024 * 1024) // len(line))
+    with open(path, "ab") as f:
+        while f.tell() < size:
+            f.write(block)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--size-mb", type=int, default=1024)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        old_path = os.path.join(tmp, "chat.log")
+        start = time.perf_counter()
+        old_log(old_path, args.records)
+        old_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        logger, calls_done = new_log(tmp, args.records)
+        new_seconds = time.perf_counter() - start
+        print(f"{'writer':<28}{'records/s':>12}{'caller time (ms)':>18}")
+        print(f"{'open/append/close per line':<28}{args.records / old_seconds:>12.0f}{old_seconds * 1000:>18.0f}")
+        print(f"{'buffered JSONL writer':<28}{args.records / new_seconds:>12.0f}{(calls_done - start) * 1000:>18.0f}")
+
+        grow(logger.log_file, args.size_mb * 1024 * 1024)
+        size = os.path.getsize(logger.log_file)
+        start = time.perf_counter()
+        with open(logger.log_file, "r", encoding="utf-8") as f:
+            full_tail = f.read()[-3000:]
+        read_all = time.perf_counter() - start
+        start = time.perf_counter()
+        tail = read_tail(logger.log_file, 3000)
+        seek_tail = time.perf_counter() - start
+        print(f"\ntail of a {size / 1024 ** 3:.2f} GB log (3000 chars)")
+        print(f"{'read whole file':<28}{read_all * 1000:>12.1f} ms")
+        print(f"{'seek from end':<28}{seek_tail * 1000:>12.3f} ms  ({len(tail)} lines, same end: {full_tail.endswith(tail[-1] + chr(10))})")
+
+if __name__ == "__main__":
+    main()
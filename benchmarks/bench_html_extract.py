@@ -0,0 +1,65 @@
+"""
+Compare full-document BeautifulSoup extraction with the streaming extractors.
+
+Each fixture page is fed in 16 KB chunks, as requests' iter_content would deliver it, and
+the wall time and peak Python memory (tracemalloc) of producing 3000 characters are reported.
+Relevance is the share of the returned characters that belong to the page's main text.
+
+    python -m benchmarks.bench_html_extract [--repeat 5]
+"""
+import time
+import argparse
+import tracemalloc
+from benchmarks.html_fixtures import all_fixtures
+from core.html_extract import extract_text_from_chunks, CHUNK_SIZE
+
+MAX_CHARS = 3000
+
+def soup_extract(data):
+    """The previous fetch_url_content path: download everything, parse everything"""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(data, 'html.parser')
+    for tag in soup(["script", "style"]):
+        tag.decompose()
+    text = soup.get_text(separator='\n', strip=True)
+    return text[:MAX_CHARS]
+
+def _chunks(data):
+    return (data[i:i + CHUNK_SIZE] for i in range(0, len(data), CHUNK_SIZE))
+
+def streaming_extract(data):
+    return extract_text_from_chunks(_chunks(data), MAX_CHARS + 1, "text/html; charset=utf-8")[:MAX_CHARS]
+
+def article_extract(data):
+    return extract_text_from_chunks(_chunks(data), MAX_CHARS + 1, "text/html; charset=utf-8", mode="article")[:MAX_CHARS]
+
+def relevance(text, main_text):
+    lines = text.splitlines()
+    relevant = sum(len(line) for line in lines if line and line in main_text)
+    return relevant / max(1, sum(len(line) for line in lines))
+
+def measure(func, data, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(data)
+    seconds = (time.perf_counter() - start) / repeat
+    tracemalloc.start()
+    text = func(data)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak, text
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    print(f"{'page':<16}{'size':>9}  {'extractor':<11}{'time (ms)':>11}{'peak mem (MB)':>15}{'chars':>8}{'relevance':>11}")
+    for name, html, main_text in all_fixtures():
+        data = html.encode("utf-8")
+        for label, func in (("soup", soup_extract), ("streaming", streaming_extract), ("article", article_extract)):
+            seconds, peak, text = measure(func, data, args.repeat)
+            print(f"{name:<16}{len(data) / 1024:>7.0f}KB  {label:<11}{seconds * 1000:>11.1f}"
+                  f"{peak / 1024 / 1024:>15.1f}{len(text):>8}{relevance(text, main_text):>10.0%}")
+
+if __name__ == "__main__":
+    main()
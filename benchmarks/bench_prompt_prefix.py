@@ -0,0 +1,44 @@
+"""
+Compare prompt-eval cost of the "Classic" and "Stable prefix" prompt layouts.
+
+Replays a conversation against a local Ollama stub that simulates the server-side KV cache and
+sums the prompt_eval_count / prompt_eval_duration that Ollama reports for every turn.
+
+    python -m benchmarks.bench_prompt_prefix [--turns 40]
+"""
+import argparse
+import ollama
+from benchmarks.ollama_stub import OllamaStub
+from core.context_builder import ContextBuilder
+from core.prompt_manager import build_turn_messages, PROMPT_LAYOUTS
+
+CHARACTER_PROMPT = open("characters/Lumin.txt", encoding="utf-8").read().strip()
+
+def run_layout(client, layout, turns):
+    builder = ContextBuilder(token_budget=3000)
+    history, eval_tokens, eval_ns = [], 0, 0
+    for turn in range(turns):
+        history.append({'role': 'user', 'content': f"Message {turn}: tell me something about topic {turn % 5}, please."})
+        context = build_turn_messages(
+            builder, history, CHARACTER_PROMPT, layout=layout,
+            memory_text=f"\nLong-term memory (facts learned from user):\nUser likes topic {turn % 5}",
+            datetime_text=f"Current date and time: 2026-01-01 10:{turn % 60:02d}.")
+        response = client.chat(model="llama3.2:1b", messages=context.messages, keep_alive="30m")
+        eval_tokens += response.prompt_eval_count
+        eval_ns += response.prompt_eval_duration
+        history.append({'role': 'assistant', 'content': response.message.content})
+    return eval_tokens, eval_ns
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=40)
+    args = parser.parse_args()
+    with OllamaStub(reply="Sure! Here is a short and friendly answer about that topic for you.") as stub:
+        print(f"{'layout':<15}{'prompt tokens':>15}{'prompt eval (s)':>18}{'per turn (ms)':>16}")
+        for layout in reversed(PROMPT_LAYOUTS):
+            stub.cached_prompts.clear()
+            tokens, ns = run_layout(ollama.Client(host=stub.url), layout, args.turns)
+            print(f"{layout:<15}{tokens:>15}{ns / 1e9:>18.2f}{ns / 1e6 / args.turns:>16.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Query latency of the chat search index with a large number of messages.
+
+Generates --messages synthetic chat messages across several characters and a year of dates
+through the same ingestion path as the chat logger, then times word, phrase, prefix and
+filtered queries against the SQLite FTS5 index.
+
+    python -m benchmarks.bench_search [--messages 1000000]
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+from datetime import datetime, timedelta
+from core.search_index import SearchIndex, parse_date
+
+CHARACTERS = ["Lumin", "Nova", "Sage", "Echo"]
+WORDS = ("weather garden python recipe travel music piano coffee mountain river project deadline "
+         "birthday movie novel chess running yoga budget laptop keyboard server database kitten "
+         "sunset ocean library museum concert bicycle camera painting dinner breakfast").split()
+FILLER = "the a to and of it is that you for on with this I we can what about".split()
+
+def messages(count, seed=1):
+    rng = random.Random(seed)
+    start = datetime(2026, 1, 1)
+    for i in range(count):
+        words = [rng.choice(WORDS if rng.random() < 0.3 else FILLER) for _ in range(rng.randint(6, 30))]
+        if i % 5000 == 0:
+            words[:3] = ["remember", "the", "blue"]
+        yield {'ts': (start + timedelta(seconds=i * 31_536_000 // count)).isoformat(timespec='seconds'),
+               'role': "user" if i % 2 == 0 else "assistant", 'character': CHARACTERS[i % len(CHARACTERS)],
+               'text': " ".join(words)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        index = SearchIndex(os.path.join(tmp, "search.sqlite3"))
+        start = time.perf_counter()
+        batch = []
+        for record in messages(args.messages):
+            batch.append(record)
+            if len(batch) == 1000:  # The chat logger hands over batches of up to 1000 records
+                index.add_log_records(batch)
+                batch = []
+        index.add_log_records(batch)
+        seconds = time.perf_counter() - start
+        print(f"indexed {index.count()} messages in {seconds:.1f}s ({index.count() / seconds:.0f}/s), "
+              f"{os.path.getsize(index.path) / 1024 ** 2:.0f} MB\n")
+        queries = [
+            ("word", "piano", {}),
+            ("two words", "coffee mountain", {}),
+            ("phrase", '"remember the blue"', {}),
+            ("prefix", "keyb*", {}),
+            ("character filter", "chess", {"character": "Sage"}),
+            ("date filter", "river", {"since": parse_date("2026-03-01"), "until": parse_date("2026-03-31", end=True)}),
+            ("all filters", '"remember the blue"', {"character": "Lumin", "since": parse_date("2026-06-01")}),
+        ]
+        print(f"{'query':<18}{'results':>9}{'median (ms)':>14}")
+        for name, query, filters in queries:
+            timings = []
+            for _ in range(args.repeat):
+                begin = time.perf_counter()
+                results = index.search(query, limit=50, **filters)
+                timings.append((time.perf_counter() - begin) * 1000)
+            print(f"{name:<18}{len(results):>9}{sorted(timings)[len(timings) // 2]:>14.2f}")
+
+if __name__ == "__main__":
+    main()
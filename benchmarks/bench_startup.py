@@ -0,0 +1,56 @@
+"""
+Measure app startup: time to first window paint and time to interactive (model list discovered).
+
+Model discovery talks to a local Ollama stub with an artificial delay, so the benchmark shows
+that a slow or hanging Ollama no longer delays the first paint. Needs a display (or Xvfb).
+
+    python -m benchmarks.bench_startup [--discovery-delay 2.0] [--runs 3]
+"""
+import argparse
+import subprocess
+import sys
+import time
+
+def measure_once(discovery_delay):
+    start = time.perf_counter()
+    from benchmarks.ollama_stub import OllamaStub
+    with OllamaStub(latency=discovery_delay) as stub:
+        from core.ollama_client import get_ollama_service
+        get_ollama_service().configure(host=stub.url)
+        from gui.app import ChatApp
+        imported = time.perf_counter()
+        app = ChatApp()
+        app.proactive_enabled.set(False)
+        painted = None
+        while not app.models_discovered.is_set():
+            app.update()
+            if painted is None and app.winfo_ismapped():
+                painted = time.perf_counter()
+            time.sleep(0.001)
+        interactive = time.perf_counter()
+        app.destroy()
+    return imported - start, (painted or interactive) - start, interactive - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--discovery-delay", type=float, default=2.0, help="seconds the stub waits before answering /api/tags")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--single", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.single:
+        print(",".join(f"{value:.4f}" for value in measure_once(args.discovery_delay)))
+        return
+    print(f"{'run':<5}{'imports (s)':>13}{'first paint (s)':>17}{'interactive (s)':>17}")
+    for run in range(args.runs):
+        # Fresh interpreter per run so import costs are measured cold
+        result = subprocess.run([sys.executable, "-m", "benchmarks.bench_startup", "--single",
+                                 "--discovery-delay", str(args.discovery_delay)], capture_output=True, text=True)
+        lines = [line for line in result.stdout.splitlines() if line.count(",") == 2]
+        if result.returncode != 0 or not lines:
+            print(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "startup failed")
+            return
+        imports, paint, interactive = (float(v) for v in lines[-1].split(","))
+        print(f"{run + 1:<5}{imports:>13.3f}{paint:>17.3f}{interactive:>17.3f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Insert and scroll cost of the chat transcript for a 10k-message history.
+
+"plain" inserts every message into a CTkTextbox (the previous import behaviour); "windowed"
+uses TranscriptView, which renders the newest messages in after() chunks and loads older pages
+on scroll-up. Needs a display (or Xvfb).
+
+    python -m benchmarks.bench_transcript [--messages 10000]
+"""
+import time
+import argparse
+import customtkinter as ctk
+from gui.components.transcript_view import TranscriptView
+
+def make_history(count):
+    history = []
+    for i in range(count):
+        role = "user" if i % 2 == 0 else "assistant"
+        history.append({'role': role, 'content': f"Message {i}: " + "some words of a chat reply " * (3 + i % 7)})
+    return history
+
+def row(msg):
+    return f"[Imported] {msg['role']}: {msg['content']}\n", f"{msg['role']}_tag"
+
+def settle(root):
+    root.update_idletasks()
+    root.update()
+
+def bench_plain(root, history):
+    box = ctk.CTkTextbox(root, wrap="word", state="disabled")
+    box.pack(fill="both", expand=True)
+    settle(root)
+    start = time.perf_counter()
+    box.configure(state="normal")
+    for msg in history:
+        box.insert("end", *row(msg))
+    box.configure(state="disabled")
+    box.see("end")
+    settle(root)
+    load = time.perf_counter() - start
+    start = time.perf_counter()
+    box.configure(state="normal")
+    box.insert("end", "[now] You: one more message\n", "user_tag")
+    box.configure(state="disabled")
+    box.see("end")
+    settle(root)
+    append = time.perf_counter() - start
+    start = time.perf_counter()
+    for fraction in (0.75, 0.5, 0.25, 0.0):
+        box.yview_moveto(fraction)
+        settle(root)
+    scroll = (time.perf_counter() - start) / 4
+    box.destroy()
+    return load, load, append, scroll
+
+def bench_windowed(root, history):
+    view = TranscriptView(root)
+    view.pack(fill="both", expand=True)
+    settle(root)
+    start = time.perf_counter()
+    view.set_history(history, row)
+    settle(root)
+    first_paint = time.perf_counter() - start
+    while view.import_job is not None:
+        settle(root)
+    load = time.perf_counter() - start
+    start = time.perf_counter()
+    view.append("[now] You: one more message\n", "user_tag")
+    settle(root)
+    append = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(4):
+        view._load_older()
+        settle(root)
+    scroll = (time.perf_counter() - start) / 4
+    view.destroy()
+    return first_paint, load, append, scroll
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=10000)
+    args = parser.parse_args()
+    history = make_history(args.messages)
+    root = ctk.CTk()
+    root.geometry("900x700")
+    print(f"{'view':<10}{'first paint (ms)':>18}{'full load (ms)':>16}{'append (ms)':>13}{'scroll step (ms)':>18}")
+    for name, func in (("plain", bench_plain), ("windowed", bench_windowed)):
+        first_paint, load, append, scroll = func(root, history)
+        print(f"{name:<10}{first_paint * 1000:>18.1f}{load * 1000:>16.1f}{append * 1000:>13.1f}{scroll * 1000:>18.1f}")
+    root.destroy()
+
+if __name__ == "__main__":
+    main()
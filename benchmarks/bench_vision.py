@@ -0,0 +1,78 @@
+"""
+Compare sending the original photo on every turn with the vision preprocessing pipeline.
+
+A synthetic 12 MP JPEG is attached to the first message of a short conversation. "original"
+sends the untouched file with every request, as the old path did; "prepared" downsizes it
+once (cached by content hash) and sends it only on the turn it was attached. Request payload
+size and end-to-end request latency against the local Ollama stub are reported. Needs Pillow.
+
+    python -m benchmarks.bench_vision [--turns 5] [--model llava:7b]
+"""
+import os
+import json
+import time
+import base64
+import argparse
+import tempfile
+import ollama
+from benchmarks.ollama_stub import OllamaStub
+from core.vision_manager import VisionManager, pil_available
+
+def make_photo(path, size=(4000, 3000)):
+    """Noisy gradient image that compresses about as badly as a phone photo"""
+    from PIL import Image
+    gradient = Image.linear_gradient("L").resize(size)
+    noise = Image.effect_noise(size, 40)
+    Image.merge("RGB", (gradient, noise, gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT))).save(path, "JPEG", quality=92)
+
+def payload_bytes(messages):
+    """Size of the JSON body the ollama client posts (images are base64 encoded)"""
+    encoded = []
+    for message in messages:
+        message = dict(message)
+        if message.get('images'):
+            message['images'] = [base64.b64encode(open(p, 'rb').read()).decode() for p in message['images']]
+        encoded.append(message)
+    return len(json.dumps({"model": "m", "messages": encoded}))
+
+def run(client, model, turns, photo, vision):
+    history, sizes, seconds = [], [], []
+    for turn in range(turns):
+        message = {'role': 'user', 'content': f"Question {turn} about the picture."}
+        if turn == 0:
+            message['image'] = photo
+        history.append(message)
+        start = time.perf_counter()
+        if vision is None:
+            messages = [{'role': m['role'], 'content': m['content'], **({'images': [photo]} if 'image' in m else {})}
+                        for m in history]
+        else:
+            messages = vision.messages_for_turn(history, model)
+        client.chat(model=model, messages=messages)
+        seconds.append(time.perf_counter() - start)
+        sizes.append(payload_bytes(messages))
+        history.append({'role': 'assistant', 'content': "It shows a gradient."})
+    return sizes, seconds
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--model", default="llava:7b")
+    args = parser.parse_args()
+    if not pil_available():
+        raise SystemExit("Pillow is required for this benchmark")
+    with tempfile.TemporaryDirectory() as tmp, OllamaStub(models=[args.model]) as stub:
+        photo = os.path.join(tmp, "photo.jpg")
+        make_photo(photo)
+        print(f"original file: {os.path.getsize(photo) / 1e6:.2f} MB")
+        client = ollama.Client(host=stub.url)
+        print(f"{'pipeline':<22}{'first turn (KB)':>16}{'later turns (KB)':>18}{'total (KB)':>12}{'first (ms)':>12}{'later avg (ms)':>16}")
+        vision = VisionManager(cache_dir=os.path.join(tmp, "cache"))
+        for name, manager in (("original every turn", None), ("prepared (cold cache)", vision), ("prepared (warm cache)", vision)):
+            sizes, seconds = run(client, args.model, args.turns, photo, manager)
+            later = seconds[1:] or [0.0]
+            print(f"{name:<22}{sizes[0] / 1024:>16.0f}{sum(sizes[1:]) / max(1, len(sizes) - 1) / 1024:>18.1f}"
+                  f"{sum(sizes) / 1024:>12.0f}{seconds[0] * 1000:>12.0f}{sum(later) / len(later) * 1000:>16.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Deterministic HTML fixture pages for the extraction benchmarks.
+
+Every fixture is (name, html, main_text): main_text is the article body a good extractor
+should return, which lets benchmarks score relevance as well as speed.
+"""
+import random
+
+WORDS = ("model context memory token stream window prompt server cache latency answer "
+         "question history summary vector search thread queue budget network page").split()
+
+def _sentence(rng, n=14):
+    words = [rng.choice(WORDS) for _ in range(n)]
+    return " ".join(words).capitalize() + "."
+
+def _paragraphs(rng, count, sentences=5):
+    return [" ".join(_sentence(rng) for _ in range(sentences)) for _ in range(count)]
+
+def _nav(rng, links=40):
+    items = "".join(f'<li><a href="/section/{i}">Section {rng.choice(WORDS)} {i}</a></li>' for i in range(links))
+    return f"<nav><ul>{items}</ul></nav>"
+
+def _footer(rng):
+    links = " | ".join(f'<a href="/legal/{i}">{rng.choice(WORDS).title()} policy</a>' for i in range(25))
+    return f"<footer><p>{links}</p><p>Copyright 2026 Example Media. All rights reserved.</p></footer>"
+
+def _sidebar(rng):
+    related = "".join(f'<li><a href="/post/{i}">{_sentence(rng, 6)}</a></li>' for i in range(15))
+    return f'<aside class="sidebar"><h3>Related posts</h3><ul>{related}</ul></aside>'
+
+def _cookie_banner():
+    return ("<div id='cookie-consent'><p>We use cookies and similar technologies to improve your experience, "
+            "personalise content and ads, and analyse our traffic. By clicking accept you agree to this.</p>"
+            "<button>Accept all</button><button>Manage settings</button></div>")
+
+def _comments(rng, count=10):
+    items = "".join(f"<div class='comment'><b>user{i}</b><p>{_sentence(rng, 10)}</p></div>" for i in range(count))
+    return f"<section class='comments'><h3>Comments</h3>{items}</section>"
+
+def article_page(seed=1, paragraphs=12):
+    rng = random.Random(seed)
+    body = _paragraphs(rng, paragraphs)
+    article = "".join(f"<p>{p}</p>" for p in body)
+    html = (f"<!doctype html><html><head><meta charset='utf-8'><title>Article {seed}</title>"
+            f"<style>{'.c{color:red} ' * 200}</style></head><body>{_cookie_banner()}"
+            f"<header><div class='logo'>Example Media</div>{_nav(rng)}</header>"
+            f"<div class='wrap'>{_sidebar(rng)}<article><h1>Article {seed}</h1>{article}</article>"
+            f"{_comments(rng)}</div><script>{'var x = 1; ' * 500}</script>{_footer(rng)}</body></html>")
+    return f"article_{seed}", html, "\n".join(body)
+
+def script_heavy_page(seed=2, script_mb=1, paragraphs=8):
+    """A single-page-app style document: a large inline state script before the readable text"""
+    rng = random.Random(seed)
+    body = _paragraphs(rng, paragraphs)
+    chunk = "window.__STATE__.push({id: 1, payload: 'abcdefghijklmnopqrstuvwxyz0123456789'});\n"
+    script = chunk * (script_mb * 1024 * 1024 // len(chunk))
+    html = (f"<!doctype html><html><head><title>App {seed}</title><script>{script}</script></head><body>"
+            f"{_cookie_banner()}{_nav(rng)}<main><h1>App page</h1>{''.join(f'<p>{p}</p>' for p in body)}</main>"
+            f"{_footer(rng)}</body></html>")
+    return f"script_heavy_{seed}", html, "\n".join(body)
+
+def long_page(seed=3, paragraphs=3000):
+    """A very long document (forum thread, docs dump) of which only the start is needed"""
+    rng = random.Random(seed)
+    body = _paragraphs(rng, paragraphs, sentences=3)
+    html = (f"<html><head><title>Thread {seed}</title></head><body>{_nav(rng)}"
+            f"<div id='content'>{''.join(f'<div class=post><p>{p}</p></div>' for p in body)}</div>"
+            f"{_footer(rng)}</body></html>")
+    return f"long_{seed}", html, "\n".join(body)
+
+def all_fixtures():
+    return [article_page(1), article_page(4, paragraphs=30), script_heavy_page(), long_page()]
@@ -0,0 +1,117 @@
+# ollama_stub.py
+# Minimal local stand-in for the Ollama HTTP API used by the benchmarks. It simulates the
+# server-side prompt KV cache: only the part of a prompt that differs from the previous
+# request to the same model is "evaluated" and reported in prompt_eval_count/duration.
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHARS_PER_TOKEN = 4
+PROMPT_EVAL_NS_PER_TOKEN = 2_000_000  # 2 ms per prompt token, a small CPU model
+EVAL_NS_PER_TOKEN = 40_000_000
+LOAD_NS = 1_500_000_000
+
+class OllamaStub:
+    def __init__(self, models=("llama3.2:1b",), reply="Hello from the stub.", latency=0.0):
+        self.models = list(models)
+        self.reply = reply
+        self.latency = latency  # Real seconds to sleep per request
+        self.cached_prompts = {}  # model -> last prompt text (the simulated KV cache)
+        self.loaded = set()
+        self.requests = []
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, payload, status=200):
+                body = (payload if isinstance(payload, bytes) else json.dumps(payload).encode())
+                self.send_response(status)
+                self.send_header("Content-Type", "application/x-ndjson" if isinstance(payload, bytes) else "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    self._send(stub.tags())
+                else:
+                    self._send({"error": "not found"}, 404)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                with stub.lock:
+                    stub.requests.append((self.path, request))
+                if stub.latency:
+                    time.sleep(stub.latency)
+                if self.path == "/api/chat":
+                    self._send(stub.chat(request))
+                elif self.path == "/api/generate":
+                    self._send(stub.generate(request))
+                else:
+                    self._send({"error": "not found"}, 404)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def tags(self):
+        return {"models": [{"name": m, "model": m, "size": 1_300_000_000, "digest": f"sha256:{i:064x}",
+                            "modified_at": "2026-01-01T00:00:00Z", "details": {"family": "llama"}}
+                           for i, m in enumerate(self.models)]}
+
+    def _evaluate(self, model, prompt):
+        with self.lock:
+            load_ns = 0 if model in self.loaded else LOAD_NS
+            self.loaded.add(model)
+            previous = self.cached_prompts.get(model, "")
+            common = 0
+            for a, b in zip(previous, prompt):
+                if a != b:
+                    break
+                common += 1
+            self.cached_prompts[model] = prompt
+        evaluated = max(1, (len(prompt) - common) // CHARS_PER_TOKEN)
+        eval_count = max(1, len(self.reply) // CHARS_PER_TOKEN)
+        return {
+            "load_duration": load_ns,
+            "prompt_eval_count": evaluated,
+            "prompt_eval_duration": evaluated * PROMPT_EVAL_NS_PER_TOKEN,
+            "eval_count": eval_count,
+            "eval_duration": eval_count * EVAL_NS_PER_TOKEN,
+            "total_duration": load_ns + evaluated * PROMPT_EVAL_NS_PER_TOKEN + eval_count * EVAL_NS_PER_TOKEN,
+        }
+
+    def chat(self, request):
+        model = request.get("model", "")
+        prompt = "".join(f"<{m.get('role')}>{m.get('content', '')}" for m in request.get("messages", []))
+        stats = self._evaluate(model, prompt)
+        final = {"model": model, "created_at": "2026-01-01T00:00:00Z", "done": True, "done_reason": "stop",
+                 "message": {"role": "assistant", "content": self.reply}, **stats}
+        if request.get("stream", True):
+            words = self.reply.split(" ")
+            chunks = [{"model": model, "created_at": "2026-01-01T00:00:00Z", "done": False,
+                       "message": {"role": "assistant", "content": w + (" " if i < len(words) - 1 else "")}}
+                      for i, w in enumerate(words)]
+            final["message"] = {"role": "assistant", "content": ""}
+            return b"".join(json.dumps(c).encode() + b"\n" for c in chunks + [final])
+        return final
+
+    def generate(self, request):
+        model = request.get("model", "")
+        stats = self._evaluate(model, request.get("prompt") or "")
+        return {"model": model, "created_at": "2026-01-01T00:00:00Z", "done": True, "response": "", **stats}
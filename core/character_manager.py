@@ -1,5 +1,6 @@
 import os
-import json
+from core.history_store import get_history_store
+from core.search_index import get_search_index
 
 CHARACTER_DIR = 'characters'
 HISTORY_FILES_DIR = 'chat_histories'
@@ -12,16 +13,22 @@ def get_character_history_file(character_name):
     os.makedirs(HISTORY_FILES_DIR, exist_ok=True)
     return os.path.join(HISTORY_FILES_DIR, f"chat_history_{safe_name}.json")
 
+def get_character_history_store(character_name):
+    # Legacy chat_history_<name>.json files are migrated to .jsonl on first access
+    legacy_file = get_character_history_file(character_name)
+    return get_history_store(os.path.splitext(legacy_file)[0] + ".jsonl", legacy_path=legacy_file)
+
 def save_chat_history(messages_to_save, character_name):
-    history_file = get_character_history_file(character_name)
-    with open(history_file, 'w', encoding='utf-8') as f:
-        json.dump(messages_to_save, f, ensure_ascii=False, indent=4)
+    store = get_character_history_store(character_name)
+    store.sync(messages_to_save)
+    try:
+        get_search_index().add_history(os.path.basename(store.path), character_name, messages_to_save)
+    except Exception as e:
+        print(f"[WARNING] Failed to index chat history: {e}")
 
-def load_chat_history(character_name):
-    history_file = get_character_history_file(character_name)
+def load_chat_history(character_name, last_n=None):
     try:
-        with open(history_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return get_character_history_store(character_name).load(last_n)
     except Exception:
         return []
 
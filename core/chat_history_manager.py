@@ -1,32 +1,45 @@
 # chat_history_manager.py
 import os
 import json
+from core.history_store import get_history_store
+from core.search_index import get_search_index
 
 class ChatHistoryManager:
     def __init__(self, history_dir, char_name):
         self.history_dir = history_dir
         self.char_name = char_name
         os.makedirs(history_dir, exist_ok=True)
-        self.last_session_path = os.path.join(history_dir, "last_session.json")
+        self.last_session_path = os.path.join(history_dir, "last_session.jsonl")
+        self.store = get_history_store(self.last_session_path,
+                                       legacy_path=os.path.join(history_dir, "last_session.json"))
 
     def save_history(self, messages, char_name=None):
         if char_name is None:
             char_name = self.char_name
         history = [m for m in messages if m.get('role') != 'system']
         try:
-            with open(self.last_session_path, "w", encoding="utf-8") as f:
-                json.dump(history, f, ensure_ascii=False, indent=2)
+            self.store.sync(history)
         except Exception as e:
             print(f"[ERROR] Failed to save history: {e}")
+        try:
+            get_search_index().add_history(os.path.basename(self.last_session_path), char_name, history)
+        except Exception as e:
+            print(f"[WARNING] Failed to index chat history: {e}")
 
-    def load_last_history(self, system_prompt):
-        if os.path.exists(self.last_session_path):
-            try:
-                with open(self.last_session_path, "r", encoding="utf-8") as f:
-                    imported = json.load(f)
-                    return [{'role': 'system', 'content': system_prompt}] + imported
-            except Exception as e:
-                print(f"[ERROR] Failed to load history: {e}")
+    def mark_replaced(self):
+        """The message list was replaced (Clear, Restart, Import): the next save starts a new session"""
+        self.store.mark_dirty()
+        try:
+            get_search_index().restart_history(os.path.basename(self.last_session_path))
+        except Exception as e:
+            print(f"[WARNING] Failed to reset the search index for the new session: {e}")
+
+    def load_last_history(self, system_prompt, last_n=None):
+        try:
+            imported = self.store.load(last_n)
+            return [{'role': 'system', 'content': system_prompt}] + imported
+        except Exception as e:
+            print(f"[ERROR] Failed to load history: {e}")
         return [{'role': 'system', 'content': system_prompt}]
 
     def export_history(self, messages, file_path):
@@ -1,23 +1,211 @@
 # chat_logger.py
-import datetime
+# Structured chat log: one JSON record per line (timestamp, role, text, model, character,
+# latency). Records are queued and written in batches by a background thread, the file is
+# rotated by size and age, old segments are optionally gzipped, and the viewer reads only the
+# tail of the file. Written records can also be fed to the full-text search index.
 import os
+import gzip
+import json
+import queue
+import shutil
+import datetime
+import threading
+from core.config import LOG_MAX_MB, LOG_ROTATE_HOURS, LOG_BACKUPS, LOG_COMPRESS
+
+LOG_FILE_NAME = "chat.jsonl"
+LEGACY_LOG_FILE_NAME = "chat.log"  # Plain-text log of earlier versions; kept, shown after the JSONL log
+FLUSH_INTERVAL = 1.0  # Seconds a record may wait in the queue before it is written
+MAX_BATCH = 1000
+TAIL_BLOCK = 64 * 1024
+
+def format_record(line):
+    """Human-readable form of one log line; lines from the old plain-text log pass through"""
+    try:
+        record = json.loads(line)
+    except ValueError:
+        return line
+    if not isinstance(record, dict):
+        return line
+    details = ", ".join(f"{key}={record[key]}" for key in ("model", "character", "latency") if record.get(key) is not None)
+    return f"[{record.get('ts', '')}] {str(record.get('role', '')).upper()}: {record.get('text', '')}" + (f"  ({details})" if details else "")
+
+def read_tail(path, max_chars=3000, block_size=TAIL_BLOCK):
+    """Last whole lines of a file, totalling at least max_chars characters when available.
+    Seeks backwards from the end in blocks, so the cost does not depend on the file size."""
+    if not os.path.exists(path):
+        return []
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        data = b""
+        while position > 0:
+            step = min(block_size, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+            # Enough complete lines once the text after the first newline covers max_chars
+            newline = data.find(b"\n")
+            if newline != -1 and len(data) - newline > max_chars * 4:
+                break
+    lines = data.decode('utf-8', errors='replace').splitlines()
+    if position > 0 and lines:
+        lines = lines[1:]  # Started mid-line
+    result, total = [], 0
+    for line in reversed(lines):
+        if not line.strip():
+            continue
+        result.append(line)
+        total += len(line) + 1
+        if total >= max_chars:
+            break
+    return result[::-1]
 
 class ChatLogger:
-    def __init__(self, log_dir=None):
-        # Use consistent log file name instead of timestamp-based
-        self.log_file = os.path.join(log_dir or '', "chat.log")
-        
-        # Create log file if it doesn't exist
+    def __init__(self, log_dir=None, max_bytes=LOG_MAX_MB * 1024 * 1024, rotate_seconds=LOG_ROTATE_HOURS * 3600,
+                 backups=LOG_BACKUPS, compress=LOG_COMPRESS, search_index=None):
+        self.log_dir = log_dir or ''
+        self.log_file = os.path.join(self.log_dir, LOG_FILE_NAME)
+        self.legacy_log_file = os.path.join(self.log_dir, LEGACY_LOG_FILE_NAME)
+        self.max_bytes = max_bytes
+        self.rotate_seconds = rotate_seconds  # 0 disables time-based rotation
+        self.backups = backups
+        self.compress = compress
+        self.search_index = search_index  # Indexed from the writer thread after every batch
+        self.queue = queue.SimpleQueue()
+        self.stats = {"records": 0, "batches": 0, "rotations": 0, "errors": 0}
+        self.file = None
+        self.size = 0
+        self.opened_at = None
+        self.closed = False
+        self.thread = threading.Thread(target=self._writer, name="chat-logger", daemon=True)
+        self.thread.start()
         if not os.path.exists(self.log_file):
-            with open(self.log_file, "w", encoding="utf-8") as f:
-                f.write(f"[{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] LOG: Chat log initialized.\n")
+            if os.path.exists(self.legacy_log_file):
+                print(f"[INFO] Chat log is now {self.log_file}; {self.legacy_log_file} is kept and still shown by the viewer")
+            self.log("log", "Chat log initialized.")
+
+    def log(self, role, text, model=None, character=None, latency=None):
+        """Queue a record stamped with the current date and time; returns immediately"""
+        record = {"ts": datetime.datetime.now().isoformat(timespec='seconds'), "role": role, "text": text}
+        if model:
+            record["model"] = model
+        if character:
+            record["character"] = character
+        if latency is not None:
+            record["latency"] = round(latency, 3)
+        self.queue.put(record)
+
+    def flush(self, timeout=5.0):
+        """Block until everything queued so far is on disk"""
+        done = threading.Event()
+        self.queue.put(done)
+        return done.wait(timeout)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.queue.put(None)
+            self.thread.join(timeout=5.0)
+
+    def _open(self):
+        os.makedirs(self.log_dir or '.', exist_ok=True)
+        self.file = open(self.log_file, "a", encoding="utf-8")
+        self.size = self.file.tell()
+        if self.opened_at is None:
+            self.opened_at = self._segment_started()
+
+    def _segment_started(self):
+        """Time of the first record in the current file, so restarts don't postpone time-based rotation"""
+        try:
+            with open(self.log_file, 'r', encoding='utf-8') as f:
+                first = json.loads(f.readline())
+            return datetime.datetime.fromisoformat(first["ts"]).timestamp()
+        except Exception:
+            return datetime.datetime.now().timestamp()
+
+    def _writer(self):
+        while True:
+            try:
+                item = self.queue.get(timeout=FLUSH_INTERVAL)
+            except queue.Empty:
+                continue
+            records, waiters, stop = [], [], False
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    records.append(item)
+                if len(records) >= MAX_BATCH:
+                    break
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+            if records:
+                self._write(records)
+                self._index(records)
+            for waiter in waiters:
+                waiter.set()
+            if stop:
+                if self.file is not None:
+                    self.file.close()
+                    self.file = None
+                return
+
+    def _write(self, records):
+        try:
+            if self.file is None:
+                self._open()
+            chunk = "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in records)
+            self.file.write(chunk)
+            self.file.flush()
+            self.size = self.file.tell()
+            self.stats["records"] += len(records)
+            self.stats["batches"] += 1
+            age = datetime.datetime.now().timestamp() - self.opened_at
+            if self.size >= self.max_bytes or (self.rotate_seconds and age >= self.rotate_seconds):
+                self._rotate()
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"[WARNING] Failed to write chat log: {e}")
+
+    def _index(self, records):
+        if self.search_index is None:
+            return
+        try:
+            self.search_index.add_log_records(records)
+        except Exception as e:
+            print(f"[WARNING] Failed to index chat log records: {e}")
+
+    def _rotate(self):
+        self.file.close()
+        self.file = None
+        self.opened_at = None
+        stamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        segment = os.path.join(self.log_dir, f"chat-{stamp}.jsonl")
+        os.replace(self.log_file, segment)
+        if self.compress:
+            with open(segment, 'rb') as src, gzip.open(segment + ".gz", 'wb', compresslevel=6) as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+            os.remove(segment)
+        self.stats["rotations"] += 1
+        segments = sorted(name for name in os.listdir(self.log_dir or '.')
+                          if name.startswith("chat-") and (name.endswith(".jsonl") or name.endswith(".jsonl.gz")))
+        for name in segments[:-self.backups] if self.backups else segments:
+            os.remove(os.path.join(self.log_dir, name))
 
-    def log(self, timestamp, role, text):
-        with open(self.log_file, "a", encoding="utf-8") as logf:
-            logf.write(f"[{timestamp}] {role.upper()}: {text}\n")
+    def tail(self, max_chars=3000):
+        """Most recent log lines in readable form, topped up from the old chat.log while the JSONL log is short"""
+        self.flush(timeout=1.0)
+        lines = read_tail(self.log_file, max_chars)
+        remaining = max_chars - sum(len(line) + 1 for line in lines)
+        if remaining > 0 and os.path.exists(self.legacy_log_file):
+            legacy = read_tail(self.legacy_log_file, remaining)
+            if legacy:
+                lines = legacy + [f"--- Earlier entries above are from {LEGACY_LOG_FILE_NAME} ---"] + lines
+        return [format_record(line) for line in lines]
 
     def view_log(self, tail=3000):
-        if os.path.exists(self.log_file):
-            with open(self.log_file, "r", encoding="utf-8") as f:
-                return f.read()[-tail:]
-        return ""
+        return "\n".join(self.tail(tail))
@@ -22,12 +22,61 @@ HISTORY_FILES_DIR = 'chat_histories'
 # Ollama settings (configurable via GUI "Ollama Settings")
 DEFAULT_OLLAMA_HOST = os.getenv('OLLAMA_HOST', 'http://localhost:11434')
 DEFAULT_MODELS_PATH = os.getenv('MODELS_PATH', '')  # Empty = use Ollama default location
+# How long Ollama keeps the model (and its prompt KV cache) loaded between requests
+OLLAMA_KEEP_ALIVE = os.getenv('OLLAMA_KEEP_ALIVE', '30m')
+OLLAMA_CONNECT_TIMEOUT = float(os.getenv('OLLAMA_CONNECT_TIMEOUT', '5'))
+OLLAMA_READ_TIMEOUT = float(os.getenv('OLLAMA_READ_TIMEOUT', '300'))  # Long: CPU generations can be slow
+OLLAMA_MAX_RETRIES = int(os.getenv('OLLAMA_MAX_RETRIES', '2'))
+
+# How often (ms) UI updates posted by worker threads are applied on the Tk main loop
+UI_POLL_MS = int(os.getenv('UI_POLL_MS', '30'))
+
+# Proactive messages: first idle check after this many seconds of silence, doubled after every
+# attempt up to the maximum; a new user message resets it
+PROACTIVE_IDLE_SECONDS = float(os.getenv('PROACTIVE_IDLE_SECONDS', '90'))
+PROACTIVE_IDLE_MAX_SECONDS = float(os.getenv('PROACTIVE_IDLE_MAX_SECONDS', '3600'))
+
+# Approximate prompt size (in tokens) for system prompt, memory and recent turns sent to the model
+CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', '3000'))
+# Evicted turns are folded into the rolling conversation summary once they add up to this many tokens
+SUMMARY_TRIGGER_TOKENS = int(os.getenv('SUMMARY_TRIGGER_TOKENS', '600'))
+
+# Chat log (chat.jsonl): rotated once it reaches LOG_MAX_MB or is LOG_ROTATE_HOURS old (0 = never),
+# LOG_BACKUPS old segments are kept, gzipped when LOG_COMPRESS is true
+LOG_MAX_MB = float(os.getenv('LOG_MAX_MB', '20'))
+LOG_ROTATE_HOURS = float(os.getenv('LOG_ROTATE_HOURS', '168'))
+LOG_BACKUPS = int(os.getenv('LOG_BACKUPS', '10'))
+LOG_COMPRESS = os.getenv('LOG_COMPRESS', 'true').lower() == 'true'
+
+# Images for vision models are downscaled to this longest side (0 = the model family's native
+# input resolution) and re-encoded as JPEG; needs Pillow
+VISION_MAX_SIDE = int(os.getenv('VISION_MAX_SIDE', '0'))
+VISION_JPEG_QUALITY = int(os.getenv('VISION_JPEG_QUALITY', '85'))
+# 'pixels' sends the image to the chat model on the turn it was attached and captions it in the
+# background for later turns; 'caption' sends a cached detailed caption instead (made once per
+# image by VISION_CAPTION_MODEL, empty = the chat model)
+VISION_MODE = os.getenv('VISION_MODE', 'pixels')
+VISION_CAPTION_MODEL = os.getenv('VISION_CAPTION_MODEL', '')
+
+# Long-term memory retrieval: 'bm25' (keyword index) or 'semantic' (Ollama embeddings, needs numpy)
+MEMORY_RETRIEVAL_MODE = os.getenv('MEMORY_RETRIEVAL_MODE', 'bm25')
+EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'nomic-embed-text')
 
 # Google Search API (configurable via GUI "Web Search")
 # Get free keys from: https://developers.google.com/custom-search/v1/introduction  
 GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY', '')
 GOOGLE_CSE_ID = os.getenv('GOOGLE_CSE_ID', '')
 
+# Web enrichment (URL fetch / search) limits in seconds
+WEB_REQUEST_TIMEOUT = float(os.getenv('WEB_REQUEST_TIMEOUT', '6'))
+ENRICHMENT_BUDGET = float(os.getenv('ENRICHMENT_BUDGET', '8'))  # Generation starts after this even if fetches are pending
+# Fetched pages: 'article' (main content only, skips menus/banners/footers) or 'text' (all visible text)
+WEB_EXTRACTION_MODE = os.getenv('WEB_EXTRACTION_MODE', 'article')
+# On-disk cache of fetched pages / search results
+WEB_CACHE_TTL = int(os.getenv('WEB_CACHE_TTL', str(6 * 3600)))  # Used when a page sends no Cache-Control
+WEB_SEARCH_CACHE_TTL = int(os.getenv('WEB_SEARCH_CACHE_TTL', '3600'))
+WEB_CACHE_MAX_MB = int(os.getenv('WEB_CACHE_MAX_MB', '50'))
+
 # Auto-create directories
 os.makedirs(CHARACTER_DIR, exist_ok=True)
 os.makedirs(HISTORY_FILES_DIR, exist_ok=True)
@@ -0,0 +1,68 @@
+# context_builder.py
+# Builds the message list sent to Ollama within a token budget: system messages and the
+# latest turn are always kept, older turns are dropped first when the budget runs out.
+from functools import lru_cache
+from core.config import CONTEXT_TOKEN_BUDGET
+
+CHARS_PER_TOKEN = 4  # Rough average for llama-style tokenizers on mixed text
+MESSAGE_OVERHEAD_TOKENS = 4  # Role markers / separators added by chat templates
+IMAGE_TOKENS = 768  # Typical cost of one image for small vision models
+
+@lru_cache(maxsize=8192)
+def estimate_text_tokens(text):
+    if not text:
+        return 0
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def estimate_tokens(message):
+    tokens = MESSAGE_OVERHEAD_TOKENS + estimate_text_tokens(message.get('content') or '')
+    images = message.get('images') or ([message['image']] if message.get('image') else [])
+    return tokens + IMAGE_TOKENS * len(images)
+
+class ContextWindow:
+    def __init__(self, messages, dropped, tokens):
+        self.messages = messages  # Ready to send to Ollama
+        self.dropped = dropped  # Oldest history messages that did not fit, in original order
+        self.tokens = tokens
+
+EVICTION_TARGET = 0.75  # When over budget, evict down to this share so the window start stays put for a while
+
+class ContextBuilder:
+    def __init__(self, token_budget=CONTEXT_TOKEN_BUDGET, min_recent_messages=2, eviction_target=EVICTION_TARGET):
+        self.token_budget = token_budget
+        self.min_recent_messages = min_recent_messages
+        self.eviction_target = eviction_target
+        # Index of the first history message sent last time; kept while it fits so the
+        # prompt prefix (and Ollama's KV cache for it) survives from turn to turn
+        self.window_start = 0
+
+    def reset(self):
+        self.window_start = 0
+
+    def build(self, history, system_messages=(), late_messages=()):
+        """Assemble system_messages + newest history that fits, with late_messages
+        (retrieved memory, web results, ...) placed right before the last history message."""
+        system_messages = list(system_messages)
+        late_messages = list(late_messages)
+        history = [m for m in history if m.get('role') != 'system']
+        fixed = sum(estimate_tokens(m) for m in system_messages + late_messages)
+        costs = [estimate_tokens(m) for m in history]
+        split = self.window_start if self.window_start <= len(history) else 0
+        if fixed + sum(costs[split:]) > self.token_budget:
+            # Walk back from the newest message until the eviction target is reached
+            target = self.token_budget * self.eviction_target
+            used, split = fixed, len(history)
+            while split > 0:
+                if len(history) - split >= self.min_recent_messages and used + costs[split - 1] > target:
+                    break
+                split -= 1
+                used += costs[split]
+        split = min(split, max(len(history) - self.min_recent_messages, 0))
+        self.window_start = split
+        used = fixed + sum(costs[split:])
+        recent = history[split:]
+        if recent and late_messages:
+            messages = system_messages + recent[:-1] + late_messages + recent[-1:]
+        else:
+            messages = system_messages + recent + late_messages
+        return ContextWindow(messages, history[:split], used)
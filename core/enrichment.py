@@ -0,0 +1,72 @@
+# enrichment.py
+# Web enrichment stage for a chat turn: URL fetches and the web search run concurrently in a
+# shared thread pool, and generation proceeds after ENRICHMENT_BUDGET seconds with whatever
+# results have arrived by then.
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from core.config import ENRICHMENT_BUDGET, WEB_REQUEST_TIMEOUT
+from core.web_tools import fetch_url_content, google_search
+
+URL_PATTERN = re.compile(r'(https?://[^\s]+)')
+MAX_URLS = 3
+SEARCH_KEYWORDS = [
+    "сьогодні", "актуальний час", "останні новини", "що відбувається",
+    "хто такий", "що таке", "останній", "погода", "новини",
+    "what time is it", "what is the time", "current time"
+]
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="enrichment")
+
+def find_urls(text):
+    return URL_PATTERN.findall(text)[:MAX_URLS]
+
+def needs_web_search(text):
+    text = text.lower()
+    return any(keyword in text for keyword in SEARCH_KEYWORDS)
+
+class EnrichmentResult:
+    def __init__(self, kind, source, content, seconds):
+        self.kind = kind  # "url" or "search"
+        self.source = source
+        self.content = content
+        self.seconds = seconds
+
+    @property
+    def ok(self):
+        if self.kind == "url":
+            return bool(self.content) and not self.content.startswith("[ERROR]")
+        return bool(self.content)
+
+    def to_message(self):
+        if self.kind == "url":
+            text = f"System note: The user provided a link. Here is the content from {self.source}:\n{self.content}"
+        else:
+            text = "System note: To answer the user's question, I have performed a web search. Here are the results:\n" + "\n".join(self.content[:3])
+        return {'role': 'system', 'content': text}
+
+def _timed(kind, source, func, *args, **kwargs):
+    start = time.perf_counter()
+    content = func(*args, **kwargs)
+    return EnrichmentResult(kind, source, content, time.perf_counter() - start)
+
+def run_enrichment(urls=(), search_query=None, api_key='', cse_id='', budget=ENRICHMENT_BUDGET,
+                   request_timeout=WEB_REQUEST_TIMEOUT):
+    """Run all fetches concurrently; returns (results that finished in time, sources still pending)"""
+    futures = {}
+    for url in urls:
+        futures[_executor.submit(_timed, "url", url, fetch_url_content, url, timeout=request_timeout)] = url
+    if search_query and api_key and cse_id:
+        futures[_executor.submit(_timed, "search", search_query, google_search, search_query, api_key, cse_id,
+                                 timeout=request_timeout)] = search_query
+    if not futures:
+        return [], []
+    done, pending = wait(futures, timeout=budget)
+    results = []
+    for future in futures:
+        # Keep submission order so URLs appear in the order the user wrote them
+        if future in done and future.exception() is None:
+            results.append(future.result())
+    for future in pending:
+        future.cancel()
+    return results, [futures[f] for f in pending]
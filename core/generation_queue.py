@@ -0,0 +1,173 @@
+# generation_queue.py
+# One worker thread runs every model generation (user replies and proactive messages) in
+# priority order. User requests preempt proactive work, user messages typed while a request is
+# still queued are folded into that request, and a running request can be cancelled ("Stop").
+import time
+import heapq
+import threading
+
+PRIORITY_USER = 0
+PRIORITY_PROACTIVE = 1
+PRIORITY_BACKGROUND = 2  # Housekeeping such as conversation summaries; runs when nothing else waits
+MAX_PENDING = 8
+WAIT_SAMPLES = 100  # Recent queue wait times kept for the p50/max metrics
+
+class QueueFull(Exception):
+    pass
+
+class GenerationRequest:
+    def __init__(self, kind, func, priority, on_dropped=None):
+        self.kind = kind  # "user" or "proactive"
+        self.func = func  # func(request), runs on the worker thread
+        self.priority = priority
+        self.on_dropped = on_dropped  # on_dropped(request) when it leaves the queue without running
+        self.submitted = time.monotonic()
+        self.started = None
+        self.merged = 1  # Number of submissions folded into this request
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    @property
+    def wait_seconds(self):
+        return (self.started or time.monotonic()) - self.submitted
+
+class GenerationScheduler:
+    def __init__(self, max_pending=MAX_PENDING, on_change=None):
+        self.max_pending = max_pending
+        self.on_change = on_change or (lambda: None)  # Called from any thread when depth/state changes
+        self.cond = threading.Condition()
+        self.heap = []  # (priority, seq, request)
+        self.seq = 0
+        self.current = None
+        self.running = True
+        self.waits = []
+        self.stats = {"completed": 0, "cancelled": 0, "coalesced": 0, "rejected": 0, "preempted": 0, "errors": 0}
+        self.worker = threading.Thread(target=self._run, name="generation-worker", daemon=True)
+        self.worker.start()
+
+    def submit(self, kind, func, priority=PRIORITY_USER, coalesce=False, on_dropped=None):
+        """Queue a generation; with coalesce=True a still-queued request of the same kind absorbs it.
+        on_dropped is called if the request is dropped for a higher-priority one or cancelled."""
+        dropped = None
+        with self.cond:
+            if coalesce:
+                for _, _, pending in self.heap:
+                    if pending.kind == kind and not pending.cancelled:
+                        pending.func = func  # Newest settings win
+                        pending.merged += 1
+                        self.stats["coalesced"] += 1
+                        self._notify()
+                        return pending
+            if len(self.heap) >= self.max_pending:
+                dropped = self._drop_lower_priority(priority)
+                if dropped is None:
+                    self.stats["rejected"] += 1
+                    raise QueueFull(f"{len(self.heap)} generation requests are already waiting")
+            request = GenerationRequest(kind, func, priority, on_dropped)
+            self.seq += 1
+            heapq.heappush(self.heap, (priority, self.seq, request))
+            if self.current is not None and priority < self.current.priority:
+                self.current.cancel()  # User input preempts proactive generation
+                self.stats["preempted"] += 1
+            self.cond.notify()
+        if dropped is not None:
+            self._dropped([dropped])
+        self._notify()
+        return request
+
+    def _drop_lower_priority(self, priority):
+        """Remove and return the newest lowest-priority request if it ranks below `priority`"""
+        worst = max(self.heap, default=None)
+        if worst is None or worst[0] <= priority:
+            return None
+        self.heap.remove(worst)
+        heapq.heapify(self.heap)
+        return worst[2]
+
+    def _dropped(self, requests):
+        """Tell the owners of requests that will never run; called without the lock held"""
+        for request in requests:
+            if request.on_dropped is None:
+                continue
+            try:
+                request.on_dropped(request)
+            except Exception as e:
+                print(f"[WARNING] {request.kind} drop handler failed: {e}")
+
+    def has_pending(self, kind=None):
+        with self.cond:
+            return any(kind is None or request.kind == kind for _, _, request in self.heap)
+
+    def stop_current(self):
+        """Cancel the running request; returns False when nothing was running"""
+        with self.cond:
+            if self.current is None:
+                return False
+            self.current.cancel()
+            return True
+
+    def cancel_pending(self, kind=None):
+        with self.cond:
+            kept = [item for item in self.heap if kind is not None and item[2].kind != kind]
+            removed = [item[2] for item in self.heap if not (kind is not None and item[2].kind != kind)]
+            self.heap = kept
+            heapq.heapify(self.heap)
+            self.stats["cancelled"] += len(removed)
+        if removed:
+            self._dropped(removed)
+            self._notify()
+        return len(removed)
+
+    def shutdown(self):
+        with self.cond:
+            self.running = False
+            if self.current is not None:
+                self.current.cancel()
+            self.cond.notify_all()
+
+    def _notify(self):
+        try:
+            self.on_change()
+        except Exception as e:
+            print(f"[WARNING] Generation queue listener failed: {e}")
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while self.running and not self.heap:
+                    self.cond.wait()
+                if not self.running:
+                    return
+                _, _, request = heapq.heappop(self.heap)
+                request.started = time.monotonic()
+                self.current = request
+                self.waits.append(request.wait_seconds)
+                del self.waits[:-WAIT_SAMPLES]
+            self._notify()
+            try:
+                request.func(request)
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"[ERROR] {request.kind} generation failed: {e}")
+            with self.cond:
+                self.current = None
+                self.stats["cancelled" if request.cancelled else "completed"] += 1
+            self._notify()
+
+    def get_stats(self):
+        """Queue depth, what is running and recent queue wait times (seconds)"""
+        with self.cond:
+            waits = sorted(self.waits)
+            return dict(self.stats,
+                        depth=len(self.heap),
+                        running=self.current.kind if self.current else None,
+                        running_seconds=time.monotonic() - self.current.started if self.current else 0.0,
+                        oldest_wait=max((time.monotonic() - r.submitted for _, _, r in self.heap), default=0.0),
+                        wait_p50=waits[len(waits) // 2] if waits else 0.0,
+                        wait_max=waits[-1] if waits else 0.0)
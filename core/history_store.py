@@ -0,0 +1,206 @@
+# history_store.py
+# Append-only JSONL storage for chat histories: one record per line, new messages are appended
+# instead of rewriting the whole file, and a reset marker lets clears/rewrites stay append-only.
+import os
+import json
+import time
+import hashlib
+import threading
+
+RESET_KEY = "_reset"
+TAIL_BLOCK_SIZE = 64 * 1024
+FSYNC_POLICIES = ("always", "batch", "never")
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def _record_hash(record):
+    return hashlib.sha1(json.dumps(record, ensure_ascii=False, sort_keys=True).encode('utf-8')).digest()
+
+def get_history_store(path, legacy_path=None, **kwargs):
+    """Return the shared store for a path so consecutive saves can append incrementally"""
+    path = os.path.abspath(path)
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = HistoryStore(path, legacy_path=legacy_path, **kwargs)
+            _stores[path] = store
+        return store
+
+class HistoryStore:
+    def __init__(self, path, legacy_path=None, fsync="batch", fsync_interval=2.0, compact_threshold=500):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy '{fsync}', expected one of {FSYNC_POLICIES}")
+        self.path = path
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.compact_threshold = compact_threshold
+        self._lock = threading.RLock()
+        self._live = None  # Records after the last reset marker (loaded lazily)
+        self._last = None  # Hash of the last live record
+        self._dirty = False  # Set by mark_dirty(): the next sync() rewrites
+        self._dead = 0  # Lines that compaction would drop
+        self._last_fsync = 0.0
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        if legacy_path:
+            self._migrate(legacy_path)
+
+    def _migrate(self, legacy_path):
+        if os.path.exists(self.path) or not os.path.exists(legacy_path):
+            return
+        try:
+            with open(legacy_path, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+            if not isinstance(records, list):
+                records = []
+            self._write_compacted(records)
+            os.replace(legacy_path, legacy_path + ".bak")
+            print(f"[INFO] Migrated {len(records)} records from {legacy_path} to {self.path}")
+        except Exception as e:
+            print(f"[ERROR] Failed to migrate history {legacy_path}: {e}")
+
+    @staticmethod
+    def _parse_line(line):
+        line = line.strip()
+        if not line:
+            return None
+        try:
+            return json.loads(line)
+        except ValueError:
+            return None  # Torn write from an interrupted append
+
+    @staticmethod
+    def _is_reset(record):
+        return isinstance(record, dict) and record.get(RESET_KEY) is True
+
+    def _scan(self):
+        live, dead = [], 0
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    record = self._parse_line(line)
+                    if record is None:
+                        continue
+                    if self._is_reset(record):
+                        dead += len(live) + 1
+                        live = []
+                    else:
+                        live.append(record)
+        self._dead = dead
+        self._live = len(live)
+        self._last = _record_hash(live[-1]) if live else None
+        return live
+
+    def load(self, last_n=None):
+        """Load live records; with last_n only the tail of the file is read"""
+        with self._lock:
+            if last_n is None:
+                records = self._scan()
+                if self._needs_compaction():
+                    self._write_compacted(records)
+                return records
+            if last_n <= 0 or not os.path.exists(self.path):
+                return []
+            return self._read_tail(last_n)
+
+    def _read_tail(self, count):
+        records = []
+        with open(self.path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            pos = f.tell()
+            remainder = b""
+            while True:
+                if pos > 0:
+                    step = min(TAIL_BLOCK_SIZE, pos)
+                    pos -= step
+                    f.seek(pos)
+                    lines = (f.read(step) + remainder).split(b"\n")
+                    # The first piece may be cut in the middle unless we reached the file start
+                    remainder = lines.pop(0) if pos > 0 else b""
+                else:
+                    lines = []
+                for raw in reversed(lines):
+                    record = self._parse_line(raw.decode('utf-8', errors='replace'))
+                    if record is None:
+                        continue
+                    if self._is_reset(record):
+                        return records[::-1]
+                    records.append(record)
+                    if len(records) >= count:
+                        return records[::-1]
+                if pos == 0:
+                    return records[::-1]
+
+    def _write_lines(self, records):
+        data = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records)
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(data)
+            f.flush()
+            now = time.monotonic()
+            if self.fsync == "always" or (self.fsync == "batch" and now - self._last_fsync >= self.fsync_interval):
+                os.fsync(f.fileno())
+                self._last_fsync = now
+
+    def append(self, record):
+        self.append_many([record])
+
+    def append_many(self, records):
+        if not records:
+            return
+        with self._lock:
+            if self._live is None:
+                self._scan()
+            self._write_lines(records)
+            self._live += len(records)
+            self._last = _record_hash(records[-1])
+
+    def reset(self, records=()):
+        """Logically replace all stored records with `records` using a single append"""
+        records = list(records)
+        with self._lock:
+            if self._live is None:
+                self._scan()
+            self._dead += self._live + 1
+            self._write_lines([{RESET_KEY: True}] + records)
+            self._live = len(records)
+            self._last = _record_hash(records[-1]) if records else None
+            self._dirty = False
+            if self._needs_compaction():
+                self._write_compacted(records)
+
+    def mark_dirty(self):
+        """Saved records were replaced or edited in place; the next sync() rewrites the list"""
+        with self._lock:
+            self._dirty = True
+
+    def sync(self, records):
+        """Persist a full message list, appending only what is new since the last save.
+        Only the last saved record is compared, so edits earlier in the list need mark_dirty()."""
+        with self._lock:
+            if self._live is None:
+                self._scan()
+            count = self._live
+            if (not self._dirty and len(records) >= count
+                    and (count == 0 or _record_hash(records[count - 1]) == self._last)):
+                self.append_many(records[count:])
+            else:
+                self.reset(records)
+
+    def _needs_compaction(self):
+        return self._dead >= self.compact_threshold and self._dead > (self._live or 0)
+
+    def compact(self):
+        with self._lock:
+            self._write_compacted(self._scan())
+
+    def _write_compacted(self, records):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._live = len(records)
+        self._last = _record_hash(records[-1]) if records else None
+        self._dead = 0
@@ -0,0 +1,339 @@
+# html_extract.py
+# Incremental HTML-to-text extraction for fetched pages. The body is fed to html.parser in
+# chunks, script/style content is dropped on the fly and parsing stops as soon as enough
+# readable text has been collected, so large pages are never fully downloaded or parsed.
+# In "article" mode text blocks are scored while parsing (readability style) so that only the
+# main content is returned instead of menus, cookie banners and footers.
+import re
+import codecs
+from collections import defaultdict
+from html.parser import HTMLParser
+
+SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "canvas", "iframe", "object"}
+BLOCK_TAGS = {
+    "p", "div", "br", "li", "ul", "ol", "dl", "dt", "dd", "tr", "table", "section", "article",
+    "main", "aside", "header", "footer", "nav", "form", "pre", "blockquote", "figure", "figcaption",
+    "h1", "h2", "h3", "h4", "h5", "h6", "title", "hr", "body", "html",
+}
+CONTAINER_TAGS = {"div", "article", "main", "section", "td", "body", "blockquote", "center"}
+HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+BOILERPLATE_TAGS = {"nav", "footer", "aside", "form", "button", "select", "dialog"}
+CONTENT_TAGS = {"article", "main"}
+# Class/id hints: strong negatives always mark boilerplate, weak ones only when no positive hint is present
+STRONG_NEGATIVE_HINTS = re.compile(r'comment|cookie|consent|share|social|sponsor|advert|related|newsletter|subscribe|popup|modal|breadcrumb|gdpr', re.IGNORECASE)
+WEAK_NEGATIVE_HINTS = re.compile(r'sidebar|footer|header|menu|nav|banner|promo|widget|toolbar', re.IGNORECASE)
+POSITIVE_HINTS = re.compile(r'article|content|post|entry|main|story|text|body|blog', re.IGNORECASE)
+ARTICLE_TEXT_CAP = 60000  # Article mode reads at most this much candidate text before choosing
+VOID_TAGS = {"br", "hr", "img", "input", "meta", "link", "area", "base", "col", "embed", "source", "track", "wbr"}
+TEXT_CONTENT_TYPES = ("application/xhtml+xml", "application/json", "application/xml")  # Besides text/*
+META_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.IGNORECASE)
+CHUNK_SIZE = 16 * 1024
+# Pre-scanner for feed_chunk(): script/style bodies (the only raw-text elements html.parser buffers)
+# are dropped before they reach the parser, comments are passed through untouched
+RAW_TEXT_OPEN = re.compile(r'<!--|<(script|style)\b[^>]*>', re.IGNORECASE)
+RAW_TEXT_CLOSE = {tag: re.compile(r'</' + tag, re.IGNORECASE) for tag in ("script", "style")}
+# A tag or comment opening cut off at the end of a chunk, held back until the next one
+PARTIAL_OPEN = re.compile(r'<(?:!-?|s(?:c(?:r(?:i(?:p(?:t\b[^>]*)?)?)?)?)?|s(?:t(?:y(?:l(?:e\b[^>]*)?)?)?)?)?\Z', re.IGNORECASE)
+MAX_CARRY = 8 * 1024
+MAX_DOWNLOAD_BYTES = 2 * 1024 * 1024
+
+class ExtractionError(Exception):
+    pass
+
+class StreamingTextExtractor(HTMLParser):
+    """Collects visible text line by line until `max_chars` characters are gathered"""
+    def __init__(self, max_chars):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.lines = []
+        self.current = []
+        self.collected = 0
+        self.skip_depth = 0
+        self.done = False
+        self.raw_tag = None  # script/style whose body the pre-scanner is dropping
+        self.in_comment = False
+        self.carry = ""  # Unscanned end of the previous chunk
+
+    def _flush_line(self):
+        if self.current:
+            line = " ".join("".join(self.current).split())
+            self.current = []
+            if line:
+                self.lines.append(line)
+                self.collected += len(line) + 1
+                if self.collected >= self.max_chars:
+                    self.done = True
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS and tag not in VOID_TAGS:
+            self.skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self._flush_line()
+
+    def handle_startendtag(self, tag, attrs):
+        if tag in BLOCK_TAGS:
+            self._flush_line()
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self.skip_depth = max(0, self.skip_depth - 1)
+        elif tag in BLOCK_TAGS:
+            self._flush_line()
+
+    def handle_data(self, data):
+        if not self.skip_depth and not self.done:
+            self.current.append(data)
+
+    def feed_chunk(self, text):
+        """Feed the next piece of decoded text. Script/style bodies are cut out before feed(): the parser
+        only sees the empty element, so an unterminated <script> is never buffered and rescanned."""
+        text, self.carry = self.carry + text, ""
+        parts = []
+        pos = 0
+        while pos < len(text):
+            if self.raw_tag:
+                end = RAW_TEXT_CLOSE[self.raw_tag].search(text, pos)
+                if end is None:
+                    # Keep enough of the tail to recognise a closing tag split across chunks
+                    self.carry = text[max(pos, len(text) - len(self.raw_tag) - 1):]
+                    break
+                pos, self.raw_tag = end.start(), None
+            elif self.in_comment:
+                end = text.find("-->", pos)
+                if end < 0:
+                    split = max(pos, len(text) - 2)
+                    parts.append(text[pos:split])
+                    self.carry = text[split:]
+                    break
+                parts.append(text[pos:end + 3])
+                pos, self.in_comment = end + 3, False
+            else:
+                match = RAW_TEXT_OPEN.search(text, pos)
+                if match is None:
+                    partial = PARTIAL_OPEN.search(text, pos)
+                    if partial is not None and len(text) - partial.start() <= MAX_CARRY:
+                        parts.append(text[pos:partial.start()])
+                        self.carry = text[partial.start():]
+                    else:
+                        parts.append(text[pos:])
+                    break
+                parts.append(text[pos:match.end()])
+                pos = match.end()
+                if match.group(1):
+                    self.raw_tag = match.group(1).lower()
+                else:
+                    self.in_comment = True
+        if parts:
+            self.feed("".join(parts))
+        return self.done
+
+    def close(self):
+        if self.carry and not self.raw_tag:
+            self.feed(self.carry)
+        self.carry = ""
+        super().close()
+
+    def get_text(self):
+        self._flush_line()
+        return "\n".join(self.lines)
+
+class ArticleExtractor(StreamingTextExtractor):
+    """Single-pass main-content extraction. Every text block is scored by length, commas and link
+    density as soon as it ends; the score goes to its enclosing container (half to the grandparent
+    container) and the best-scoring container's blocks are returned as the article."""
+    def __init__(self, max_chars):
+        super().__init__(max_chars)
+        self.text_cap = max(ARTICLE_TEXT_CAP, 10 * max_chars)
+        self.stack = []  # Open elements: (tag, flags)
+        self.containers = [0]  # Ids of the enclosing containers, 0 is the document
+        self.next_id = 1
+        self.scores = defaultdict(float)
+        self.blocks = []  # (text, container ids, score, heading)
+        self.title = []
+        self.link_chars = 0
+        self.tag_count = 0
+        self.depth = defaultdict(int)  # "boiler", "content", "link", "title", "heading" nesting
+
+    def _flags(self, tag, attrs):
+        flags = []
+        hints = " ".join(value for name, value in attrs if name in ("class", "id") and value)
+        if tag in SKIP_TAGS:
+            flags.append("skip")
+        if (tag in BOILERPLATE_TAGS or (tag == "header" and not self.depth["content"])
+                or (hints and (STRONG_NEGATIVE_HINTS.search(hints)
+                               or (WEAK_NEGATIVE_HINTS.search(hints) and not POSITIVE_HINTS.search(hints))))):
+            flags.append("boiler")
+        if tag in CONTENT_TAGS or (hints and POSITIVE_HINTS.search(hints)):
+            flags.append("content")
+        if tag == "a":
+            flags.append("link")
+        if tag == "title":
+            flags.append("title")
+        if tag in HEADING_TAGS:
+            flags.append("heading")
+        if tag in CONTAINER_TAGS:
+            flags.append("container")
+        return flags
+
+    def handle_starttag(self, tag, attrs):
+        self.tag_count += 1
+        if tag in VOID_TAGS:
+            if tag in BLOCK_TAGS:
+                self._flush_line()
+            return
+        if tag in BLOCK_TAGS:
+            self._flush_line()
+        flags = self._flags(tag, attrs)
+        for flag in flags:
+            if flag == "skip":
+                self.skip_depth += 1
+            elif flag == "container":
+                self.containers.append(self.next_id)
+                self.next_id += 1
+            else:
+                self.depth[flag] += 1
+        self.stack.append((tag, flags))
+
+    def handle_startendtag(self, tag, attrs):
+        self.tag_count += 1
+        if tag in BLOCK_TAGS:
+            self._flush_line()
+
+    def handle_endtag(self, tag):
+        if not any(open_tag == tag for open_tag, _ in self.stack):
+            return  # Stray end tag
+        if tag in BLOCK_TAGS or tag in CONTAINER_TAGS:
+            self._flush_line()
+        # Pop implicitly closed elements (<p>, <li>, ...) up to the matching start tag
+        while self.stack:
+            open_tag, flags = self.stack.pop()
+            for flag in flags:
+                if flag == "skip":
+                    self.skip_depth = max(0, self.skip_depth - 1)
+                elif flag == "container":
+                    self.containers.pop()
+                else:
+                    self.depth[flag] -= 1
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if self.skip_depth or self.done:
+            return
+        if self.depth["title"]:
+            self.title.append(data)
+        elif not self.depth["boiler"]:
+            self.current.append(data)
+            if self.depth["link"]:
+                self.link_chars += len(data.strip())
+
+    def _flush_line(self):
+        if not self.current:
+            self.link_chars = self.tag_count = 0
+            return
+        text = " ".join("".join(self.current).split())
+        link_chars, tag_count = self.link_chars, self.tag_count
+        self.current = []
+        self.link_chars = self.tag_count = 0
+        if not text:
+            return
+        heading = self.depth["heading"] > 0
+        link_density = min(1.0, link_chars / len(text))
+        score = 0.0
+        if not heading and len(text) >= 25 and link_density <= 0.5:
+            score = (1 + text.count(",") + min(len(text) // 100, 3)) * (1 - link_density)
+            if len(text) / (tag_count + 1) >= 40:
+                score *= 1.25  # High text-to-tag ratio: prose rather than markup-heavy widgets
+            if self.depth["content"]:
+                score *= 1.5
+            self.scores[self.containers[-1]] += score
+            if len(self.containers) > 1:
+                self.scores[self.containers[-2]] += score / 2
+        if heading or link_density <= 0.5:
+            self.blocks.append((text, tuple(self.containers), score, heading))
+            self.collected += len(text) + 1
+            if self.collected >= self.text_cap:
+                self.done = True
+
+    def get_text(self):
+        self._flush_line()
+        lines = []
+        if self.scores:
+            best = max(self.scores, key=self.scores.get)
+            lines = [text for text, containers, _, _ in self.blocks if best in containers]
+        if sum(len(line) for line in lines) < min(200, self.max_chars):
+            # No clear main container: fall back to every block that looks like prose
+            prose = [text for text, _, score, heading in self.blocks if score > 0 or heading]
+            if sum(len(line) for line in prose) > sum(len(line) for line in lines):
+                lines = prose
+            if not lines:
+                lines = [text for text, _, _, _ in self.blocks]
+        title = " ".join("".join(self.title).split())
+        if title and not any(title in line or line in title for line in lines[:3]):
+            lines.insert(0, title)
+        return "\n".join(lines)
+
+def _detect_encoding(content_type, head):
+    match = re.search(r'charset=([\w-]+)', content_type or "", re.IGNORECASE)
+    if match:
+        return match.group(1)
+    match = META_CHARSET.search(head)
+    if match:
+        return match.group(1).decode('ascii', errors='ignore')
+    return "utf-8"
+
+def _get_decoder(encoding):
+    try:
+        return codecs.getincrementaldecoder(encoding)(errors="replace")
+    except LookupError:
+        return codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+def extract_text_from_chunks(chunks, max_chars, content_type="text/html", max_bytes=MAX_DOWNLOAD_BYTES, mode="text"):
+    """Extract readable text from an iterable of byte chunks, reading at most max_bytes.
+    mode="article" returns the main content of HTML pages instead of all visible text."""
+    is_html = "html" in (content_type or "text/html").lower()
+    extractor = None
+    if is_html:
+        extractor = ArticleExtractor(max_chars) if mode == "article" else StreamingTextExtractor(max_chars)
+    plain = []
+    decoder = None
+    read = 0
+    for chunk in chunks:
+        if not chunk:
+            continue
+        chunk = chunk[:max_bytes - read]
+        read += len(chunk)
+        if decoder is None:
+            decoder = _get_decoder(_detect_encoding(content_type, chunk[:4096]))
+        text = decoder.decode(chunk)
+        if extractor is not None:
+            if extractor.feed_chunk(text):
+                break
+        else:
+            plain.append(text)
+            if sum(len(p) for p in plain) >= max_chars:
+                break
+        if read >= max_bytes:
+            break
+    if extractor is None:
+        text = "".join(plain)
+        return "\n".join(line.rstrip() for line in text.splitlines() if line.strip())
+    if decoder is not None and not extractor.done:
+        extractor.feed_chunk(decoder.decode(b"", final=True))
+        extractor.close()
+    return extractor.get_text()
+
+def check_content_type(content_type):
+    """Reject binary downloads (PDF, images, archives, ...) before reading the body"""
+    media_type = (content_type or "text/html").split(";")[0].strip().lower()
+    if media_type and not media_type.startswith("text/") and media_type not in TEXT_CONTENT_TYPES:
+        raise ExtractionError(f"unsupported content type '{media_type}'")
+
+def extract_response_text(response, max_chars, max_bytes=MAX_DOWNLOAD_BYTES, mode="text"):
+    """Stream a requests response opened with stream=True into readable text"""
+    content_type = response.headers.get("Content-Type", "text/html")
+    check_content_type(content_type)
+    try:
+        return extract_text_from_chunks(response.iter_content(CHUNK_SIZE), max_chars, content_type, max_bytes, mode)
+    finally:
+        response.close()
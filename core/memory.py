@@ -1,5 +1,18 @@
-import json
 import os
+import re
+import math
+import hashlib
+import threading
+from core.history_store import get_history_store
+from core.config import MEMORY_RETRIEVAL_MODE
+
+# BM25 ranking parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+_indexes = {}
+_indexes_lock = threading.Lock()
 
 def get_memory_file(character_name):
     safe_name = "".join(c for c in character_name if c.isalnum() or c in (' ', '_')).strip().replace(' ', '_')
@@ -9,27 +22,164 @@ def get_memory_file(character_name):
     os.makedirs(mem_dir, exist_ok=True)
     return os.path.join(mem_dir, f"long_term_memory_{safe_name}.json")
 
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+def fact_key(fact):
+    # Whitespace/case-insensitive content hash used for O(1) duplicate detection
+    return hashlib.sha1(" ".join(fact.lower().split()).encode('utf-8')).hexdigest()
+
+class MemoryIndex:
+    """In-process BM25 inverted index over a character's long-term memory facts.
+
+    Facts are persisted append-only (one JSONL line per new fact); the index is rebuilt
+    from them on first load and then updated incrementally.
+    """
+    def __init__(self, character_name):
+        self.character_name = character_name
+        memory_file = get_memory_file(character_name)
+        self.base_path = os.path.splitext(memory_file)[0]
+        self.store = get_history_store(self.base_path + ".jsonl", legacy_path=memory_file)
+        self.lock = threading.RLock()
+        self.semantic = None
+        self._reset_index()
+        for fact in self.store.load():
+            self._index_fact(fact)
+
+    def _reset_index(self):
+        self.facts = []
+        self.keys = {}  # content hash -> fact id
+        self.postings = {}  # term -> {fact_id: term frequency}
+        self.doc_lengths = []
+        self.total_length = 0
+
+    def _index_fact(self, fact):
+        if not isinstance(fact, str):
+            return False
+        key = fact_key(fact)
+        if key in self.keys:
+            return False
+        fact_id = len(self.facts)
+        tokens = tokenize(fact)
+        self.keys[key] = fact_id
+        self.facts.append(fact)
+        self.doc_lengths.append(len(tokens))
+        self.total_length += len(tokens)
+        for token in tokens:
+            postings = self.postings.setdefault(token, {})
+            postings[fact_id] = postings.get(fact_id, 0) + 1
+        return True
+
+    def add(self, fact):
+        with self.lock:
+            if not fact or not fact.strip() or not self._index_fact(fact):
+                return False
+            self.store.append(fact)
+            if self.semantic is not None:
+                self.semantic.enqueue([(fact_key(fact), fact)])
+            return True
+
+    def enable_semantic(self, embedder=None):
+        """Attach the embedding cache and embed any facts it has not seen yet in the background"""
+        with self.lock:
+            if self.semantic is None:
+                from core.semantic_memory import SemanticMemory
+                self.semantic = SemanticMemory(self.base_path, embedder=embedder)
+            self.semantic.enqueue([(key, self.facts[i]) for key, i in self.keys.items()])
+            return self.semantic
+
+    def replace_all(self, facts):
+        with self.lock:
+            self._reset_index()
+            for fact in facts:
+                self._index_fact(fact)
+            self.store.reset(self.facts)
+            if self.semantic is not None:
+                self.semantic.enqueue([(key, self.facts[i]) for key, i in self.keys.items()])
+
+    def search(self, query, k=10):
+        """Return up to k facts ranked by BM25 relevance to the query (newer facts win ties)"""
+        with self.lock:
+            if not self.facts:
+                return []
+            query_key = fact_key(query)
+            n_docs = len(self.facts)
+            avg_length = self.total_length / n_docs or 1.0
+            scores = {}
+            for token in set(tokenize(query)):
+                postings = self.postings.get(token)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for fact_id, tf in postings.items():
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[fact_id] / avg_length)
+                    scores[fact_id] = scores.get(fact_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norm)
+            ranked = sorted(scores.items(), key=lambda item: (item[1], item[0]), reverse=True)
+            # The message being answered is usually stored already; don't echo it back as a "fact"
+            return [self.facts[i] for i, _ in ranked if fact_key(self.facts[i]) != query_key][:k]
+
+    def semantic_search(self, query, k=10):
+        """Return up to k facts nearest to the query by embedding cosine similarity"""
+        semantic = self.semantic or self.enable_semantic()
+        query_key = fact_key(query)
+        hits = semantic.search(query, k + 1)
+        with self.lock:
+            return [self.facts[self.keys[key]] for key, _ in hits if key != query_key and key in self.keys][:k]
+
+    def unembedded(self):
+        """Hashes of facts the vector cache does not cover yet"""
+        semantic = self.semantic or self.enable_semantic()
+        with self.lock:
+            keys = list(self.keys)
+        return semantic.missing(keys)
+
+def get_memory_index(character_name):
+    with _indexes_lock:
+        index = _indexes.get(character_name)
+        if index is None:
+            index = MemoryIndex(character_name)
+            _indexes[character_name] = index
+        return index
+
 # Load long-term memory
 def load_long_term_memory(character_name):
-    file_path = get_memory_file(character_name)
-    if not os.path.exists(file_path):
-        return []
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return list(get_memory_index(character_name).facts)
     except Exception:
         return []
 
 # Save long-term memory
 def save_long_term_memory(character_name, memory):
-    file_path = get_memory_file(character_name)
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(memory, f, ensure_ascii=False, indent=2)
+    get_memory_index(character_name).replace_all(memory)
 
 # Add new fact to memory
 def add_fact_to_memory(character_name, fact):
-    memory = load_long_term_memory(character_name)
-    if fact not in memory:
-        memory.append(fact)
-        save_long_term_memory(character_name, memory)
-    return memory
+    index = get_memory_index(character_name)
+    index.add(fact)
+    return index.facts
+
+# Retrieve the facts most relevant to the current user input
+def get_relevant_facts(character_name, query, k=10, mode=None):
+    mode = mode or MEMORY_RETRIEVAL_MODE
+    try:
+        index = get_memory_index(character_name)
+        if mode == "semantic":
+            try:
+                facts = index.semantic_search(query, k)
+                missing = index.unembedded()
+                if facts and not missing:
+                    return facts
+                if facts:
+                    # Vectors are still being computed: facts without one are ranked by BM25 and
+                    # interleaved with the semantic hits until the cache covers every fact
+                    keyword = [fact for fact in index.search(query, len(index.facts)) if fact_key(fact) in missing][:k]
+                    merged = []
+                    for pair in zip(facts + [None] * len(keyword), keyword + [None] * len(facts)):
+                        merged.extend(fact for fact in pair if fact is not None and fact not in merged)
+                    return merged[:k]
+            except Exception as e:
+                print(f"[WARNING] Semantic memory unavailable, using keyword ranking: {e}")
+        return index.search(query, k)
+    except Exception as e:
+        print(f"[WARNING] Memory retrieval failed: {e}")
+        return []
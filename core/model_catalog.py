@@ -0,0 +1,242 @@
+# model_catalog.py
+# What the app knows about each local model: capabilities (vision, tools, ...), family,
+# parameter size, quantization, context length and size on disk. Collected from Ollama's
+# /api/tags and /api/show, or from the local manifest and config blob when the server is not
+# running. Entries are cached on disk and only re-read when a model's digest changes; lookups
+# are served from memory.
+import os
+import json
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from core.config import HISTORY_FILES_DIR, DEFAULT_MODELS_PATH
+
+MODEL_CATALOG_FILE = os.path.join(HISTORY_FILES_DIR, "model_catalog.json")
+DEFAULT_REGISTRY = "registry.ollama.ai"
+PROJECTOR_MEDIA_TYPE = "application/vnd.ollama.image.projector"
+MODEL_MEDIA_TYPE = "application/vnd.ollama.image.model"
+RAM_OVERHEAD = 1.2  # Weights plus KV cache and runtime buffers for a default-sized context
+SHOW_WORKERS = 4
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+def get_model_catalog():
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = ModelCatalog(MODEL_CATALOG_FILE)
+        return _catalog
+
+def default_models_dir():
+    return DEFAULT_MODELS_PATH or os.getenv('OLLAMA_MODELS') or os.path.join(os.path.expanduser("~"), ".ollama", "models")
+
+def manifest_path(models_dir, name):
+    """Manifest file of a model name like 'llama3.2:1b', 'user/model' or 'hf.co/org/repo:tag'"""
+    name, _, tag = name.partition(":")
+    parts = name.split("/")
+    if len(parts) == 1:
+        parts = [DEFAULT_REGISTRY, "library"] + parts
+    elif len(parts) == 2:
+        parts = [DEFAULT_REGISTRY] + parts
+    return os.path.join(models_dir, "manifests", *parts, tag or "latest")
+
+def _get(obj, name, default=None):
+    """Field of an ollama response object or a plain dict"""
+    if obj is None:
+        return default
+    value = getattr(obj, name, None)
+    if value is None and isinstance(obj, dict):
+        value = obj.get(name)
+    return default if value is None else value
+
+class ModelInfo:
+    def __init__(self, name, data):
+        self.name = name
+        self.data = data
+
+    @property
+    def digest(self):
+        return self.data.get('digest')
+
+    @property
+    def capabilities(self):
+        return self.data.get('capabilities') or []
+
+    def supports_vision(self):
+        return "vision" in self.capabilities
+
+    def get_family(self):
+        return self.data.get('family')
+
+    def get_parameter_size(self):
+        return self.data.get('parameter_size')
+
+    def get_quantization(self):
+        return self.data.get('quantization')
+
+    def get_context_length(self):
+        return self.data.get('context_length')
+
+    def get_size_gb(self):
+        size = self.data.get('size')
+        return round(size / 1024 ** 3, 1) if size else None
+
+    def get_ram_requirement(self):
+        """Estimated RAM in GB to run the model"""
+        size = self.data.get('size')
+        return round(size * RAM_OVERHEAD / 1024 ** 3, 1) if size else None
+
+    def describe(self):
+        lines = [f"Model: {self.name}"]
+        details = [value for value in (self.get_family(), self.get_parameter_size(), self.get_quantization()) if value]
+        if details:
+            lines.append("Details: " + " · ".join(details))
+        if self.get_context_length():
+            lines.append(f"Context length: {self.get_context_length()} tokens")
+        if self.get_size_gb():
+            lines.append(f"Size: {self.get_size_gb()} GB (needs ~{self.get_ram_requirement()} GB RAM)")
+        if self.capabilities:
+            lines.append("Capabilities: " + ", ".join(self.capabilities))
+        lines.append(f"Vision support: {'Yes' if self.supports_vision() else 'No'}")
+        return lines
+
+class ModelCatalog:
+    def __init__(self, path, models_dir=None):
+        self.path = path
+        self.models_dir = models_dir or default_models_dir()
+        self.lock = threading.Lock()
+        self.entries = self._load()  # name -> dict
+        self.stats = {"shows": 0, "manifests": 0, "reused": 0}
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+            return entries if isinstance(entries, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"[WARNING] Failed to load model catalog: {e}")
+            return {}
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def names(self):
+        with self.lock:
+            return list(self.entries)
+
+    def get(self, name):
+        """Cached info for a model (no network); falls back to its local manifest once"""
+        with self.lock:
+            data = self.entries.get(name)
+        if data is None:
+            data = self._from_manifest(name)
+            if data is None:
+                return None
+            with self.lock:
+                self.entries[name] = data
+        return ModelInfo(name, data)
+
+    def refresh(self):
+        """Sync with the server: /api/tags for the model list and digests, /api/show only for models
+        whose digest changed. Returns the model names; raises when Ollama is unreachable."""
+        from core.ollama_client import get_ollama_service
+        service = get_ollama_service()
+        listed = service.list().models
+        with self.lock:
+            current = dict(self.entries)
+        entries, changed = {}, []
+        for model in listed:
+            name = _get(model, 'model')
+            if not name:
+                continue
+            digest = _get(model, 'digest')
+            cached = current.get(name)
+            if cached and digest and cached.get('digest') == digest and cached.get('source') == "show":
+                entries[name] = cached
+                self.stats["reused"] += 1
+            else:
+                entries[name] = self._from_list(model)
+                changed.append(name)
+        if changed:
+            with ThreadPoolExecutor(max_workers=SHOW_WORKERS) as pool:
+                for name, shown in zip(changed, pool.map(lambda n: self._show(service, n), changed)):
+                    if shown:
+                        entries[name].update(shown)
+        with self.lock:
+            self.entries = entries
+            if changed or set(current) != set(entries):
+                self._save()
+        return list(entries)
+
+    def _from_list(self, model):
+        details = _get(model, 'details')
+        return {
+            'digest': _get(model, 'digest'),
+            'size': _get(model, 'size'),
+            'family': _get(details, 'family'),
+            'parameter_size': _get(details, 'parameter_size'),
+            'quantization': _get(details, 'quantization_level'),
+            'source': "tags",
+        }
+
+    def _show(self, service, name):
+        try:
+            response = service.show(name)
+        except Exception as e:
+            print(f"[WARNING] Could not read details of {name}: {e}")
+            return None
+        self.stats["shows"] += 1
+        details = _get(response, 'details')
+        model_info = _get(response, 'modelinfo') or _get(response, 'model_info') or {}
+        architecture = model_info.get('general.architecture')
+        context_length = model_info.get(f"{architecture}.context_length") if architecture else None
+        capabilities = list(_get(response, 'capabilities') or [])
+        if not capabilities and any(".vision." in key for key in model_info):
+            capabilities = ["completion", "vision"]  # Servers older than the capabilities field
+        result = {
+            'capabilities': capabilities,
+            'context_length': context_length,
+            'architecture': architecture,
+            'families': list(_get(details, 'families') or []),
+            'source': "show",
+        }
+        for key, field in (('family', 'family'), ('parameter_size', 'parameter_size'), ('quantization', 'quantization_level')):
+            value = _get(details, field)
+            if value:
+                result[key] = value
+        return result
+
+    def _from_manifest(self, name):
+        """Offline metadata from the model's manifest and config blob, if stored locally"""
+        path = manifest_path(self.models_dir, name)
+        try:
+            with open(path, 'rb') as f:
+                raw = f.read()
+            manifest = json.loads(raw)
+        except (OSError, ValueError):
+            return None
+        self.stats["manifests"] += 1
+        layers = manifest.get('layers') or []
+        data = {
+            # Ollama's model digest is the sha256 of the manifest, the same value /api/tags reports
+            'digest': hashlib.sha256(raw).hexdigest(),
+            'size': sum(layer.get('size', 0) for layer in layers) + (manifest.get('config') or {}).get('size', 0),
+            'capabilities': ["completion"] + (["vision"] if any(l.get('mediaType') == PROJECTOR_MEDIA_TYPE for l in layers) else []),
+            'source': "manifest",
+        }
+        config_digest = (manifest.get('config') or {}).get('digest', '')
+        try:
+            with open(os.path.join(self.models_dir, "blobs", config_digest.replace(":", "-")), 'r', encoding='utf-8') as f:
+                config = json.load(f)
+            data.update(family=config.get('model_family'), parameter_size=config.get('model_type'),
+                        quantization=config.get('file_type'))
+        except (OSError, ValueError):
+            pass
+        return data
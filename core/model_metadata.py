@@ -1,36 +1,25 @@
 # model_metadata.py
-# Модуль для отримання метаданих локальних моделей Ollama
-import os
-import json
-
-OLLAMA_MANIFESTS_DIR = os.path.join(os.path.dirname(__file__), '../../OLLama_Models/manifests')
+# Compatibility wrapper: model metadata now comes from the model catalog (core/model_catalog.py),
+# which reads Ollama's /api/show and local manifests instead of hand-written JSON files.
+from core.model_catalog import get_model_catalog
 
 class ModelMetadata:
     def __init__(self, model_name):
         self.model_name = model_name
-        self.metadata = self._load_metadata()
-
-    def _load_metadata(self):
-        manifest_path = os.path.join(OLLAMA_MANIFESTS_DIR, f'{self.model_name}.json')
-        if os.path.exists(manifest_path):
-            try:
-                with open(manifest_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception:
-                return {}
-        return {}
+        self.info = get_model_catalog().get(model_name)
+        self.metadata = dict(self.info.data) if self.info else {}
 
     def get_ram_requirement(self):
-        return self.metadata.get('ram', None)
+        return self.info.get_ram_requirement() if self.info else None
 
     def get_gpu_requirement(self):
-        return self.metadata.get('gpu', None)
+        return None  # Ollama does not report a GPU requirement; it offloads whatever fits
 
     def get_quantization(self):
         return self.metadata.get('quantization', None)
 
     def supports_vision(self):
-        return self.metadata.get('vision', False)
+        return self.info.supports_vision() if self.info else False
 
     def get_description(self):
         return self.metadata.get('description', '')
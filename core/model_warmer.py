@@ -0,0 +1,59 @@
+# model_warmer.py
+# Preloads the selected model in the background so the first real message does not pay
+# the model load time. Selecting another model supersedes (and unloads) the previous warm-up.
+import time
+import threading
+from core.ollama_client import get_ollama_service
+
+class ModelWarmer:
+    def __init__(self, on_status=None):
+        # on_status(model, state, detail) with state in "loading", "ready", "failed"
+        self.on_status = on_status or (lambda model, state, detail="": None)
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.current_model = None
+
+    def warm_up(self, model):
+        with self.lock:
+            if model == self.current_model:
+                return
+            self.generation += 1
+            token = self.generation
+            self.current_model = model
+        threading.Thread(target=self._run, args=(model, token), daemon=True).start()
+
+    def cancel(self):
+        with self.lock:
+            self.generation += 1
+            self.current_model = None
+
+    def _is_current(self, token):
+        with self.lock:
+            return token == self.generation
+
+    def _run(self, model, token):
+        self.on_status(model, "loading")
+        start = time.perf_counter()
+        service = get_ollama_service()
+        try:
+            # An empty prompt only loads the model; keep_alive keeps it resident afterwards
+            service.generate(model, prompt='')
+        except Exception as e:
+            with self.lock:
+                if token != self.generation:
+                    return
+                self.current_model = None  # Allow another attempt when the model is re-selected
+            self.on_status(model, "failed", str(e))
+            return
+        if not self._is_current(token):
+            # The user switched away while this model was loading: free its memory again
+            with self.lock:
+                still_selected = model == self.current_model
+            if not still_selected:
+                try:
+                    service.generate(model, prompt='', keep_alive=0)
+                except Exception:
+                    pass
+            print(f"[DEBUG] Warm-up of {model} superseded by another model selection")
+            return
+        self.on_status(model, "ready", f"{time.perf_counter() - start:.1f}s")
@@ -0,0 +1,154 @@
+# ollama_client.py
+# Single shared Ollama client for the whole app: one pooled HTTP connection set, configurable
+# timeouts and keep_alive, retry with backoff for connection failures, and latency/throughput
+# counters. Every module talks to Ollama through get_ollama_service().
+import time
+import threading
+from core.config import (DEFAULT_OLLAMA_HOST, OLLAMA_KEEP_ALIVE, OLLAMA_CONNECT_TIMEOUT,
+                         OLLAMA_READ_TIMEOUT, OLLAMA_MAX_RETRIES)
+
+RETRY_BACKOFF = 0.5  # Seconds before the first retry, doubled for every further attempt
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_ollama_service():
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = OllamaService()
+        return _service
+
+def _is_retryable(error):
+    import httpx
+    import ollama
+    if isinstance(error, ollama.ResponseError):
+        return error.status_code >= 500
+    # ollama raises ConnectionError when the server is unreachable
+    return isinstance(error, (ConnectionError, httpx.ConnectTimeout, httpx.RemoteProtocolError))
+
+class OllamaService:
+    def __init__(self, host=DEFAULT_OLLAMA_HOST, connect_timeout=OLLAMA_CONNECT_TIMEOUT,
+                 read_timeout=OLLAMA_READ_TIMEOUT, keep_alive=OLLAMA_KEEP_ALIVE, max_retries=OLLAMA_MAX_RETRIES):
+        self.lock = threading.Lock()
+        self.client = None
+        self.keep_alive = keep_alive
+        self.max_retries = max_retries
+        self.stats = {}
+        self.configure(host=host, connect_timeout=connect_timeout, read_timeout=read_timeout)
+
+    def configure(self, host=None, connect_timeout=None, read_timeout=None, keep_alive=None):
+        """(Re)create the underlying client, e.g. after the host was changed in Ollama Settings"""
+        # Imported here: ollama/httpx/pydantic take a noticeable share of app startup time
+        import httpx
+        import ollama
+        with self.lock:
+            self.host = host or getattr(self, 'host', DEFAULT_OLLAMA_HOST)
+            self.connect_timeout = connect_timeout or getattr(self, 'connect_timeout', OLLAMA_CONNECT_TIMEOUT)
+            self.read_timeout = read_timeout or getattr(self, 'read_timeout', OLLAMA_READ_TIMEOUT)
+            if keep_alive is not None:
+                self.keep_alive = keep_alive
+            old_client = self.client
+            self.client = ollama.Client(
+                host=self.host,
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(max_connections=8, max_keepalive_connections=4),
+            )
+        if old_client is not None:
+            try:
+                old_client._client.close()
+            except Exception:
+                pass
+
+    def _record(self, name, seconds, error=False, retries=0, response=None):
+        with self.lock:
+            stat = self.stats.setdefault(name, {
+                'calls': 0, 'errors': 0, 'retries': 0, 'total_seconds': 0.0, 'max_seconds': 0.0,
+                'eval_tokens': 0, 'eval_seconds': 0.0,
+            })
+            stat['calls'] += 1
+            stat['errors'] += int(error)
+            stat['retries'] += retries
+            stat['total_seconds'] += seconds
+            stat['max_seconds'] = max(stat['max_seconds'], seconds)
+            eval_count = getattr(response, 'eval_count', None) if response is not None else None
+            if eval_count:
+                stat['eval_tokens'] += eval_count
+                stat['eval_seconds'] += (getattr(response, 'eval_duration', 0) or 0) / 1e9
+
+    def get_stats(self):
+        """Per-call-type counters plus derived average latency and generation tokens/s"""
+        with self.lock:
+            result = {}
+            for name, stat in self.stats.items():
+                summary = dict(stat)
+                summary['avg_seconds'] = stat['total_seconds'] / stat['calls'] if stat['calls'] else 0.0
+                summary['tokens_per_second'] = stat['eval_tokens'] / stat['eval_seconds'] if stat['eval_seconds'] else 0.0
+                result[name] = summary
+            return result
+
+    def _call(self, name, func, *args, **kwargs):
+        start = time.perf_counter()
+        attempt = 0
+        while True:
+            try:
+                response = func(*args, **kwargs)
+                self._record(name, time.perf_counter() - start, retries=attempt, response=response)
+                return response
+            except Exception as e:
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    self._record(name, time.perf_counter() - start, error=True, retries=attempt)
+                    raise
+                delay = RETRY_BACKOFF * (2 ** attempt)
+                attempt += 1
+                print(f"[WARNING] Ollama {name} failed ({e}), retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+
+    def _stream(self, name, func, *args, **kwargs):
+        # Retries only cover opening the stream; once tokens flow a failure is reported to the caller
+        def open_stream():
+            stream = iter(func(*args, **kwargs))
+            return stream, next(stream, None)
+        start = time.perf_counter()
+        stream, first = self._call(name + "_open", open_stream)
+        last = first
+        try:
+            if first is not None:
+                yield first
+            for chunk in stream:
+                last = chunk
+                yield chunk
+        except GeneratorExit:
+            # The caller stopped reading (generation cancelled): close the HTTP stream so Ollama stops too
+            self._record(name, time.perf_counter() - start)
+            raise
+        except Exception:
+            self._record(name, time.perf_counter() - start, error=True)
+            raise
+        finally:
+            if hasattr(stream, 'close'):
+                stream.close()
+        self._record(name, time.perf_counter() - start, response=last)
+
+    def chat(self, model, messages, options=None, stream=False, keep_alive=None, **kwargs):
+        keep_alive = self.keep_alive if keep_alive is None else keep_alive
+        if stream:
+            return self._stream('chat', self.client.chat, model=model, messages=messages, options=options,
+                                stream=True, keep_alive=keep_alive, **kwargs)
+        return self._call('chat', self.client.chat, model=model, messages=messages, options=options,
+                          keep_alive=keep_alive, **kwargs)
+
+    def generate(self, model, prompt='', options=None, keep_alive=None, **kwargs):
+        keep_alive = self.keep_alive if keep_alive is None else keep_alive
+        return self._call('generate', self.client.generate, model=model, prompt=prompt, options=options,
+                          keep_alive=keep_alive, **kwargs)
+
+    def embed(self, model, texts, keep_alive=None):
+        keep_alive = self.keep_alive if keep_alive is None else keep_alive
+        return self._call('embed', self.client.embed, model=model, input=list(texts), keep_alive=keep_alive)
+
+    def list(self):
+        return self._call('list', self.client.list)
+
+    def show(self, model):
+        return self._call('show', self.client.show, model)
@@ -1,18 +1,49 @@
-import ollama
+import os
+import json
+from core.config import HISTORY_FILES_DIR
+from core.model_catalog import get_model_catalog
+
+MODEL_CACHE_FILE = os.path.join(HISTORY_FILES_DIR, "models_cache.json")
+FALLBACK_MODELS = ["llama3.2:1b", "qwen2.5:0.5b", "gemma2:2b"]
+MODEL_ERROR_MESSAGES = (
+    "Unexpected Ollama response format",
+    "No models found - check Ollama",
+    "Ollama server error - check connection",
+    "Unknown model error - see console for details",
+)
+
+def is_model_error(models):
+    return not models or models[0] in MODEL_ERROR_MESSAGES
+
+def load_cached_models():
+    """Model list saved by the last successful discovery (no network, used at startup)"""
+    names = get_model_catalog().names()
+    if names:
+        return names
+    try:
+        with open(MODEL_CACHE_FILE, 'r', encoding='utf-8') as f:
+            models = json.load(f)
+        return [m for m in models if isinstance(m, str)]
+    except Exception:
+        return []
+
+def save_cached_models(models):
+    try:
+        with open(MODEL_CACHE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(models, f, ensure_ascii=False, indent=2)
+    except Exception as e:
+        print(f"[WARNING] Failed to cache model list: {e}")
 
 def get_local_ollama_models():
+    import ollama
     try:
-        models_info = ollama.list()
-        if not isinstance(models_info.models, list):
-            return ["Unexpected Ollama response format"]
-        local_models = []
-        for model_obj in models_info.models:
-            if hasattr(model_obj, 'model'):
-                local_models.append(model_obj.model)
+        # Also reads capabilities/details of new or changed models into the catalog
+        local_models = get_model_catalog().refresh()
         if not local_models:
-            return ["No models found - check Ollama"]
+            return [MODEL_ERROR_MESSAGES[1]]
+        save_cached_models(local_models)
         return local_models
     except ollama.ResponseError:
-        return ["Ollama server error - check connection"]
+        return [MODEL_ERROR_MESSAGES[2]]
     except Exception:
-        return ["Unknown model error - see console for details"]
+        return [MODEL_ERROR_MESSAGES[3]]
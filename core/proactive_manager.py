@@ -1,6 +1,6 @@
 import threading
 import time
-import random
+import hashlib
 from datetime import datetime
 try:
     from plyer import notification
@@ -9,73 +9,238 @@ except ImportError:
     NOTIFICATIONS_AVAILABLE = False
     print("[WARNING] plyer not available - notifications disabled")
 
-import ollama
+from core.config import PROACTIVE_IDLE_SECONDS, PROACTIVE_IDLE_MAX_SECONDS
+from core.context_builder import ContextBuilder
+from core.ollama_client import get_ollama_service
+from core.generation_queue import PRIORITY_PROACTIVE, QueueFull
+from core.reminders import get_reminder_store, parse_reminder
+
+IDLE_PROMPT = (
+    "\n\nCurrent time is {time}. The user has been quiet for a while. You can initiate conversation if you want to. "
+    "Think about our previous context and maintain conversation continuity. Don't start new topics if we're already "
+    "discussing something. Don't forget what we talked about earlier. If you want to say something, continue our "
+    "current discussion. If there's nothing relevant to add right now, respond with 'NOTHING_TO_SAY'."
+)
+REMINDER_PROMPT = (
+    "\n\nCurrent time is {time}. The user asked you to remind them at this time: \"{text}\" "
+    "(their original message: \"{source}\"). Write the reminder as a short message in your own voice."
+)
+REMINDER_RETRY_SECONDS = 30  # Delay before a reminder the generation queue had no room for is tried again
 
 class ProactiveManager:
-    def __init__(self, app_ref):
+    """Event-driven proactive messages.
+
+    Reminders parsed from user messages wait in a heap and wake the thread exactly when due;
+    they fire whether or not idle messages are enabled ("Auto Messages"). Idle messages are attempted after PROACTIVE_IDLE_SECONDS of silence; every attempt doubles
+    the delay (up to PROACTIVE_IDLE_MAX_SECONDS) and a new user message resets it. An attempt
+    is skipped without calling the model when the conversation has not changed since the last one.
+    """
+    def __init__(self, app_ref, reminders=None):
         self.app = app_ref
         self.thread = None
         self.enabled = True
+        self.idle_enabled = True
+        # Own window: sharing the chat builder would move its window start with a different system
+        # prompt and break the stable prompt prefix of user turns
+        self.context_builder = ContextBuilder()
+        self.reminders = reminders if reminders is not None else get_reminder_store()
+        self.cond = threading.Condition()
+        self.idle_delay = PROACTIVE_IDLE_SECONDS
+        self.idle_at = time.monotonic() + self.idle_delay
+        self.last_signature = None  # Conversation state at the last idle attempt
+        self.stats = {"reminders_fired": 0, "idle_attempts": 0, "idle_skipped": 0, "nothing_to_say": 0, "messages": 0}
 
-    def start(self):
+    def start(self, idle=True):
+        """Start the timer thread; idle=False runs it for reminders only"""
         self.enabled = True
+        self.idle_enabled = idle
         if self.thread is None or not self.thread.is_alive():
             self.thread = threading.Thread(target=self.run, daemon=True)
             self.thread.start()
 
     def stop(self):
-        self.enabled = False
+        with self.cond:
+            self.enabled = False
+            self.cond.notify_all()
         if self.thread and self.thread.is_alive():
             self.thread.join(timeout=1.0)
 
+    def set_idle_enabled(self, enabled):
+        """Turn idle messages on or off; reminders keep firing either way"""
+        with self.cond:
+            self.idle_enabled = enabled
+            self.idle_delay = PROACTIVE_IDLE_SECONDS
+            self.idle_at = time.monotonic() + self.idle_delay
+            self.cond.notify_all()
+
+    def reset_context(self):
+        """Called when the history is cleared, restarted or imported"""
+        self.context_builder.reset()
+
+    def notify_user_message(self, text):
+        """Reset the idle backoff and schedule a reminder if the message asks for one.
+        Returns (due datetime, reminder text) or None."""
+        reminder = parse_reminder(text)
+        with self.cond:
+            if reminder:
+                self.reminders.add(reminder[0], reminder[1], text)
+            self.idle_delay = PROACTIVE_IDLE_SECONDS
+            self.idle_at = time.monotonic() + self.idle_delay
+            self.cond.notify_all()
+        return reminder
+
+    def _signature(self):
+        """Cheap fingerprint of what an idle attempt would see: history length, last message, summary"""
+        messages = self.app.snapshot_messages()[1]
+        last = messages[-1] if messages else {}
+        summarizer = getattr(self.app, 'summarizer', None)
+        summary_message = summarizer.get_summary_message() if summarizer else None
+        raw = f"{len(messages)}|{last.get('role')}|{last.get('content')}|{(summary_message or {}).get('content')}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
     def run(self):
-        time.sleep(15)
-        while self.enabled:
-            try:
-                time.sleep(random.randint(45, 90))
+        while True:
+            with self.cond:
                 if not self.enabled:
-                    break
-                    
-                if self.app.message_lock.acquire(blocking=False):
-                    try:
-                        if hasattr(self.app, 'is_processing') and self.app.is_processing:
-                            continue
-                        current_time = datetime.now().strftime("%H:%M")
-                        proactive_messages = [
-                            {'role': 'system', 'content': self.app.system_prompt + f"\n\nCurrent time is {current_time}. You can initiate conversation if you want to. If someone asked you to send a message at specific time, check if it matches current time and respond accordingly. For regular conversation, think about our previous context and maintain conversation continuity. Don't start new topics if we're already discussing something. Don't forget what we talked about earlier. If you want to say something, continue our current discussion. If there's nothing relevant to add right now and no time-based requests match current time, respond with 'NOTHING_TO_SAY'."},
-                        ]
-                        if hasattr(self.app, 'messages') and self.app.messages:
-                            proactive_messages.extend(self.app.messages[1:])
-                        response = ollama.chat(model=self.app.selected_model.get(), messages=proactive_messages, options={
-                            "temperature": 0.8,  # Use safe parameters for proactive messages
-                            "top_p": 0.9
-                        })
-                        potential_message = response['message']['content']
-                        
-                        # Enhanced filtering for empty/invalid proactive responses
-                        if (potential_message and 
-                            potential_message.strip() and  # Not empty or whitespace
-                            "NOTHING_TO_SAY" not in potential_message and
-                            len(potential_message.strip()) > 3):  # At least 4 characters
-                            
-                            print(f"[PROACTIVE] Generated message: {potential_message[:50]}...")
-                            self.app.messages.append({'role': 'assistant', 'content': potential_message})
-                            self.app.add_message_to_history(potential_message, "assistant")
-                            
-                            if NOTIFICATIONS_AVAILABLE:
-                                try:
-                                    notification.notify(
-                                        title=f"{self.app.char_name} said",
-                                        message=potential_message[:100] + "..." if len(potential_message) > 100 else potential_message,
-                                        app_icon=None,
-                                        timeout=10,
-                                    )
-                                except Exception as e:
-                                    print(f"[WARNING] Notification failed: {e}")
-                        else:
-                            print(f"[PROACTIVE] Filtered out invalid response: '{potential_message}'")
-                    finally:
-                        self.app.message_lock.release()
+                    return
+                now = time.time()
+                due = self.reminders.claim_due(now)
+                idle_due = self.idle_enabled and time.monotonic() >= self.idle_at
+                if not due and not idle_due:
+                    timeout = self.idle_at - time.monotonic() if self.idle_enabled else None
+                    next_reminder = self.reminders.next_due()
+                    if next_reminder is not None:
+                        timeout = next_reminder - now if timeout is None else min(timeout, next_reminder - now)
+                    # Sleep until the next reminder or idle trigger; user messages and stop() wake us early
+                    self.cond.wait(timeout=None if timeout is None else max(0.05, timeout))
+                    continue
+                if idle_due:
+                    # Exponential backoff: the next idle attempt is scheduled before this one runs
+                    self.idle_delay = min(self.idle_delay * 2, PROACTIVE_IDLE_MAX_SECONDS)
+                    self.idle_at = time.monotonic() + self.idle_delay
+            for reminder in due:
+                try:
+                    self._submit("reminder", lambda request, reminder=reminder: self._deliver_reminder(request, reminder),
+                                 on_dropped=lambda request, reminder=reminder: self._retry_reminder(reminder))
+                except QueueFull:
+                    print(f"[PROACTIVE] Generation queue full, reminder retried in {REMINDER_RETRY_SECONDS}s")
+                    self._retry_reminder(reminder)
+                except Exception as e:
+                    print(f"[ERROR] Proactive manager error: {e}")
+                    self._retry_reminder(reminder)
+            try:
+                if idle_due:
+                    self._idle_trigger()
             except Exception as e:
                 print(f"[ERROR] Proactive manager error: {e}")
-                time.sleep(60)  # Wait before retrying
+
+    def _submit(self, kind, func, on_dropped=None):
+        scheduler = getattr(self.app, 'scheduler', None)
+        if scheduler is None:
+            func(None)
+        else:
+            # Runs on the shared generation worker; any user message preempts it
+            scheduler.submit(kind, func, PRIORITY_PROACTIVE, coalesce=(kind == "proactive"), on_dropped=on_dropped)
+
+    def _retry_reminder(self, reminder):
+        """The reminder could not be queued or its request was dropped: try again later"""
+        with self.cond:
+            self.reminders.release(reminder, time.time() + REMINDER_RETRY_SECONDS)
+            self.cond.notify_all()
+
+    def _idle_trigger(self):
+        self.stats["idle_attempts"] += 1
+        if self._signature() == self.last_signature:
+            # Nothing happened since the last attempt, the model would have nothing new to say
+            self.stats["idle_skipped"] += 1
+            print(f"[PROACTIVE] No changes since last check, skipped (next in {self.idle_delay:.0f}s)")
+            return
+        scheduler = getattr(self.app, 'scheduler', None)
+        if getattr(self.app, 'is_processing', False) or (scheduler is not None and scheduler.has_pending()):
+            return
+        self._submit("proactive", self._idle_generate)
+
+    def _stream_reply(self, system_text, history, request):
+        """Generate a proactive message from `history`; None when a user message preempted it"""
+        proactive_system = [{'role': 'system', 'content': self.app.system_prompt + system_text}]
+        summarizer = getattr(self.app, 'summarizer', None)
+        summary_message = summarizer.get_summary_message() if summarizer else None
+        if summary_message:
+            proactive_system.append(summary_message)
+        proactive_messages = self.context_builder.build(history, proactive_system).messages
+        # Streamed so a user message can abort it; Tk variables must not be read off the UI thread
+        stream = get_ollama_service().chat(self.app.active_model, proactive_messages, options={
+            "temperature": 0.8,  # Use safe parameters for proactive messages
+            "top_p": 0.9
+        }, stream=True)
+        parts = []
+        try:
+            for chunk in stream:
+                parts.append(chunk['message']['content'])
+                if request is not None and request.cancelled:
+                    print("[PROACTIVE] Preempted by a user message")
+                    return None
+        finally:
+            stream.close()
+        return "".join(parts)
+
+    def _idle_generate(self, request):
+        if not self.enabled or not self.idle_enabled or (hasattr(self.app, 'is_processing') and self.app.is_processing):
+            return
+        with self.app.message_lock:
+            conversation, history = self.app.snapshot_messages()
+            potential_message = self._stream_reply(IDLE_PROMPT.format(time=datetime.now().strftime("%H:%M")), history, request)
+            if potential_message is None:
+                return
+
+            # Enhanced filtering for empty/invalid proactive responses
+            if (potential_message.strip() and  # Not empty or whitespace
+                "NOTHING_TO_SAY" not in potential_message and
+                len(potential_message.strip()) > 3):  # At least 4 characters
+                self._publish(potential_message, conversation)
+            else:
+                self.stats["nothing_to_say"] += 1
+                print(f"[PROACTIVE] Filtered out invalid response: '{potential_message}' (next check in {self.idle_delay:.0f}s)")
+            self.last_signature = self._signature()
+
+    def _deliver_reminder(self, request, reminder):
+        """Runs on the generation worker; the reminder stays in the store until it is published"""
+        due, _, text, source = reminder
+        with self.app.message_lock:
+            try:
+                message = self._stream_reply(REMINDER_PROMPT.format(
+                    time=datetime.now().strftime("%H:%M"), text=text, source=source),
+                    self.app.snapshot_messages()[1], request)
+            except Exception as e:
+                print(f"[WARNING] Reminder generation failed: {e}")
+                message = ""
+            if message is None:
+                # Preempted by the user: deliver it again right after their reply
+                with self.cond:
+                    self.reminders.release(reminder, time.time())
+                    self.cond.notify_all()
+                return
+            if len(message.strip()) <= 3 or "NOTHING_TO_SAY" in message:
+                message = f"⏰ Reminder: {text}"
+            self.stats["reminders_fired"] += 1
+            # A reminder is due whatever happened to the conversation: it goes into the current one
+            self._publish(message, self.app.snapshot_messages()[0])
+            self.reminders.complete(reminder)
+
+    def _publish(self, message, conversation):
+        print(f"[PROACTIVE] Generated message: {message[:50]}...")
+        if not self.app.store_message(conversation, {'role': 'assistant', 'content': message}):
+            return  # The history was cleared or replaced while generating
+        self.stats["messages"] += 1
+        self.app.add_message_to_history(message, "assistant")  # Posts itself to the UI thread
+
+        if NOTIFICATIONS_AVAILABLE:
+            try:
+                notification.notify(
+                    title=f"{self.app.char_name} said",
+                    message=message[:100] + "..." if len(message) > 100 else message,
+                    app_icon=None,
+                    timeout=10,
+                )
+            except Exception as e:
+                print(f"[WARNING] Notification failed: {e}")
@@ -10,3 +10,32 @@ class PromptManager:
 
     def get_prompt(self):
         return self.system_prompt
+
+PROMPT_LAYOUTS = ["Stable prefix", "Classic"]
+
+def format_system_prompt(prompt, prompt_format):
+    if prompt_format == "<|system|>":
+        return f"<|system|>\n{prompt}"
+    if prompt_format == "### System":
+        return f"### System\n{prompt}"
+    return prompt
+
+def build_turn_messages(builder, history, system_prompt, prompt_format="Plain", layout="Stable prefix",
+                        memory_text="", datetime_text="", summary_message=None, enrichment_messages=()):
+    """Assemble the messages for one turn.
+
+    "Stable prefix" keeps the first message byte-identical between turns (character prompt only)
+    and moves per-turn data - time, retrieved memory, web results - into a late system message,
+    so Ollama can reuse the KV cache of the unchanged prefix. "Classic" puts everything into the
+    first system message.
+    """
+    if layout == "Classic":
+        system_messages = [{'role': 'system', 'content': format_system_prompt(system_prompt + memory_text + "\n" + datetime_text, prompt_format)}]
+        late_messages = list(enrichment_messages)
+    else:
+        system_messages = [{'role': 'system', 'content': format_system_prompt(system_prompt, prompt_format)}]
+        turn_context = "\n".join(part for part in (datetime_text, memory_text.strip()) if part)
+        late_messages = ([{'role': 'system', 'content': turn_context}] if turn_context else []) + list(enrichment_messages)
+    if summary_message:
+        system_messages.append(summary_message)
+    return builder.build(history, system_messages, late_messages)
@@ -0,0 +1,168 @@
+# reminders.py
+# Timed reminders requested in chat ("remind me in 20 minutes to ...", "нагадай о 18:30 ...").
+# They are kept in a heap ordered by due time and persisted next to the chat histories, so the
+# proactive engine can sleep until exactly the next due reminder instead of polling the model.
+import os
+import re
+import json
+import heapq
+import threading
+from datetime import datetime, timedelta
+from core.config import HISTORY_FILES_DIR
+
+REMINDERS_FILE = os.path.join(HISTORY_FILES_DIR, "reminders.json")
+
+TRIGGER = re.compile(r'\b(remind|reminder)\b|нагада', re.IGNORECASE)
+# "message me", "напиши мені" ... only count when the time phrase follows right away ("text me in 10 minutes"),
+# so requests like "write me a poem about a man who wakes at 7:30" are not reminders
+ATTACHED_TRIGGER = re.compile(r'\b(ping|message|text)\s+me\s+(?=(in|at|tomorrow)\b)'
+                              r'|(напиши|повідом\w*)\s+мені\s+(?=(через|о|об|завтра)\b)', re.IGNORECASE)
+UNIT_SECONDS = [
+    (re.compile(r'^(sec|second|секунд)', re.IGNORECASE), 1),
+    (re.compile(r'^(m|min|minute|хв|хвилин)', re.IGNORECASE), 60),
+    (re.compile(r'^(h|hr|hour|год|годин)', re.IGNORECASE), 3600),
+    (re.compile(r'^(d|day|день|дні|днів)', re.IGNORECASE), 86400),
+]
+RELATIVE_TIME = re.compile(
+    r'\b(?:in|через)\s+(\d+(?:[.,]\d+)?|an?|one|half an?|пів)\s*'
+    r'(seconds?|secs?|minutes?|mins?|hours?|hrs?|days?|[mhd]\b|секунд\w*|хвилин\w*|хв\b|годин\w*|год\b|днів|день|дні)',
+    re.IGNORECASE)
+ABSOLUTE_TIME = re.compile(r'\b(?:at|о|об)\s+(\d{1,2})(?:[:.](\d{2}))?\s*(am|pm)?(?![\w:])', re.IGNORECASE)
+TOMORROW = re.compile(r'\b(tomorrow|завтра)\b', re.IGNORECASE)
+REQUEST_PREFIX = re.compile(r'^\W*(please\s+)?(can you\s+|could you\s+)?(remind|ping|message|text)\s+me\s*(to|that|about)?\s*'
+                            r'|^\W*(будь ласка\s+)?(нагадай|напиши|повідом)\w*\s*(мені)?\s*(про|щоб|що)?\s*', re.IGNORECASE)
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_reminder_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ReminderStore(REMINDERS_FILE)
+        return _store
+
+def _unit_seconds(unit):
+    for pattern, seconds in UNIT_SECONDS:
+        if pattern.match(unit):
+            return seconds
+    return None
+
+def parse_reminder(text, now=None):
+    """Return (due datetime, reminder text) for an explicit reminder request, else None"""
+    if not TRIGGER.search(text) and not ATTACHED_TRIGGER.search(text):
+        return None
+    now = now or datetime.now()
+    due, span = None, None
+    match = RELATIVE_TIME.search(text)
+    if match:
+        amount = match.group(1).lower().replace(',', '.')
+        if amount in ("a", "an", "one"):
+            value = 1.0
+        elif amount.startswith("half") or amount == "пів":
+            value = 0.5
+        else:
+            value = float(amount)
+        seconds = _unit_seconds(match.group(2))
+        if seconds:
+            due, span = now + timedelta(seconds=value * seconds), match.span()
+    if due is None:
+        match = ABSOLUTE_TIME.search(text)
+        # A bare "at 5" is too ambiguous; require minutes or am/pm
+        if match and (match.group(2) or match.group(3)):
+            hour, minute = int(match.group(1)), int(match.group(2) or 0)
+            meridiem = (match.group(3) or "").lower()
+            if meridiem == "pm" and hour < 12:
+                hour += 12
+            elif meridiem == "am" and hour == 12:
+                hour = 0
+            if hour < 24 and minute < 60:
+                due = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+                if TOMORROW.search(text):
+                    due += timedelta(days=1)
+                elif due <= now:
+                    due += timedelta(days=1)
+                span = match.span()
+    if due is None:
+        return None
+    what = (text[:span[0]] + text[span[1]:])
+    what = TOMORROW.sub("", what)
+    what = REQUEST_PREFIX.sub("", what.strip())
+    what = " ".join(what.split()).strip(" .,!?")
+    return due, what or text.strip()
+
+class ReminderStore:
+    """Due reminders are claimed rather than removed: a claimed reminder stays in the file until
+    complete() is called after it was delivered, so a full generation queue or closing the app
+    before delivery does not lose it."""
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.heap = []  # (due timestamp, seq, text, source message)
+        self.claimed = {}  # seq -> entry handed out by claim_due() and not yet completed
+        self.seq = 0
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for item in json.load(f):
+                    self.seq += 1
+                    self.heap.append((float(item['due']), self.seq, item['text'], item.get('source', '')))
+            heapq.heapify(self.heap)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"[WARNING] Failed to load reminders: {e}")
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump([{'due': due, 'text': text, 'source': source}
+                       for due, _, text, source in sorted(self.heap + list(self.claimed.values()))],
+                      f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def add(self, due, text, source=""):
+        """due is a datetime or a timestamp"""
+        timestamp = due.timestamp() if isinstance(due, datetime) else float(due)
+        with self.lock:
+            self.seq += 1
+            heapq.heappush(self.heap, (timestamp, self.seq, text, source))
+            self._save()
+
+    def next_due(self):
+        with self.lock:
+            return self.heap[0][0] if self.heap else None
+
+    def claim_due(self, now):
+        """Take every reminder due at `now` (a timestamp) off the heap; each returned
+        (due, seq, text, source) entry must be passed to complete() or release()"""
+        due = []
+        with self.lock:
+            while self.heap and self.heap[0][0] <= now:
+                entry = heapq.heappop(self.heap)
+                self.claimed[entry[1]] = entry
+                due.append(entry)
+        return due
+
+    def complete(self, entry):
+        """The reminder was delivered: forget it"""
+        with self.lock:
+            if self.claimed.pop(entry[1], None) is not None:
+                self._save()
+
+    def release(self, entry, retry_at=None):
+        """Delivery did not happen: put the reminder back, due again at `retry_at` (default: its own time)"""
+        with self.lock:
+            if self.claimed.pop(entry[1], None) is None:
+                return
+            timestamp = entry[0] if retry_at is None else retry_at
+            heapq.heappush(self.heap, (timestamp,) + tuple(entry[1:]))
+            if retry_at is not None:
+                self._save()
+
+    def __len__(self):
+        with self.lock:
+            return len(self.heap) + len(self.claimed)
@@ -0,0 +1,323 @@
+# search_index.py
+# Full-text search over everything said in the app: chat histories and the chat log are
+# ingested incrementally into an SQLite FTS5 index, which answers word, "phrase" and prefix*
+# queries filtered by character and date. index_existing() bulk-loads older files.
+#
+#     python -m core.search_index            # index existing histories and logs
+#     python -m core.search_index "query"    # search from the command line
+import os
+import re
+import sys
+import glob
+import gzip
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime
+from core.config import HISTORY_FILES_DIR
+
+SEARCH_INDEX_FILE = os.path.join(HISTORY_FILES_DIR, "search.sqlite3")
+INDEXED_ROLES = ("user", "assistant")
+LEGACY_LOG_LINE = re.compile(r'^\[(\d{1,2}:\d{2}(?::\d{2})?)\] (\w+): (.*)$')
+QUERY_TOKEN = re.compile(r'"([^"]*)"|(\S+)')
+
+_index = None
+_index_lock = threading.Lock()
+
+def get_search_index():
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SearchIndex(SEARCH_INDEX_FILE)
+        return _index
+
+def _digest(role, text, extra=""):
+    return hashlib.sha1(f"{role}\x00{extra}\x00{text}".encode('utf-8')).hexdigest()
+
+def _history_digest(record):
+    """Identity of a saved history record: role and content only, since one history file is
+    shared by every character"""
+    if not isinstance(record, dict):
+        return _digest(None, record)
+    return _digest(record.get('role'), record.get('content'))
+
+def _indexable(record):
+    return (isinstance(record, dict) and record.get('role') in INDEXED_ROLES
+            and isinstance(record.get('content'), str) and record.get('content').strip())
+
+def to_fts_query(query):
+    """Turn user input into a safe FTS5 expression: words and "quoted phrases" must all match,
+    a trailing * makes a word a prefix query"""
+    terms = []
+    for phrase, word in QUERY_TOKEN.findall(query):
+        if phrase:
+            words = re.findall(r'\w+', phrase)
+            if words:
+                terms.append('"' + " ".join(words) + '"')
+            continue
+        prefix = word.endswith("*")
+        words = re.findall(r'\w+', word)
+        if not words:
+            continue
+        # Punctuation inside a word ("don't", "e-mail") becomes a phrase of its parts
+        term = '"' + " ".join(words) + '"'
+        terms.append(term + "*" if prefix else term)
+    return " ".join(terms)
+
+def parse_date(value, end=False):
+    """'YYYY-MM-DD' (or empty) to a timestamp; end=True gives the end of that day"""
+    if not value:
+        return None
+    day = datetime.strptime(value.strip(), "%Y-%m-%d")
+    return day.timestamp() + (86400 if end else 0)
+
+class SearchResult:
+    def __init__(self, character, role, ts, source, snippet, text):
+        self.character = character
+        self.role = role
+        self.ts = ts
+        self.source = source
+        self.snippet = snippet
+        self.text = text
+
+    @property
+    def when(self):
+        return datetime.fromtimestamp(self.ts).strftime("%Y-%m-%d %H:%M") if self.ts else "?"
+
+class SearchIndex:
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS messages (
+                id INTEGER PRIMARY KEY, source TEXT NOT NULL, key TEXT NOT NULL, character TEXT,
+                role TEXT, ts REAL, text TEXT NOT NULL, UNIQUE(source, key));
+            CREATE INDEX IF NOT EXISTS messages_character_ts ON messages(character, ts);
+            CREATE TABLE IF NOT EXISTS days (day INTEGER PRIMARY KEY, min_id INTEGER, max_id INTEGER);
+            CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+                text, content='messages', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3');
+            CREATE TABLE IF NOT EXISTS sources (source TEXT PRIMARY KEY, count INTEGER, last_digest TEXT);
+        """)
+        self.db.commit()
+
+    def _insert(self, source, key, character, role, ts, text):
+        cursor = self.db.execute("INSERT OR IGNORE INTO messages (source, key, character, role, ts, text) "
+                                 "VALUES (?, ?, ?, ?, ?, ?)", (source, key, character, role, ts, text))
+        if cursor.rowcount == 1:
+            self.db.execute("INSERT INTO messages_fts (rowid, text) VALUES (?, ?)", (cursor.lastrowid, text))
+            return cursor.lastrowid
+        return None
+
+    def _occurrences(self, source, digest):
+        return self.db.execute("SELECT COUNT(*) FROM messages WHERE source = ? AND key >= ? AND key < ?",
+                               (source, digest + ":", digest + ";")).fetchone()[0]
+
+    def _add(self, source, items, seen=None):
+        """items: (digest, character, role, ts, text). Keys are digest:occurrence, so indexing the same
+        records again is a no-op. Without `seen` numbering continues from the rows the source already
+        has; with it numbering starts from scratch (a full pass over a log file)."""
+        added = 0
+        days = {}  # day -> [min id, max id] of the rows added now
+        for digest, character, role, ts, text in items:
+            if seen is None:
+                occurrence = self._occurrences(source, digest)
+            else:
+                occurrence = seen.get(digest, 0)
+                seen[digest] = occurrence + 1
+            rowid = self._insert(source, f"{digest}:{occurrence}", character, role, ts, text)
+            if rowid is not None:
+                added += 1
+                span = days.setdefault(int(ts // 86400), [rowid, rowid])
+                span[0], span[1] = min(span[0], rowid), max(span[1], rowid)
+        self.db.executemany("INSERT INTO days VALUES (?, ?, ?) ON CONFLICT(day) DO UPDATE SET "
+                            "min_id = MIN(min_id, excluded.min_id), max_id = MAX(max_id, excluded.max_id)",
+                            [(day, low, high) for day, (low, high) in days.items()])
+        return added
+
+    def add_history(self, source, character, records, ts=None):
+        """Index a saved message list. Like HistoryStore.sync only records past the ones already
+        indexed for `source` are looked at; a message keeps the character it was first indexed with.
+        After restart_history() (Clear, import), or when the last indexed record no longer matches,
+        the list is indexed as a new session with numbering continued from the existing rows, so
+        a repeated "hi" in it is not mistaken for the one already stored."""
+        ts = ts or time.time()
+        with self.lock:
+            row = self.db.execute("SELECT count, last_digest FROM sources WHERE source = ?", (source,)).fetchone()
+            count, last_digest = row if row else (0, None)
+            if count > len(records) or (count and _history_digest(records[count - 1]) != last_digest):
+                count = 0
+            items = [(_history_digest(r), character, r['role'], ts, r['content'])
+                     for r in records[count:] if _indexable(r)]
+            added = self._add(source, items)
+            self.db.execute("INSERT OR REPLACE INTO sources VALUES (?, ?, ?)",
+                            (source, len(records), _history_digest(records[-1]) if records else None))
+            self.db.commit()
+        return added
+
+    def restart_history(self, source):
+        """The list saved to `source` was replaced; its next add_history() starts a new session"""
+        with self.lock:
+            self.db.execute("DELETE FROM sources WHERE source = ?", (source,))
+            self.db.commit()
+
+    def add_log_records(self, records, source="log", seen=None):
+        """Index ChatLogger records ({'ts', 'role', 'text', 'character', ...})"""
+        items = []
+        for record in records:
+            text = record.get('text')
+            if record.get('role') not in INDEXED_ROLES or not isinstance(text, str) or not text.strip():
+                continue
+            try:
+                ts = datetime.fromisoformat(record['ts']).timestamp()
+            except (KeyError, TypeError, ValueError):
+                ts = time.time()
+            items.append((_digest(record['role'], text, record.get('ts', '')), record.get('character'),
+                          record['role'], ts, text))
+        if not items:
+            return 0
+        with self.lock:
+            added = self._add(source, items, seen)
+            self.db.commit()
+        return added
+
+    def search(self, query, character=None, since=None, until=None, limit=50):
+        """Newest matches first; since/until are timestamps. Messages found both in a history
+        file and in the log are returned once.
+
+        Results are read in descending rowid order straight from the FTS index and stop at the
+        limit, so common words cost no more than rare ones."""
+        expression = to_fts_query(query)
+        if not expression:
+            return []
+        sql = ("SELECT m.character, m.role, m.ts, m.source, snippet(messages_fts, 0, '[', ']', '…', 16), m.text "
+               "FROM messages_fts JOIN messages m ON m.id = messages_fts.rowid WHERE messages_fts MATCH ?")
+        params = [expression]
+        if character:
+            sql += " AND m.character = ?"
+            params.append(character)
+        if since is not None:
+            sql += " AND m.ts >= ?"
+            params.append(since)
+        if until is not None:
+            sql += " AND m.ts < ?"
+            params.append(until)
+        sql += " ORDER BY messages_fts.rowid DESC LIMIT ?"
+        params.append(limit * 3)
+        with self.lock:
+            if since is not None or until is not None:
+                # Narrow the index scan to the rowids stored on the days of that period
+                low, high = self.db.execute("SELECT MIN(min_id), MAX(max_id) FROM days WHERE day >= ? AND day <= ?",
+                                            (int(since // 86400) if since is not None else -2 ** 62,
+                                             int(until // 86400) if until is not None else 2 ** 62)).fetchone()
+                if low is None:
+                    return []
+                sql = sql.replace(" ORDER BY", " AND messages_fts.rowid BETWEEN ? AND ? ORDER BY")
+                params[-1:-1] = [low, high]
+            rows = self.db.execute(sql, params).fetchall()
+        results, seen = [], set()
+        for row in rows:
+            identity = (row[0], row[1], row[5])
+            if identity in seen:
+                continue
+            seen.add(identity)
+            results.append(SearchResult(*row))
+            if len(results) >= limit:
+                break
+        return results
+
+    def characters(self):
+        with self.lock:
+            return [row[0] for row in self.db.execute(
+                "SELECT DISTINCT character FROM messages WHERE character IS NOT NULL AND character != '' ORDER BY character")]
+
+    def count(self):
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+
+    def index_existing(self, history_dir=HISTORY_FILES_DIR, log_dir='', progress=None):
+        """Bulk-index existing history files and chat logs; safe to run repeatedly"""
+        added = 0
+        paths = sorted(glob.glob(os.path.join(history_dir, "chat_history_*.jsonl")) +
+                       glob.glob(os.path.join(history_dir, "chat_history_*.json")))
+        paths += [p for p in (os.path.join(history_dir, "last_session.jsonl"),) if os.path.exists(p)]
+        for path in paths:
+            character = None  # last_session.jsonl is shared by all characters
+            if os.path.basename(path).startswith("chat_history_"):
+                character = re.sub(r'^chat_history_|\.jsonl?$', '', os.path.basename(path)).replace('_', ' ')
+            records = _read_history_file(path)
+            added += self.add_history(os.path.basename(path), character, records, ts=os.path.getmtime(path))
+            if progress:
+                progress(path, added)
+        log_paths = sorted(glob.glob(os.path.join(log_dir or '.', "chat-*.jsonl*")))
+        log_paths += [p for p in (os.path.join(log_dir or '.', "chat.jsonl"),) if os.path.exists(p)]
+        for path in log_paths:
+            seen = {}  # Numbering restarts per file pass, matching incremental ingestion
+            for batch in _read_log_batches(path):
+                added += self.add_log_records(batch, seen=seen)
+            if progress:
+                progress(path, added)
+        legacy_log = os.path.join(log_dir or '.', "chat.log")
+        if os.path.exists(legacy_log):
+            added += self.add_log_records(_read_legacy_log(legacy_log), source="chat.log", seen={})
+            if progress:
+                progress(legacy_log, added)
+        return added
+
+def _read_history_file(path):
+    if path.endswith(".jsonl"):
+        from core.history_store import HistoryStore
+        return HistoryStore(path).load()
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            records = json.load(f)
+        return records if isinstance(records, list) else []
+    except Exception:
+        return []
+
+def _read_log_batches(path, batch_size=5000):
+    opener = gzip.open if path.endswith(".gz") else open
+    batch = []
+    with opener(path, 'rt', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(record, dict):
+                batch.append(record)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+def _read_legacy_log(path):
+    """Lines of the old plain-text chat.log ("[HH:MM] ROLE: text") dated by the file's mtime"""
+    day = datetime.fromtimestamp(os.path.getmtime(path)).strftime("%Y-%m-%d")
+    records = []
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            match = LEGACY_LOG_LINE.match(line.rstrip("\n"))
+            if match:
+                clock = match.group(1) if match.group(1).count(":") == 2 else match.group(1) + ":00"
+                records.append({'ts': f"{day}T{clock.zfill(8)}", 'role': match.group(2).lower(), 'text': match.group(3)})
+    return records
+
+if __name__ == "__main__":
+    index = get_search_index()
+    if len(sys.argv) > 1:
+        start = time.perf_counter()
+        results = index.search(" ".join(sys.argv[1:]))
+        for result in results:
+            print(f"{result.when}  {result.character or '-'} / {result.role}: {result.snippet}")
+        print(f"{len(results)} results in {(time.perf_counter() - start) * 1000:.1f} ms")
+    else:
+        total = index.index_existing(progress=lambda path, added: print(f"{path}: {added} new messages so far"))
+        print(f"Indexed {total} new messages, {index.count()} in total")
@@ -0,0 +1,160 @@
+# semantic_memory.py
+# Embedding-based retrieval for long-term memory. Each fact is embedded once (keyed by its
+# content hash) and stored as a row of a memory-mapped float32 .npy matrix next to the
+# character's long-term memory file.
+import os
+import time
+import threading
+from core.config import EMBEDDING_MODEL
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+    print("[WARNING] numpy not available - semantic memory disabled")
+
+EMBED_BATCH_SIZE = 16
+MIN_CAPACITY = 64
+EMBED_RETRY_DELAY = 2.0  # Seconds before retrying a failed batch, doubled on every further failure
+EMBED_MAX_RETRIES = 5  # After this many failures in a row the worker stops; the next enqueue() restarts it
+
+def ollama_embedder(texts, model=EMBEDDING_MODEL):
+    """Embed a batch of texts through the local Ollama embeddings API"""
+    from core.ollama_client import get_ollama_service
+    return get_ollama_service().embed(model, texts)['embeddings']
+
+class SemanticMemory:
+    """Vector cache for one character: `<base>.npy` holds unit-length rows and
+    `<base>.emb.keys` lists the fact hash of each row (first line records the model)."""
+    def __init__(self, base_path, embedder=None, model=EMBEDDING_MODEL, batch_size=EMBED_BATCH_SIZE,
+                 retry_delay=EMBED_RETRY_DELAY):
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("numpy is required for semantic memory")
+        self.vectors_path = base_path + ".npy"
+        self.keys_path = base_path + ".emb.keys"
+        self.model = model
+        self.embedder = embedder or (lambda texts: ollama_embedder(texts, model=self.model))
+        self.batch_size = batch_size
+        self.retry_delay = retry_delay
+        self.lock = threading.RLock()
+        self.matrix = None
+        self.row_keys = []
+        self.rows = {}  # fact hash -> row index
+        self._pending = {}  # fact hash -> text waiting to be embedded
+        self._worker = None  # Set while a worker runs; cleared by the worker under the lock when it exits
+        self._load()
+
+    def _load(self):
+        if not (os.path.exists(self.vectors_path) and os.path.exists(self.keys_path)):
+            return
+        try:
+            with open(self.keys_path, 'r', encoding='utf-8') as f:
+                header = f.readline().strip()
+                keys = [line.strip() for line in f if line.strip()]
+            if header != f"#model={self.model}":
+                print(f"[INFO] Embedding model changed ({header}), rebuilding vector cache")
+                return
+            self.matrix = np.load(self.vectors_path, mmap_mode='r+')
+            # Rows are written before their keys, so the key list bounds the valid rows
+            self.row_keys = keys[:self.matrix.shape[0]]
+            self.rows = {key: i for i, key in enumerate(self.row_keys)}
+        except Exception as e:
+            print(f"[WARNING] Failed to load vector cache {self.vectors_path}: {e}")
+            self.matrix, self.row_keys, self.rows = None, [], {}
+
+    def _ensure_capacity(self, needed, dim):
+        if self.matrix is not None and self.matrix.shape[1] != dim:
+            print("[WARNING] Embedding dimension changed, rebuilding vector cache")
+            self.matrix, self.row_keys, self.rows = None, [], {}
+        if self.matrix is not None and self.matrix.shape[0] >= needed:
+            return
+        capacity = max(MIN_CAPACITY, needed * 2)
+        tmp_path = self.vectors_path + ".tmp.npy"
+        grown = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=(capacity, dim))
+        count = len(self.row_keys)
+        if count:
+            grown[:count] = self.matrix[:count]
+        grown.flush()
+        del grown
+        self.matrix = None  # Release the old mapping before replacing the file
+        os.replace(tmp_path, self.vectors_path)
+        self.matrix = np.load(self.vectors_path, mmap_mode='r+')
+        if not count:
+            with open(self.keys_path, 'w', encoding='utf-8') as f:
+                f.write(f"#model={self.model}\n")
+
+    def _store(self, keys, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.maximum(norms, 1e-12)
+        with self.lock:
+            start = len(self.row_keys)
+            self._ensure_capacity(start + len(keys), vectors.shape[1])
+            start = len(self.row_keys)
+            self.matrix[start:start + len(keys)] = vectors
+            self.matrix.flush()
+            with open(self.keys_path, 'a', encoding='utf-8') as f:
+                f.write("".join(key + "\n" for key in keys))
+            for offset, key in enumerate(keys):
+                self.rows[key] = start + offset
+            self.row_keys.extend(keys)
+
+    def enqueue(self, items):
+        """Queue (fact_hash, text) pairs for background embedding; cached hashes are skipped"""
+        with self.lock:
+            for key, text in items:
+                if key not in self.rows:
+                    self._pending[key] = text
+            if self._pending and self._worker is None:
+                self._worker = threading.Thread(target=self._run, daemon=True)
+                self._worker.start()
+
+    def missing(self, keys):
+        """The subset of fact hashes that have no vector yet"""
+        with self.lock:
+            return {key for key in keys if key not in self.rows}
+
+    def _run(self):
+        failures = 0
+        while True:
+            with self.lock:
+                batch = list(self._pending.items())[:self.batch_size]
+                if not batch or failures >= EMBED_MAX_RETRIES:
+                    # Cleared under the lock, so an enqueue() racing with this exit starts a new worker
+                    self._worker = None
+                    return
+            try:
+                vectors = self.embedder([text for _, text in batch])
+                self._store([key for key, _ in batch], vectors)
+            except Exception as e:
+                # Failed facts stay pending and are retried with backoff
+                failures += 1
+                print(f"[WARNING] Embedding batch failed ({failures}/{EMBED_MAX_RETRIES}): {e}")
+                if failures < EMBED_MAX_RETRIES:
+                    time.sleep(self.retry_delay * 2 ** (failures - 1))
+                continue
+            failures = 0
+            with self.lock:
+                for key, _ in batch:
+                    self._pending.pop(key, None)
+
+    def wait(self, timeout=None):
+        worker = self._worker
+        if worker is not None:
+            worker.join(timeout)
+
+    def search(self, query, k=10):
+        """Return [(fact_hash, cosine score)] for the k nearest stored facts"""
+        with self.lock:
+            count = len(self.row_keys)
+            if not count:
+                return []
+        query_vector = np.asarray(self.embedder([query])[0], dtype=np.float32)
+        query_vector /= max(float(np.linalg.norm(query_vector)), 1e-12)
+        with self.lock:
+            scores = self.matrix[:count] @ query_vector
+            k = min(k, count)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(self.row_keys[i], float(scores[i])) for i in top]
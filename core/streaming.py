@@ -0,0 +1,37 @@
+# streaming.py
+import threading
+
+class StreamBuffer:
+    """Coalesces streamed text chunks from a worker thread so the UI can drain them in batches."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = []
+        self._parts = []
+        self.finished = False
+
+    def push(self, text):
+        if not text:
+            return
+        with self._lock:
+            self._pending.append(text)
+            self._parts.append(text)
+
+    def drain(self):
+        with self._lock:
+            if not self._pending:
+                return ""
+            text = "".join(self._pending)
+            self._pending = []
+            return text
+
+    def finish(self):
+        with self._lock:
+            self.finished = True
+
+    def is_done(self):
+        with self._lock:
+            return self.finished and not self._pending
+
+    def get_text(self):
+        with self._lock:
+            return "".join(self._parts)
@@ -0,0 +1,156 @@
+# summarizer.py
+# Rolling summary of conversation turns that no longer fit into the context window.
+# The summary is extended incrementally (previous summary + newly evicted turns) by the local
+# model as a background job on the generation worker and cached next to the chat history files.
+import os
+import json
+import hashlib
+import threading
+from core.config import HISTORY_FILES_DIR, SUMMARY_TRIGGER_TOKENS
+from core.context_builder import estimate_tokens
+from core.generation_queue import PRIORITY_BACKGROUND, QueueFull
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a conversation between the user and {char_name}. "
+    "Update the previous summary with the new messages. Keep names, facts about the user, "
+    "decisions, promises and open questions; drop small talk. Answer with the summary only, "
+    "at most 200 words."
+)
+
+def get_summary_file(character_name):
+    safe_name = "".join(c for c in character_name if c.isalnum() or c in (' ', '_')).strip().replace(' ', '_')
+    if not safe_name:
+        safe_name = "default_character"
+    os.makedirs(HISTORY_FILES_DIR, exist_ok=True)
+    return os.path.join(HISTORY_FILES_DIR, f"summary_{safe_name}.json")
+
+def message_key(message):
+    return hashlib.sha1(f"{message.get('role')}:{message.get('content')}".encode('utf-8')).hexdigest()
+
+def default_chat(model, messages, request=None):
+    """Non-streamed reply; with a generation `request` it is streamed and None once cancelled"""
+    from core.ollama_client import get_ollama_service
+    if request is None:
+        return get_ollama_service().chat(model, messages, options={"temperature": 0.2})['message']['content']
+    stream = get_ollama_service().chat(model, messages, options={"temperature": 0.2}, stream=True)
+    parts = []
+    try:
+        for chunk in stream:
+            parts.append(chunk['message']['content'])
+            if request.cancelled:
+                return None
+    finally:
+        stream.close()
+    return "".join(parts)
+
+class ConversationSummarizer:
+    def __init__(self, char_name, chat_fn=None, scheduler=None, trigger_tokens=SUMMARY_TRIGGER_TOKENS):
+        self.char_name = char_name
+        self.chat_fn = chat_fn or default_chat  # chat_fn(model, messages, request) -> text, None if cancelled
+        self.scheduler = scheduler  # GenerationScheduler; without one summaries run on a daemon thread
+        self.trigger_tokens = trigger_tokens
+        self.summary_file = get_summary_file(char_name)
+        self.lock = threading.Lock()
+        self.running = False  # A summary job is queued or running
+        self.summary = ""
+        self.covered = 0  # Number of oldest history messages folded into the summary
+        self.last_key = None  # Key of the last covered message, detects cleared/replaced histories
+        self.generation = 0  # Bumped by reset(), so a summary started before it is discarded
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.summary_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.summary = data.get('summary', '')
+            self.covered = int(data.get('covered', 0))
+            self.last_key = data.get('last_key')
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"[WARNING] Failed to load conversation summary: {e}")
+
+    def _save(self):
+        tmp_path = self.summary_file + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'summary': self.summary, 'covered': self.covered, 'last_key': self.last_key}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.summary_file)
+
+    def reset(self):
+        """Forget the summary; called when the history is cleared, restarted or imported"""
+        with self.lock:
+            self.summary, self.covered, self.last_key = "", 0, None
+            self.generation += 1
+            try:
+                self._save()
+            except Exception as e:
+                print(f"[WARNING] Failed to save conversation summary: {e}")
+
+    def get_summary_message(self):
+        with self.lock:
+            if not self.summary:
+                return None
+            return {'role': 'system', 'content': "Summary of the earlier conversation:\n" + self.summary}
+
+    def observe(self, dropped, model):
+        """Called after each context build with the messages that were evicted from the prompt"""
+        with self.lock:
+            if self.covered and (self.covered > len(dropped) or message_key(dropped[self.covered - 1]) != self.last_key):
+                # History was cleared, restarted or imported: the old summary no longer applies
+                self.summary, self.covered, self.last_key = "", 0, None
+                self._save()
+            pending = dropped[self.covered:]
+            if not pending or sum(estimate_tokens(m) for m in pending) < self.trigger_tokens:
+                return
+            if self.running:
+                return
+            self.running = True
+            job = lambda request, args=(list(pending), self.covered, self.generation, model): self._summarize(request, *args)
+        if self.scheduler is None:
+            threading.Thread(target=job, args=(None,), daemon=True).start()
+            return
+        try:
+            # Lowest priority on the shared worker: never competes with a reply the user is waiting for
+            self.scheduler.submit("summary", job, PRIORITY_BACKGROUND, on_dropped=lambda request: self._finished())
+        except QueueFull:
+            self._finished()  # Tried again after the next turn
+
+    def _finished(self):
+        with self.lock:
+            self.running = False
+
+    def _summarize(self, request, pending, start, generation, model):
+        try:
+            self._update(request, pending, start, generation, model)
+        finally:
+            self._finished()
+
+    def _update(self, request, pending, start, generation, model):
+        transcript = "\n".join(f"{m.get('role')}: {m.get('content')}" for m in pending)
+        with self.lock:
+            previous = self.summary
+        try:
+            summary = self.chat_fn(model, [
+                {'role': 'system', 'content': SUMMARY_PROMPT.format(char_name=self.char_name)},
+                {'role': 'user', 'content': f"Previous summary:\n{previous or '(none)'}\n\nNew messages:\n{transcript}"},
+            ], request)
+        except Exception as e:
+            print(f"[WARNING] Conversation summary failed: {e}")
+            return
+        if summary is None:
+            print("[INFO] Conversation summary preempted, retried after the next turn")
+            return
+        summary = summary.strip()
+        if not summary:
+            return
+        with self.lock:
+            if self.covered != start or self.generation != generation:
+                return  # History was reset while we were summarizing
+            self.summary = summary
+            self.covered = start + len(pending)
+            self.last_key = message_key(pending[-1])
+            try:
+                self._save()
+            except Exception as e:
+                print(f"[WARNING] Failed to save conversation summary: {e}")
+        print(f"[INFO] Conversation summary updated ({self.covered} messages summarized)")
@@ -0,0 +1,181 @@
+# telemetry.py
+# Per-turn performance metrics: Ollama's own timing fields (load, prompt evaluation, generation)
+# plus the app-side stages that precede generation (memory retrieval, web enrichment, context
+# building) and the web cache lookups of the turn. Turns are stored in SQLite so latencies can be
+# compared per model and character.
+import os
+import math
+import time
+import sqlite3
+import threading
+from core.config import HISTORY_FILES_DIR
+
+METRICS_FILE = os.path.join(HISTORY_FILES_DIR, "metrics.sqlite3")
+MAX_TURNS = 20000  # Oldest turns are pruned beyond this
+SUMMARY_TURNS = 1000  # Most recent turns per model/character used for the percentiles
+
+COLUMNS = [
+    "ts", "model", "character", "stream", "cancelled",
+    "prompt_tokens", "eval_tokens", "load_ms", "prompt_eval_ms", "eval_ms", "total_ms",
+    "ttft_ms", "wall_ms", "memory_ms", "enrichment_ms", "context_ms",
+    "web_cache_hits", "web_cache_lookups",
+]
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_metrics_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = MetricsStore(METRICS_FILE)
+        return _store
+
+def _field(response, name):
+    """Read a field from an ollama response object or a plain dict"""
+    if response is None:
+        return None
+    value = getattr(response, name, None)
+    if value is None and isinstance(response, dict):
+        value = response.get(name)
+    return value
+
+def _ms(nanoseconds):
+    return nanoseconds / 1e6 if nanoseconds else None
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of an unsorted list"""
+    values = sorted(v for v in values if v is not None)
+    if not values:
+        return None
+    index = min(len(values) - 1, max(0, math.ceil(fraction * len(values)) - 1))
+    return values[index]
+
+class TurnMetrics:
+    """Timings of one assistant turn; stage durations are filled in as the turn progresses"""
+    def __init__(self, model, character, stream):
+        self.values = dict.fromkeys(COLUMNS)
+        self.values.update(ts=time.time(), model=model, character=character, stream=int(bool(stream)), cancelled=0)
+        self.start = time.perf_counter()
+        self.generation_start = None
+
+    def stage(self, name, seconds):
+        self.values[name + "_ms"] = seconds * 1000
+
+    def web_cache(self, before, after):
+        """Web cache counters (WebCache.counters()) taken before and after the turn's enrichment"""
+        delta = {name: after[name] - before.get(name, 0) for name in after}
+        self.values["web_cache_hits"] = delta["hits"] + delta["revalidated"]
+        self.values["web_cache_lookups"] = delta["hits"] + delta["stale"] + delta["misses"]
+
+    def generation_started(self):
+        self.generation_start = time.perf_counter()
+
+    def first_token(self):
+        """Called when the first streamed token arrives"""
+        if self.values["ttft_ms"] is None and self.generation_start is not None:
+            self.values["ttft_ms"] = (time.perf_counter() - self.generation_start) * 1000
+
+    def finish(self, response, cancelled=False):
+        """Take Ollama's timing fields from the final (or non-streamed) response"""
+        self.values.update(
+            cancelled=int(bool(cancelled)),
+            prompt_tokens=_field(response, "prompt_eval_count"),
+            eval_tokens=_field(response, "eval_count"),
+            load_ms=_ms(_field(response, "load_duration")),
+            prompt_eval_ms=_ms(_field(response, "prompt_eval_duration")),
+            eval_ms=_ms(_field(response, "eval_duration")),
+            total_ms=_ms(_field(response, "total_duration")),
+            wall_ms=(time.perf_counter() - self.start) * 1000,
+        )
+        if self.values["ttft_ms"] is None and self.values["prompt_eval_ms"] is not None:
+            # Not streamed: the server-side time before the first token is model load + prompt evaluation
+            self.values["ttft_ms"] = (self.values["load_ms"] or 0) + self.values["prompt_eval_ms"]
+
+    @property
+    def tokens_per_second(self):
+        if self.values["eval_tokens"] and self.values["eval_ms"]:
+            return self.values["eval_tokens"] / (self.values["eval_ms"] / 1000)
+        return None
+
+    def describe(self):
+        """Short status line, e.g. '38.2 tok/s · first token 0.41s · prompt 812 tok'"""
+        parts = []
+        if self.tokens_per_second:
+            parts.append(f"{self.tokens_per_second:.1f} tok/s")
+        if self.values["ttft_ms"] is not None:
+            parts.append(f"first token {self.values['ttft_ms'] / 1000:.2f}s")
+        if self.values["prompt_tokens"]:
+            parts.append(f"prompt {self.values['prompt_tokens']} tok")
+        if self.values["load_ms"] and self.values["load_ms"] > 500:
+            parts.append(f"model load {self.values['load_ms'] / 1000:.1f}s")
+        return " · ".join(parts)
+
+class MetricsStore:
+    def __init__(self, path, max_turns=MAX_TURNS):
+        self.path = path
+        self.max_turns = max_turns
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("CREATE TABLE IF NOT EXISTS turns (id INTEGER PRIMARY KEY, %s)" % ", ".join(
+            f"{name} {'TEXT' if name in ('model', 'character') else 'REAL'}" for name in COLUMNS))
+        existing = {row[1] for row in self.db.execute("PRAGMA table_info(turns)")}
+        for name in COLUMNS:
+            if name not in existing:  # Column added after the database was created
+                self.db.execute(f"ALTER TABLE turns ADD COLUMN {name} REAL")
+        self.db.execute("CREATE INDEX IF NOT EXISTS turns_model_character ON turns(model, character, id)")
+        self.db.commit()
+
+    def record(self, metrics):
+        values = metrics.values if isinstance(metrics, TurnMetrics) else metrics
+        with self.lock:
+            self.db.execute("INSERT INTO turns (%s) VALUES (%s)" % (", ".join(COLUMNS), ", ".join("?" * len(COLUMNS))),
+                            [values.get(name) for name in COLUMNS])
+            self.db.execute("DELETE FROM turns WHERE id <= (SELECT MAX(id) FROM turns) - ?", (self.max_turns,))
+            self.db.commit()
+
+    def summary(self, limit=SUMMARY_TURNS):
+        """p50/p95 per (model, character) over the most recent completed turns"""
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT model, character, ttft_ms, wall_ms, eval_tokens, eval_ms, prompt_eval_ms, memory_ms, enrichment_ms, "
+                "web_cache_hits, web_cache_lookups FROM turns WHERE cancelled = 0 ORDER BY id DESC").fetchall()
+        groups = {}
+        for row in rows:
+            group = groups.setdefault((row[0], row[1]), [])
+            if len(group) < limit:
+                group.append(row)
+        result = []
+        for (model, character), group in sorted(groups.items(), key=lambda item: (item[0][0] or "", item[0][1] or "")):
+            columns = list(zip(*group))
+            rates = [tokens / (ms / 1000) for tokens, ms in zip(columns[4], columns[5]) if tokens and ms]
+            entry = {"model": model, "character": character, "turns": len(group),
+                     "web_cache_hits": int(sum(v or 0 for v in columns[9])),
+                     "web_cache_lookups": int(sum(v or 0 for v in columns[10]))}
+            for name, values in (("ttft_ms", columns[2]), ("wall_ms", columns[3]), ("tokens_per_second", rates),
+                                 ("prompt_eval_ms", columns[6]), ("memory_ms", columns[7]), ("enrichment_ms", columns[8])):
+                entry[name] = {"p50": percentile(values, 0.5), "p95": percentile(values, 0.95)}
+            result.append(entry)
+        return result
+
+    def format_summary(self, limit=SUMMARY_TURNS):
+        def cell(stat, scale=1.0, fmt="{:.2f}"):
+            if stat["p50"] is None:
+                return "-"
+            return f"{fmt.format(stat['p50'] * scale)} / {fmt.format(stat['p95'] * scale)}"
+        lines = []
+        for entry in self.summary(limit):
+            lines.append(f"{entry['model']} · {entry['character']} ({entry['turns']} turns)")
+            lines.append(f"  first token (s)   p50/p95: {cell(entry['ttft_ms'], 0.001)}")
+            lines.append(f"  full turn (s)     p50/p95: {cell(entry['wall_ms'], 0.001)}")
+            lines.append(f"  prompt eval (s)   p50/p95: {cell(entry['prompt_eval_ms'], 0.001)}")
+            lines.append(f"  tokens/s          p50/p95: {cell(entry['tokens_per_second'], fmt='{:.1f}')}")
+            lines.append(f"  memory (ms)       p50/p95: {cell(entry['memory_ms'], fmt='{:.0f}')}")
+            lines.append(f"  web fetch (s)     p50/p95: {cell(entry['enrichment_ms'], 0.001)}")
+            if entry["web_cache_lookups"]:
+                lines.append(f"  web cache hits:   {entry['web_cache_hits']} of {entry['web_cache_lookups']} lookups "
+                             f"({100.0 * entry['web_cache_hits'] / entry['web_cache_lookups']:.0f}%)")
+            lines.append("")
+        return "\n".join(lines) if lines else "No turns recorded yet."
@@ -1,13 +1,139 @@
 # vision_manager.py
+# Images attached for vision models are decoded once, downscaled to the model's native input
+# resolution and re-encoded as JPEG. Results are cached on disk by content hash, so re-sending
+# or re-attaching the same picture costs nothing. Only the turn an image was attached on sends
+# its pixels; after that turn is answered the image is captioned in the background, and later
+# turns (or a text-only model the user switches to) get that caption instead.
+# In "caption" mode the pixels never reach the chat model: one vision call per image writes a
+# detailed caption (cached by content hash + captioning model) that every turn gets instead,
+# so a small text model can be paired with an occasional vision pass.
 import os
+import io
+import json
+import hashlib
+import threading
+from core.config import (HISTORY_FILES_DIR, VISION_MAX_SIDE, VISION_JPEG_QUALITY, VISION_MODE,
+                         VISION_CAPTION_MODEL)
+
+# Pillow is imported on first use to keep app startup fast
+_pil = None  # (Image, ImageOps) once imported, False when Pillow is missing
+
+def _load_pil():
+    global _pil
+    if _pil is None:
+        try:
+            from PIL import Image, ImageOps
+            _pil = (Image, ImageOps)
+        except ImportError:
+            _pil = False
+            print("[WARNING] Pillow not available - images are sent to vision models without downscaling")
+    return _pil or None
+
+def pil_available():
+    return _load_pil() is not None
+
+VISION_CACHE_DIR = os.path.join(HISTORY_FILES_DIR, "vision_cache")
+VISION_MODES = ["pixels", "caption"]
+CAPTION_PROMPT = (
+    "Describe this image in detail so that someone who cannot see it can answer questions about it: "
+    "the main subject, people and what they do, objects, any visible text (quoted exactly), colors, "
+    "layout and setting. Be factual and do not guess beyond what is visible."
+)
+DEFAULT_MAX_SIDE = 1024
+# Longest image side the vision encoder of each model family works at; larger inputs are
+# downscaled by Ollama anyway, so sending more pixels only costs transfer and decode time
+NATIVE_RESOLUTION = [
+    ("llama3.2-vision", 1120),
+    ("llava", 672),
+    ("bakllava", 672),
+    ("moondream", 378),
+    ("minicpm-v", 1344),
+    ("gemma3", 896),
+    ("qwen2.5vl", 1024),
+    ("granite3.2-vision", 768),
+]
+
+def native_max_side(model):
+    if VISION_MAX_SIDE:
+        return VISION_MAX_SIDE
+    name = (model or "").lower()
+    for family, side in NATIVE_RESOLUTION:
+        if family in name:
+            return side
+    return DEFAULT_MAX_SIDE
+
+def attached_images(message):
+    return (message.get('images') or []) + ([message['image']] if message.get('image') else [])
+
+def image_reference(message):
+    """Text that stands in for the images of an earlier turn"""
+    names = [os.path.basename(path) for path in attached_images(message)]
+    return "\n[Image shared earlier: " + ", ".join(names) + "]" if names else ""
+
+class CaptionCache:
+    """Captions keyed by image content hash + captioning model, persisted as JSON"""
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.captions = json.load(f)
+        except FileNotFoundError:
+            self.captions = {}
+        except Exception as e:
+            print(f"[WARNING] Failed to load image captions: {e}")
+            self.captions = {}
+
+    def get(self, digest, model):
+        with self.lock:
+            return self.captions.get(f"{digest}:{model}")
+
+    def find(self, digest, model=None):
+        """Caption by `model` if there is one, else a caption of the same image by any model"""
+        with self.lock:
+            caption = self.captions.get(f"{digest}:{model}")
+            if caption is None:
+                prefix = digest + ":"
+                caption = next((text for key, text in self.captions.items() if key.startswith(prefix)), None)
+            return caption
+
+    def put(self, digest, model, caption):
+        with self.lock:
+            self.captions[f"{digest}:{model}"] = caption
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.captions, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+
+class PreparedImage:
+    def __init__(self, path, digest, width, height, original_bytes):
+        self.path = path  # File sent to Ollama
+        self.digest = digest  # sha256 of the original file content
+        self.width = width
+        self.height = height
+        self.original_bytes = original_bytes
+
+    @property
+    def size_bytes(self):
+        return os.path.getsize(self.path)
+
 class VisionManager:
     def select_image_dialog(self):
         import tkinter.filedialog
-        filetypes = [("Image files", "*.png;*.jpg;*.jpeg;*.bmp;*.gif")]
+        filetypes = [("Image files", "*.png;*.jpg;*.jpeg;*.bmp;*.gif;*.webp")]
         path = tkinter.filedialog.askopenfilename(title="Select image for Vision", filetypes=filetypes)
         return self.select_image(path)
-    def __init__(self):
+    def __init__(self, cache_dir=VISION_CACHE_DIR, mode=VISION_MODE, caption_model=VISION_CAPTION_MODEL):
         self.image_path = None
+        self.cache_dir = cache_dir
+        self.mode = mode if mode in VISION_MODES else "pixels"
+        self.caption_model = caption_model  # Empty: caption with the chat model itself
+        self.captions = CaptionCache(os.path.join(cache_dir, "captions.json"))
+        self.digests = {}  # (path, mtime, size) -> content hash, so earlier turns are not re-hashed
+        self.lock = threading.Lock()
+        self.stats = {"prepared": 0, "cache_hits": 0, "bytes_in": 0, "bytes_out": 0,
+                      "captions_generated": 0, "captions_reused": 0}
 
     def select_image(self, path):
         if path and os.path.exists(path):
@@ -21,3 +147,155 @@ class VisionManager:
 
     def get_image(self):
         return self.image_path
+
+    def _digest(self, path):
+        stat = os.stat(path)
+        key = (path, stat.st_mtime, stat.st_size)
+        digest = self.digests.get(key)
+        if digest is None:
+            with open(path, 'rb') as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+            self.digests[key] = digest
+        return digest
+
+    def prepare(self, path, model=None):
+        """Downscale and re-encode an image for `model`; returns a PreparedImage"""
+        with open(path, 'rb') as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        pil = _load_pil()
+        if pil is None:
+            return PreparedImage(path, digest, None, None, len(data))
+        Image, ImageOps = pil
+        max_side = native_max_side(model)
+        cached_path = os.path.join(self.cache_dir, f"{digest[:40]}_{max_side}.jpg")
+        with self.lock:
+            self.stats["bytes_in"] += len(data)
+            if os.path.exists(cached_path):
+                self.stats["cache_hits"] += 1
+                with Image.open(cached_path) as cached:
+                    width, height = cached.size
+                return PreparedImage(cached_path, digest, width, height, len(data))
+        image = Image.open(io.BytesIO(data))
+        if image.format == "JPEG":
+            # Let the JPEG decoder scale by 1/2..1/8 while decoding instead of producing all 12 MP
+            image.draft("RGB", (max_side, max_side))
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+        image.thumbnail((max_side, max_side), Image.LANCZOS, reducing_gap=2.0)
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=VISION_JPEG_QUALITY)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = cached_path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(buffer.getvalue())
+        os.replace(tmp_path, cached_path)
+        with self.lock:
+            self.stats["prepared"] += 1
+            self.stats["bytes_out"] += buffer.tell()
+        return PreparedImage(cached_path, digest, image.width, image.height, len(data))
+
+    def caption(self, path, model=None, request=None):
+        """Detailed caption of an image, generated once per (content, captioning model).
+        With a generation `request` the reply is streamed and None is returned once it is cancelled."""
+        from core.ollama_client import get_ollama_service
+        caption_model = self.caption_model or model
+        digest = self._digest(path)
+        cached = self.captions.get(digest, caption_model)
+        if cached is not None:
+            self.stats["captions_reused"] += 1
+            return cached
+        prepared = self.prepare(path, caption_model)
+        messages = [{'role': 'user', 'content': CAPTION_PROMPT, 'images': [prepared.path]}]
+        if request is None:
+            text = get_ollama_service().chat(caption_model, messages, options={"temperature": 0.2})['message']['content']
+        else:
+            stream = get_ollama_service().chat(caption_model, messages, options={"temperature": 0.2}, stream=True)
+            parts = []
+            try:
+                for chunk in stream:
+                    parts.append(chunk['message']['content'])
+                    if request.cancelled:
+                        return None
+            finally:
+                stream.close()
+            text = "".join(parts)
+        text = text.strip()
+        if text:
+            self.captions.put(digest, caption_model, text)
+            self.stats["captions_generated"] += 1
+        return text
+
+    def cached_caption(self, path, model=None):
+        try:
+            return self.captions.find(self._digest(path), self.caption_model or model)
+        except OSError:
+            return None
+
+    def caption_missing(self, paths, model=None, request=None):
+        """Caption the images that have no caption yet; run after the turn that sent their pixels.
+        Stops when `request` is cancelled, so a user message does not wait for the remaining images."""
+        for path in paths:
+            if request is not None and request.cancelled:
+                print("[INFO] Image captioning preempted, remaining captions are made when next needed")
+                return
+            if self.cached_caption(path, model) is not None:
+                continue
+            try:
+                self.caption(path, model, request)
+            except Exception as e:
+                print(f"[WARNING] Could not caption image {path}: {e}")
+
+    def _caption_reference(self, message, model, generate):
+        parts = []
+        for path in attached_images(message):
+            name = os.path.basename(path)
+            try:
+                # Any cached caption of the image is reused before a new one is generated
+                text = self.cached_caption(path, model)
+                if text is None and generate:
+                    text = self.caption(path, model)
+            except Exception as e:
+                print(f"[WARNING] Could not caption image {path}: {e}")
+                text = None
+            parts.append(f"\n[Image {name}: {text}]" if text else f"\n[Image shared earlier: {name}]")
+        return "".join(parts)
+
+    def messages_for_turn(self, history, model=None, vision=True):
+        """Copy of history where only the latest user turn carries image data.
+
+        In "pixels" mode messages of that turn get their attached images preprocessed into
+        'images', and images of earlier turns are replaced by their cached caption or a short
+        reference. In "caption" mode, or when the chat model has no vision (`vision=False`),
+        every image is replaced by its caption."""
+        turn_start = len(history)
+        while turn_start > 0 and history[turn_start - 1].get('role') == 'user':
+            turn_start -= 1
+        # Captions are generated on demand when they replace the pixels (a text-only model can only
+        # get them from a separate captioning model); earlier turns in pixels mode reuse cached ones
+        generate = (self.mode == "caption" or not vision) and (vision or bool(self.caption_model))
+        result = []
+        for index, message in enumerate(history):
+            if not message.get('image') and not message.get('images'):
+                result.append(message)
+                continue
+            content = message.get('content') or ''
+            if self.mode == "caption" or not vision or index < turn_start:
+                reference = self._caption_reference(message, model, generate=generate)
+                result.append({'role': message['role'], 'content': content + reference})
+                continue
+            images = []
+            for path in attached_images(message):
+                try:
+                    images.append(self.prepare(path, model).path)
+                except Exception as e:
+                    print(f"[WARNING] Could not prepare image {path}: {e}")
+            result.append({'role': message['role'], 'content': content, 'images': images} if images
+                          else {'role': message['role'], 'content': content})
+        return result
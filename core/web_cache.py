@@ -0,0 +1,159 @@
+# web_cache.py
+# Persistent SQLite cache for web_tools: stores already-cleaned page text and search snippets
+# keyed by normalized URL/query, revalidates with ETag/Last-Modified, honors Cache-Control
+# and evicts least-recently-used entries once the cache exceeds its size limit.
+import os
+import re
+import time
+import sqlite3
+import threading
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from core.config import HISTORY_FILES_DIR, WEB_CACHE_TTL, WEB_CACHE_MAX_MB
+
+WEB_CACHE_FILE = os.path.join(HISTORY_FILES_DIR, "web_cache.sqlite3")
+TRACKING_PARAMS = re.compile(r'^(utm_\w+|fbclid|gclid|yclid|mc_eid|ref_src)$')
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_web_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = WebCache(WEB_CACHE_FILE)
+        return _cache
+
+def normalize_url(url):
+    parts = urlsplit(url.strip())
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not TRACKING_PARAMS.match(k))
+    netloc = parts.netloc.lower()
+    if (parts.scheme == "http" and netloc.endswith(":80")) or (parts.scheme == "https" and netloc.endswith(":443")):
+        netloc = netloc.rsplit(":", 1)[0]
+    return urlunsplit((parts.scheme.lower(), netloc, parts.path or "/", urlencode(query), ""))
+
+def normalize_query(query):
+    return " ".join(query.lower().split())
+
+def parse_cache_control(headers, default_ttl):
+    """Return the TTL in seconds for a response, or None when it must not be stored"""
+    directives = {}
+    for part in (headers.get("Cache-Control") or "").lower().split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name] = value.strip('"')
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0  # Stored, but revalidated before every use
+    for name in ("s-maxage", "max-age"):
+        if directives.get(name, "").isdigit():
+            return int(directives[name])
+    return default_ttl
+
+class CacheEntry:
+    def __init__(self, content, etag, last_modified, expires):
+        self.content = content
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires = expires
+
+    @property
+    def fresh(self):
+        return time.time() < self.expires
+
+    def conditional_headers(self):
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+class WebCache:
+    def __init__(self, path, max_bytes=WEB_CACHE_MAX_MB * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "stale": 0, "revalidated": 0, "stores": 0, "evictions": 0}
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""CREATE TABLE IF NOT EXISTS entries (
+            key TEXT PRIMARY KEY, content TEXT NOT NULL, etag TEXT, last_modified TEXT,
+            expires REAL NOT NULL, last_access REAL NOT NULL, size INTEGER NOT NULL)""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries(last_access)")
+        self.db.commit()
+        self.total_bytes = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def get(self, key):
+        """Return the stored entry (fresh or stale) and count a hit/stale/miss"""
+        with self.lock:
+            row = self.db.execute("SELECT content, etag, last_modified, expires FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            entry = CacheEntry(*row)
+            self.stats["hits" if entry.fresh else "stale"] += 1
+            self.db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self.db.commit()
+            return entry
+
+    def put(self, key, content, ttl, etag=None, last_modified=None):
+        size = len(content.encode('utf-8'))
+        now = time.time()
+        with self.lock:
+            old = self.db.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            self.db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            (key, content, etag, last_modified, now + ttl, now, size))
+            self.total_bytes += size - (old[0] if old else 0)
+            self.stats["stores"] += 1
+            self._evict()
+            self.db.commit()
+
+    def refresh(self, key, ttl):
+        """Extend an entry after a 304 Not Modified response"""
+        with self.lock:
+            now = time.time()
+            self.db.execute("UPDATE entries SET expires = ?, last_access = ? WHERE key = ?", (now + ttl, now, key))
+            self.db.commit()
+            self.stats["revalidated"] += 1
+
+    def delete(self, key):
+        with self.lock:
+            row = self.db.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            if row:
+                self.db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self.db.commit()
+                self.total_bytes -= row[0]
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes:
+            rows = self.db.execute("SELECT key, size FROM entries ORDER BY last_access LIMIT 32").fetchall()
+            if not rows:
+                self.total_bytes = 0
+                return
+            for key, size in rows:
+                self.db.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self.total_bytes -= size
+                self.stats["evictions"] += 1
+                if self.total_bytes <= self.max_bytes:
+                    return
+
+    def clear(self):
+        with self.lock:
+            self.db.execute("DELETE FROM entries")
+            self.db.commit()
+            self.total_bytes = 0
+
+    def counters(self):
+        """Copy of the hit/miss counters, e.g. to measure the lookups of one turn"""
+        with self.lock:
+            return dict(self.stats)
+
+    def describe(self):
+        with self.lock:
+            s = self.stats
+            lookups = s["hits"] + s["stale"] + s["misses"]
+            rate = 100.0 * s["hits"] / lookups if lookups else 0.0
+            return (f"hits={s['hits']} misses={s['misses']} stale={s['stale']} revalidated={s['revalidated']} "
+                    f"hit_rate={rate:.0f}% size={self.total_bytes / 1024:.0f}KB")
@@ -1,41 +1,186 @@
-import requests
 import re
-from bs4 import BeautifulSoup
+import json
+import threading
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from core.config import WEB_REQUEST_TIMEOUT, WEB_CACHE_TTL, WEB_SEARCH_CACHE_TTL, WEB_EXTRACTION_MODE
+from core.web_cache import get_web_cache, normalize_url, normalize_query, parse_cache_control
+from core.html_extract import extract_response_text
 
-def google_search(query, api_key, cse_id, num_results=3):
+# requests is imported on first use to keep app startup fast
+
+_session = None
+_session_lock = threading.Lock()
+
+GITHUB_URL = re.compile(r'^/([^/]+)/([^/]+?)(?:\.git)?(?:/(blob|tree|raw)/([^/]+)(?:/(.*))?)?/?$')
+GITHUB_RESERVED_OWNERS = {"features", "topics", "orgs", "settings", "marketplace", "explore", "sponsors", "about",
+                          "pricing", "login", "search", "collections", "trending", "enterprise", "notifications"}
+GITHUB_DEFAULT_REF = "HEAD"  # raw.githubusercontent.com resolves it to the repository's default branch
+README_NAMES = ("README.md", "readme.md", "Readme.md", "README.rst", "README.txt", "README")
+GITHUB_MAX_BYTES = 512 * 1024
+GITHUB_REF_CACHE_TTL = 7 * 24 * 3600  # How long the branch/path that worked for a repo is remembered
+_github_executor = ThreadPoolExecutor(max_workers=6, thread_name_prefix="github")
+
+def get_session():
+    """Shared requests.Session so repeated fetches reuse pooled keep-alive connections"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=8, pool_maxsize=8)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+            _session.headers.update({"User-Agent": "Mozilla/5.0"})
+        return _session
+
+def _cached_text(url, timeout, extract, limit, variant=""):
+    """GET a URL through the web cache; `extract(response, limit)` turns the body into the text that is
+    stored, reading at most `limit` characters. The limit and `variant` (the extractor) are part of the
+    key, so text cut short for one caller is never returned to a caller that asked for more."""
+    cache = get_web_cache()
+    key = f"url:{variant + ':' if variant else ''}{limit}:{normalize_url(url)}"
+    entry = cache.get(key)
+    if entry is not None and entry.fresh:
+        print(f"[CACHE] HIT {key} ({cache.describe()})")
+        return entry.content
+    headers = entry.conditional_headers() if entry is not None else {}
+    response = get_session().get(url, headers=headers, timeout=timeout, stream=True)
+    ttl = parse_cache_control(response.headers, WEB_CACHE_TTL)
+    if response.status_code == 304 and entry is not None:
+        response.close()
+        cache.refresh(key, ttl or 0)
+        print(f"[CACHE] REVALIDATED {key} ({cache.describe()})")
+        return entry.content
+    if not response.ok:
+        response.close()
+        response.raise_for_status()
+    text = extract(response, limit)
+    if ttl is not None and text:
+        cache.put(key, text, ttl, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+    print(f"[CACHE] MISS {key} ({cache.describe()})")
+    return text
+
+def google_search(query, api_key, cse_id, num_results=3, timeout=WEB_REQUEST_TIMEOUT):
     if not api_key or not cse_id:
         return []
-    url = f"https://www.googleapis.com/customsearch/v1?key={api_key}&cx={cse_id}&q={query}&num={num_results}"
+    cache = get_web_cache()
+    key = f"search:{num_results}:{normalize_query(query)}"
+    entry = cache.get(key)
+    if entry is not None and entry.fresh:
+        print(f"[CACHE] HIT {key} ({cache.describe()})")
+        return json.loads(entry.content)
+    url = "https://www.googleapis.com/customsearch/v1"
+    params = {"key": api_key, "cx": cse_id, "q": query, "num": num_results}
     try:
-        response = requests.get(url)
+        response = get_session().get(url, params=params, timeout=timeout)
         response.raise_for_status()
         search_results = response.json()
         snippets = []
         if 'items' in search_results:
             for item in search_results['items']:
                 snippets.append(item.get('snippet', 'No snippet available.') + f" (Source: {item.get('displayLink', 'N/A')})")
+        if snippets:
+            cache.put(key, json.dumps(snippets, ensure_ascii=False), WEB_SEARCH_CACHE_TTL)
+        print(f"[CACHE] MISS {key} ({cache.describe()})")
         return snippets
     except Exception:
         return []
 
-def fetch_url_content(url, max_chars=3000):
+def parse_github_url(url):
+    """Split a github.com URL into (owner, repo, kind, ref, path); kind is "repo", "blob" or "tree".
+    Returns None for other hosts and for GitHub pages that are not repository content."""
+    parts = urlsplit(url)
+    if parts.netloc.lower() not in ("github.com", "www.github.com"):
+        return None
+    m = GITHUB_URL.match(parts.path)
+    if not m:
+        return None
+    owner, repo, kind, ref, path = m.groups()
+    if owner.lower() in GITHUB_RESERVED_OWNERS:
+        return None
+    if kind is None:
+        return owner, repo, "repo", None, ""
+    return owner, repo, "tree" if kind == "tree" else "blob", ref, (path or "").strip("/")
+
+def _raw_github_url(owner, repo, ref, path):
+    return f"https://raw.githubusercontent.com/{owner}/{repo}/{ref}/{path}"
+
+def _fetch_raw(raw_url, max_chars, timeout):
+    return _cached_text(raw_url, timeout, lambda resp, limit: extract_response_text(resp, limit, max_bytes=GITHUB_MAX_BYTES),
+                        max_chars + 1)
+
+def _probe_readme(owner, repo, candidates, max_chars, timeout):
+    """Request all (ref, path) candidates concurrently. The earliest candidate in `candidates`
+    that has a non-empty README wins, returned as soon as every candidate before it has failed,
+    so the result does not depend on which request happens to finish first."""
+    futures = {_github_executor.submit(_fetch_raw, _raw_github_url(owner, repo, ref, path), max_chars, timeout): index
+               for index, (ref, path) in enumerate(candidates)}
+    results = [None] * len(candidates)  # None: pending, "": failed or empty, else the README text
+    try:
+        for future in as_completed(futures, timeout=timeout * 2):
+            text = future.result() if future.exception() is None else ""
+            results[futures[future]] = text if text.strip() else ""
+            for index, result in enumerate(results):
+                if result is None:
+                    break  # A higher-priority candidate is still outstanding
+                if result:
+                    return candidates[index], result
+    except Exception:
+        pass  # Overall timeout: treat as not found
+    finally:
+        for future in futures:
+            future.cancel()
+    return None, ""
+
+def fetch_github_content(url, max_chars=3000, timeout=WEB_REQUEST_TIMEOUT):
+    """Fetch repository content through raw.githubusercontent.com instead of scraping GitHub's HTML.
+    Returns None when the URL is not a repository URL or nothing could be fetched."""
+    parsed = parse_github_url(url)
+    if parsed is None:
+        return None
+    owner, repo, kind, ref, path = parsed
+    if kind == "blob":
+        try:
+            text = _fetch_raw(_raw_github_url(owner, repo, ref, path), max_chars, timeout)
+        except Exception as e:
+            print(f"[DEBUG] Raw GitHub fetch failed for {url}: {e}")
+            return None
+        return f"{path} from {owner}/{repo} ({ref}):\n\n{text}" if text.strip() else None
+
+    directory = f"{path}/" if path else ""
+    ref = ref or GITHUB_DEFAULT_REF
+    cache = get_web_cache()
+    memo_key = f"github:{owner}/{repo}:{ref}:{directory}".lower()
+    memo = cache.get(memo_key)
+    if memo is not None and memo.fresh:
+        # Repeat visit: one request to the branch/path that worked last time
+        found_ref, found_path = json.loads(memo.content)
+        try:
+            text = _fetch_raw(_raw_github_url(owner, repo, found_ref, found_path), max_chars, timeout)
+        except Exception:
+            text = ""
+        if text.strip():
+            return f"{found_path} content from {repo} repository ({found_ref}):\n\n{text}"
+        cache.delete(memo_key)  # Branch renamed or README moved: probe again
+    candidates = [(ref, directory + name) for name in README_NAMES]
+    found, text = _probe_readme(owner, repo, candidates, max_chars, timeout)
+    if found is None:
+        return None
+    cache.put(memo_key, json.dumps(found), GITHUB_REF_CACHE_TTL)
+    print(f"[DEBUG] GitHub README for {owner}/{repo} found at {found[0]}/{found[1]}")
+    return f"{found[1]} content from {repo} repository ({found[0]}):\n\n{text}"
+
+def fetch_url_content(url, max_chars=3000, timeout=WEB_REQUEST_TIMEOUT):
     try:
         if "github.com" in url:
-            m = re.match(r'https?://github.com/([^/]+)/([^/]+)', url)
-            if m:
-                user, repo = m.group(1), m.group(2)
-                raw_url = f"https://raw.githubusercontent.com/{user}/{repo}/main/README.md"
-                resp = requests.get(raw_url, timeout=10)
-                if resp.ok and resp.text.strip():
-                    return f"README.md content from {repo} repository:\n\n" + resp.text[:max_chars] + ("..." if len(resp.text) > max_chars else "")
-        headers = {"User-Agent": "Mozilla/5.0"}
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
-        for tag in soup(["script", "style", "noscript"]):
-            tag.decompose()
-        text = soup.get_text(separator='\n')
-        clean_text = "\n".join(line.strip() for line in text.splitlines() if line.strip())
+            github_text = fetch_github_content(url, max_chars, timeout)
+            if github_text:
+                return github_text[:max_chars] + ("..." if len(github_text) > max_chars else "")
+        # Only max_chars + 1 characters are extracted: enough to know whether the page was truncated
+        clean_text = _cached_text(url, timeout, lambda resp, limit: extract_response_text(resp, limit, mode=WEB_EXTRACTION_MODE),
+                                  max_chars + 1, variant=WEB_EXTRACTION_MODE)
         return clean_text[:max_chars] + ("..." if len(clean_text) > max_chars else "")
     except Exception as e:
         return f"[ERROR] Failed to read page {url}: {e}"
@@ -1,14 +1,29 @@
 import customtkinter as ctk
 import threading
 import os
-from core.ollama_manager import get_local_ollama_models
-from core.model_metadata import ModelMetadata
+from core.ollama_manager import get_local_ollama_models, load_cached_models, is_model_error, FALLBACK_MODELS
+from core.model_catalog import get_model_catalog
 from core.character_manager import load_character_prompt, load_chat_history, save_chat_history, get_character_history_file
-from core.web_tools import google_search, fetch_url_content
+from core.enrichment import find_urls, needs_web_search, run_enrichment
+from core.web_cache import get_web_cache
 from core.proactive_manager import ProactiveManager
-from core.config import CHARACTER_DIR, HISTORY_FILES_DIR, GOOGLE_API_KEY, GOOGLE_CSE_ID
+from core.config import CHARACTER_DIR, HISTORY_FILES_DIR, GOOGLE_API_KEY, GOOGLE_CSE_ID, ENRICHMENT_BUDGET, VISION_MODE
 from core.utils import get_timestamp, get_datetime_str
-from core.memory import load_long_term_memory, add_fact_to_memory
+from core.memory import add_fact_to_memory, get_relevant_facts
+from core.streaming import StreamBuffer
+from core.context_builder import ContextBuilder
+from core.summarizer import ConversationSummarizer
+from core.prompt_manager import build_turn_messages, PROMPT_LAYOUTS
+from core.ollama_client import get_ollama_service
+from core.model_warmer import ModelWarmer
+from gui.components.transcript_view import TranscriptView
+from gui.ui_dispatcher import UIDispatcher
+from core.generation_queue import GenerationScheduler, QueueFull, PRIORITY_USER, PRIORITY_PROACTIVE
+from core.telemetry import TurnMetrics, get_metrics_store
+from core.search_index import get_search_index, parse_date
+
+STREAM_POLL_MS = 30  # How often streamed tokens are flushed into the chat textbox
+MEMORY_TOP_K = 10  # Long-term memory facts injected per turn
 
 class ChatApp(ctk.CTk):
     def __init__(self):
@@ -22,16 +37,23 @@ class ChatApp(ctk.CTk):
         self.title("AI Chat Assistant")
         self.geometry("1200x800")
         self.proactive_enabled = True
-        self.message_lock = threading.Lock()
+        self.message_lock = threading.Lock()  # Held by the generation worker for a whole turn
+        # Guards self.messages itself: appends, in-place changes and replacing the list (Clear, Import)
+        self.history_lock = threading.Lock()
         self.vision_image_path = None
         self.is_processing = False
-        
-        # Get available models
-        available_models = get_local_ollama_models()
-        if not available_models or available_models[0].startswith("No models") or available_models[0].startswith("Ollama"):
-            available_models = ["llama3.2:1b", "qwen2.5:0.5b", "gemma2:2b"]  # fallback models
+        # Worker threads never touch widgets directly; they post UI updates through this queue
+        self.ui = UIDispatcher(self)
+        self.ui.start()
+        # All generations (replies and proactive messages) run one at a time on this worker
+        self.scheduler = GenerationScheduler(on_change=lambda: self.ui.post(self._update_queue_status, key="queue_status"))
+        
+        # Show the window with the model list from the last run; discovery runs in the background
+        self.available_models = load_cached_models() or list(FALLBACK_MODELS)
+        self.models_discovered = threading.Event()
             
-        self.selected_model = ctk.StringVar(value=available_models[0])
+        self.selected_model = ctk.StringVar(value=self.available_models[0])
+        self.active_model = self.selected_model.get()
         self.selected_character_name = ctk.StringVar(value="Default AI Assistant")
         self.character_files = self._get_character_files()
         
@@ -42,9 +64,11 @@ class ChatApp(ctk.CTk):
         
         # GUI variables
         self.prompt_format = ctk.StringVar(value="Plain")
+        self.prompt_layout = ctk.StringVar(value=PROMPT_LAYOUTS[0])
         self.temperature = ctk.DoubleVar(value=0.7)
         self.top_p = ctk.DoubleVar(value=0.95)
         self.proactive_enabled = ctk.BooleanVar(value=True)  # Proactive behavior toggle
+        self.stream_replies = ctk.BooleanVar(value=True)  # Show tokens as they are generated
         
         # Grid configuration
         self.grid_rowconfigure(2, weight=1)
@@ -55,10 +79,14 @@ class ChatApp(ctk.CTk):
         
         # Initialize managers after GUI creation
         self.history_manager = ChatHistoryManager(HISTORY_FILES_DIR, self.char_name)
-        self.logger = ChatLogger()
+        self.logger = ChatLogger(search_index=get_search_index())
         self.vision_manager = VisionManager()
         self.model_metadata = None
+        self.context_builder = ContextBuilder()
+        self.model_warmer = ModelWarmer(on_status=self._on_model_warm_status)
+        self.summarizer = ConversationSummarizer(self.char_name, scheduler=self.scheduler)
         self.messages = self.history_manager.load_last_history(self.system_prompt)
+        self.chat_history_textbox.set_history(self.messages[1:], lambda msg: self._history_row(msg, "History"))
         
         # Final setup
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
@@ -68,6 +96,26 @@ class ChatApp(ctk.CTk):
         
         # Initialize chat context after complete GUI creation
         self.after(100, lambda: self.update_chat_context(None, initial_load=True))
+        threading.Thread(target=self._discover_models, daemon=True).start()
+
+    def _discover_models(self):
+        models = get_local_ollama_models()
+        self.ui.post(self._apply_discovered_models, models)
+
+    def _apply_discovered_models(self, models):
+        self.models_discovered.set()
+        if is_model_error(models):
+            print(f"[WARNING] Model discovery failed: {models[0] if models else 'no response'}")
+            self.model_status_label.configure(text=f"⚠️ {models[0] if models else 'Ollama not reachable'} (showing cached models)")
+            return
+        self.available_models = models
+        self.model_optionmenu.configure(values=models)
+        if self.selected_model.get() not in models:
+            self.selected_model.set(models[0])
+            self.update_chat_context(None)
+        else:
+            # Details of the selected model may only have arrived with this discovery
+            self._show_model_info(self.selected_model.get())
 
     def _init_gui(self):
         # Settings frame
@@ -77,10 +125,7 @@ class ChatApp(ctk.CTk):
         
         # Model selection and format controls
         ctk.CTkLabel(self.settings_frame, text="Select Ollama Model:").grid(row=0, column=0, padx=10, pady=5, sticky="w")
-        available_models = get_local_ollama_models()
-        if not available_models or available_models[0].startswith("No models"):
-            available_models = ["llama3.2:1b", "qwen2.5:0.5b", "gemma2:2b"]
-        self.model_optionmenu = ctk.CTkOptionMenu(self.settings_frame, values=available_models, 
+        self.model_optionmenu = ctk.CTkOptionMenu(self.settings_frame, values=self.available_models, 
                                                   variable=self.selected_model, command=self.update_chat_context)
         self.model_optionmenu.grid(row=0, column=1, padx=10, pady=5, sticky="ew")
         
@@ -89,6 +134,11 @@ class ChatApp(ctk.CTk):
                                                           variable=self.prompt_format)
         self.prompt_format_optionmenu.grid(row=0, column=3, padx=10, pady=5, sticky="ew")
         
+        ctk.CTkLabel(self.settings_frame, text="Prompt Layout:").grid(row=0, column=4, padx=10, pady=5, sticky="w")
+        self.prompt_layout_optionmenu = ctk.CTkOptionMenu(self.settings_frame, values=PROMPT_LAYOUTS, 
+                                                          variable=self.prompt_layout)
+        self.prompt_layout_optionmenu.grid(row=0, column=5, columnspan=2, padx=10, pady=5, sticky="ew")
+        
         ctk.CTkLabel(self.settings_frame, text="Temperature:").grid(row=1, column=2, padx=10, pady=5, sticky="w")
         self.temp_entry = ctk.CTkEntry(self.settings_frame, textvariable=self.temperature, width=60)
         self.temp_entry.grid(row=1, column=3, padx=10, pady=5, sticky="ew")
@@ -102,6 +152,10 @@ class ChatApp(ctk.CTk):
                                                  variable=self.proactive_enabled, command=self.toggle_proactive_manager)
         self.proactive_checkbox.grid(row=1, column=6, padx=10, pady=5, sticky="w")
         
+        # Streaming toggle
+        self.stream_checkbox = ctk.CTkCheckBox(self.settings_frame, text="Stream Replies", variable=self.stream_replies)
+        self.stream_checkbox.grid(row=2, column=7, padx=10, pady=5, sticky="w")
+        
         ctk.CTkLabel(self.settings_frame, text="Select Character:").grid(row=1, column=0, padx=10, pady=5, sticky="w")
         character_options = ["Default AI Assistant"] + self.character_files
         self.character_optionmenu = ctk.CTkOptionMenu(self.settings_frame, values=character_options, 
@@ -123,7 +177,11 @@ class ChatApp(ctk.CTk):
                                           hover_color="#10304a", text_color="#FFFFFF")
         self.vision_button.grid(row=3, column=0, padx=10, pady=5, sticky="w")
         self.vision_image_label = ctk.CTkLabel(self.settings_frame, text="No image selected", anchor="w", font=("Arial", 11))
-        self.vision_image_label.grid(row=3, column=1, columnspan=3, padx=10, pady=5, sticky="ew")
+        self.vision_image_label.grid(row=3, column=1, columnspan=2, padx=10, pady=5, sticky="ew")
+        self.vision_caption_mode = ctk.BooleanVar(value=VISION_MODE == "caption")
+        self.vision_caption_checkbox = ctk.CTkCheckBox(self.settings_frame, text="Image captions", 
+                                                      variable=self.vision_caption_mode, command=self.toggle_vision_caption_mode)
+        self.vision_caption_checkbox.grid(row=3, column=3, padx=10, pady=5, sticky="w")
         
         # Character doc editor button
         self.char_doc_button = ctk.CTkButton(self.settings_frame, text="Edit Character Doc", 
@@ -167,17 +225,26 @@ class ChatApp(ctk.CTk):
                                                 command=self.open_web_settings, fg_color="#126140", 
                                                 hover_color="#0f4a30", text_color="#FFFFFF")
         self.web_settings_button.grid(row=5, column=6, padx=10, pady=5, sticky="ew")
+        self.performance_button = ctk.CTkButton(self.settings_frame, text="Performance", 
+                                               command=self.show_performance_summary, fg_color="#4a4a61", 
+                                               hover_color="#37374a", text_color="#FFFFFF")
+        self.performance_button.grid(row=5, column=7, padx=10, pady=5, sticky="ew")
+        self.search_button = ctk.CTkButton(self.settings_frame, text="Search Chats", 
+                                          command=self.open_search_panel, fg_color="#12614a", 
+                                          hover_color="#0f4a37", text_color="#FFFFFF")
+        self.search_button.grid(row=5, column=5, padx=10, pady=5, sticky="ew")
+        
+        # Model preload status
+        self.model_status_label = ctk.CTkLabel(self.settings_frame, text="", anchor="w", font=("Arial", 11))
+        self.model_status_label.grid(row=5, column=0, columnspan=4, padx=10, pady=5, sticky="ew")
         
         # Chat frame
         self.chat_frame = ctk.CTkFrame(self, corner_radius=10)
         self.chat_frame.grid(row=2, column=0, padx=10, pady=(0, 10), sticky="nsew")
         self.chat_frame.grid_rowconfigure(0, weight=1)
         self.chat_frame.grid_columnconfigure(0, weight=1)
-        self.chat_history_textbox = ctk.CTkTextbox(self.chat_frame, wrap="word", state="disabled", font=("Arial", 14))
+        self.chat_history_textbox = TranscriptView(self.chat_frame, font=("Arial", 14))
         self.chat_history_textbox.grid(row=0, column=0, padx=10, pady=10, sticky="nsew")
-        self.chat_history_textbox.tag_config("user_tag", foreground="#FAF7F3", lmargin1=20, lmargin2=20, rmargin=100)
-        self.chat_history_textbox.tag_config("assistant_tag", foreground="#D9A299", lmargin1=100, lmargin2=100, rmargin=20)
-        self.chat_history_textbox.tag_config("system_tag", foreground="#722323")
         
         # Input frame
         self.input_frame = ctk.CTkFrame(self, corner_radius=10)
@@ -189,39 +256,23 @@ class ChatApp(ctk.CTk):
         self.send_button = ctk.CTkButton(self.input_frame, text="Send", command=self.send_message, 
                                         fg_color="#596112", hover_color="#3f450c", text_color="#FFFFFF")
         self.send_button.grid(row=0, column=1, padx=(0, 10), pady=10, sticky="e")
+        self.stop_button = ctk.CTkButton(self.input_frame, text="Stop", command=self.stop_generation, width=70,
+                                        state="disabled", fg_color="#722323", hover_color="#4f1818", text_color="#FFFFFF")
+        self.stop_button.grid(row=0, column=2, padx=(0, 10), pady=10, sticky="e")
+        self.queue_status_label = ctk.CTkLabel(self.input_frame, text="", anchor="w", font=("Arial", 11))
+        self.queue_status_label.grid(row=1, column=0, columnspan=3, padx=10, pady=(0, 5), sticky="ew")
 
     def view_log_file(self):
         import tkinter.messagebox
-        import os
         try:
-            # Get log file from logger if available, otherwise use default path
-            if hasattr(self, 'logger') and self.logger:
-                log_file = getattr(self.logger, 'log_file', 'chat.log')
-            else:
-                log_file = 'chat.log'
-            
-            # If log file doesn't exist, create it
-            if not os.path.exists(log_file):
-                with open(log_file, "w", encoding="utf-8") as f:
-                    f.write(f"[{get_timestamp()}] Chat log initialized.\n")
-                tkinter.messagebox.showinfo("Chat Log", "Log file was created. No previous logs found.")
-                return
-            
-            # Read existing log content
-            with open(log_file, "r", encoding="utf-8") as f:
-                log_content = f.read()
-                
-            # Show last 3000 characters if file is large
-            if len(log_content) > 3000:
-                log_content = "...\n" + log_content[-3000:]
-                
+            # Only the end of the file is read, however large the log has grown
+            log_content = self.logger.view_log(3000) if getattr(self, 'logger', None) else ""
             if log_content.strip():
                 tkinter.messagebox.showinfo("Chat Log", log_content)
             else:
-                tkinter.messagebox.showinfo("Chat Log", "Log file exists but is empty.")
-                
+                tkinter.messagebox.showinfo("Chat Log", "No log entries yet.")
         except Exception as e:
-            tkinter.messagebox.showerror("Error", f"Failed to read log: {e}\nAttempted path: {log_file if 'log_file' in locals() else 'Unknown'}")
+            tkinter.messagebox.showerror("Error", f"Failed to read log: {e}\nAttempted path: {getattr(self.logger, 'log_file', 'Unknown')}")
     def set_manual_system_prompt(self):
         manual_prompt = self.manual_prompt_entry.get().strip()
         if manual_prompt:
@@ -235,7 +286,7 @@ class ChatApp(ctk.CTk):
             # Enable proactive manager
             if hasattr(self, 'proactive_manager') and self.proactive_manager:
                 try:
-                    self.proactive_manager.start()
+                    self.proactive_manager.set_idle_enabled(True)
                     self.add_message_to_history("System: Auto messages enabled - AI may initiate conversations.", "system")
                     print("[DEBUG] ProactiveManager enabled")
                 except Exception as e:
@@ -245,45 +296,119 @@ class ChatApp(ctk.CTk):
             # Disable proactive manager
             if hasattr(self, 'proactive_manager') and self.proactive_manager:
                 try:
-                    self.proactive_manager.stop()
-                    self.add_message_to_history("System: Auto messages disabled - AI will only respond to your messages.", "system")
+                    # The thread keeps running so reminders still fire
+                    self.proactive_manager.set_idle_enabled(False)
+                    self.add_message_to_history("System: Auto messages disabled - AI will only respond to your messages and reminders.", "system")
                     print("[DEBUG] ProactiveManager disabled")
                 except Exception as e:
                     print(f"[ERROR] Failed to stop proactive manager: {e}")
 
     def on_closing(self):
+        self.scheduler.shutdown()
+        self.save_current_chat_history()
+        self.logger.close()
+        self.ui.stop()
         self.destroy()
 
     def restart_chat_session(self):
         # Clear chat history and restart
-        self.messages = [{'role': 'system', 'content': self.system_prompt}]
+        self._replace_messages([{'role': 'system', 'content': self.system_prompt}])
+        self.context_builder.reset()
+        self.summarizer.reset()
+        if getattr(self, 'proactive_manager', None):
+            self.proactive_manager.reset_context()
         if hasattr(self, 'chat_history_textbox'):
-            self.chat_history_textbox.configure(state="normal")
-            self.chat_history_textbox.delete("1.0", ctk.END)
-            self.chat_history_textbox.configure(state="disabled")
+            self.chat_history_textbox.clear()
         self.add_message_to_history("System: Chat session restarted.", "system")
 
     def add_message_to_history(self, message, role):
+        if not self.ui.on_ui_thread():
+            self.ui.post(self.add_message_to_history, message, role)
+            return
         if not hasattr(self, 'chat_history_textbox'):
             return
         
-        self.chat_history_textbox.configure(state="normal")
         timestamp = get_timestamp()
         
         if role == "user":
-            self.chat_history_textbox.insert("end", f"[{timestamp}] You: {message}\n", "user_tag")
+            self.chat_history_textbox.append(f"[{timestamp}] You: {message}\n", "user_tag")
         elif role == "assistant":
-            self.chat_history_textbox.insert("end", f"[{timestamp}] {self.char_name}: {message}\n", "assistant_tag")
+            self.chat_history_textbox.append(f"[{timestamp}] {self.char_name}: {message}\n", "assistant_tag")
         elif role == "system":
-            self.chat_history_textbox.insert("end", f"[{timestamp}] {message}\n", "system_tag")
-        
-        self.chat_history_textbox.configure(state="disabled")
-        self.chat_history_textbox.see("end")
+            self.chat_history_textbox.append(f"[{timestamp}] {message}\n", "system_tag")
+
+    def _history_row(self, msg, label):
+        """Transcript row for a message loaded from a saved or imported history"""
+        if msg.get('role') == 'user':
+            return f"[{label}] You: {msg.get('content')}\n", "user_tag"
+        if msg.get('role') == 'assistant':
+            return f"[{label}] {self.char_name}: {msg.get('content')}\n", "assistant_tag"
+        return f"[{label}] {msg.get('content')}\n", "system_tag"
+
+    def _start_stream_view(self, buffer):
+        """Insert the assistant header for a streamed reply and start draining the buffer"""
+        if not hasattr(self, 'chat_history_textbox'):
+            return
+        self.chat_history_textbox.begin_stream(f"[{get_timestamp()}] {self.char_name}: ", "assistant_tag")
+        self.after(STREAM_POLL_MS, lambda: self._drain_stream_buffer(buffer))
+
+    def _drain_stream_buffer(self, buffer):
+        done = buffer.is_done()
+        text = buffer.drain()
+        if text:
+            self.chat_history_textbox.stream(text)
+        if done:
+            self.chat_history_textbox.end_stream()
+        else:
+            self.after(STREAM_POLL_MS, lambda: self._drain_stream_buffer(buffer))
+
+    def _stream_chat(self, model, messages, options, buffer, request=None, metrics=None):
+        """Consume a streamed Ollama reply on the worker thread, returning the last chunk.
+        Stops reading (which closes the HTTP stream and aborts generation) once the request is cancelled."""
+        last_chunk = None
+        stream = get_ollama_service().chat(model, messages, options=options, stream=True)
+        try:
+            for chunk in stream:
+                content = chunk['message']['content']
+                if content and metrics is not None:
+                    metrics.first_token()
+                buffer.push(content)
+                last_chunk = chunk
+                if request is not None and request.cancelled:
+                    break
+        finally:
+            stream.close()
+        return last_chunk
+
+    def snapshot_messages(self):
+        """(current message list, copy of it) for worker threads. The list object identifies the
+        conversation: Clear, Restart and Import replace it, so replies to an old one are dropped."""
+        with self.history_lock:
+            return self.messages, list(self.messages)
+
+    def store_message(self, conversation, message, position=None):
+        """Add a generated message to `conversation` if it is still the current history. `position`
+        puts a reply right after the messages it answers, before any typed while it was generated."""
+        with self.history_lock:
+            if self.messages is not conversation:
+                print("[INFO] History was replaced during generation, reply not stored")
+                return False
+            if position is None:
+                conversation.append(message)
+            else:
+                conversation.insert(position, message)
+            return True
+
+    def _replace_messages(self, messages):
+        with self.history_lock:
+            self.messages = messages
+        if getattr(self, 'history_manager', None):
+            self.history_manager.mark_replaced()
 
     def save_current_chat_history(self):
         if hasattr(self, 'history_manager') and self.history_manager:
             try:
-                self.history_manager.save_history(self.messages, self.char_name)
+                self.history_manager.save_history(self.snapshot_messages()[1], self.char_name)
             except Exception as e:
                 print(f"[ERROR] Failed to save chat history: {e}")
         
@@ -331,17 +456,13 @@ class ChatApp(ctk.CTk):
                     return
                 
                 # Import valid messages
-                self.messages = [{'role': 'system', 'content': self.system_prompt}] + valid_messages
-                self.chat_history_textbox.configure(state="normal")
-                self.chat_history_textbox.delete("1.0", ctk.END)
-                
-                for msg in valid_messages:
-                    if msg['role'] == 'user':
-                        self.chat_history_textbox.insert("end", f"[Imported] You: {msg['content']}\n", "user_tag")
-                    elif msg['role'] == 'assistant':
-                        self.chat_history_textbox.insert("end", f"[Imported] {self.char_name}: {msg['content']}\n", "assistant_tag")
-                
-                self.chat_history_textbox.configure(state="disabled")
+                self._replace_messages([{'role': 'system', 'content': self.system_prompt}] + valid_messages)
+                self.context_builder.reset()
+                self.summarizer.reset()
+                if getattr(self, 'proactive_manager', None):
+                    self.proactive_manager.reset_context()
+                # Only the newest messages are rendered now (in after() chunks); older ones load on scroll-up
+                self.chat_history_textbox.set_history(valid_messages, lambda msg: self._history_row(msg, "Imported"))
                 self.add_message_to_history(f"System: Chat history imported from {file_path} ({len(valid_messages)} messages)", "system")
                 
             except json.JSONDecodeError as e:
@@ -350,10 +471,12 @@ class ChatApp(ctk.CTk):
                 self.add_message_to_history(f"System Error: Failed to import history: {e}", "system")
 
     def clear_chat_history(self):
-        self.messages = [{'role': 'system', 'content': self.system_prompt}]
-        self.chat_history_textbox.configure(state="normal")
-        self.chat_history_textbox.delete("1.0", ctk.END)
-        self.chat_history_textbox.configure(state="disabled")
+        self._replace_messages([{'role': 'system', 'content': self.system_prompt}])
+        self.context_builder.reset()
+        self.summarizer.reset()
+        if getattr(self, 'proactive_manager', None):
+            self.proactive_manager.reset_context()
+        self.chat_history_textbox.clear()
         self.add_message_to_history("System: Chat history cleared.", "system")
     def select_vision_image(self):
         import tkinter.filedialog
@@ -366,6 +489,10 @@ class ChatApp(ctk.CTk):
             self.vision_image_path = None
             self.vision_image_label.configure(text="No image selected")
 
+    def toggle_vision_caption_mode(self):
+        """Caption mode: images reach the chat model as a cached caption instead of pixels"""
+        self.vision_manager.mode = "caption" if self.vision_caption_mode.get() else "pixels"
+
     def open_character_doc_editor(self):
         # Configuration option
         import tkinter as tk
@@ -433,7 +560,7 @@ class ChatApp(ctk.CTk):
         
         # Ollama Host setting
         tk.Label(settings_window, text="Ollama Host:", font=("Arial", 12, "bold")).pack(pady=10)
-        host_var = tk.StringVar(value=getattr(self, 'ollama_host', 'http://localhost:11434'))
+        host_var = tk.StringVar(value=getattr(self, 'ollama_host', get_ollama_service().host))
         host_entry = tk.Entry(settings_window, textvariable=host_var, width=50, font=("Arial", 11))
         host_entry.pack(pady=5)
         
@@ -478,6 +605,10 @@ MODELS_PATH = '{self.models_path}'
                 with open("ollama_config.py", "w") as f:
                     f.write(config_data)
                 
+                # Route every Ollama call through the new host
+                if self.ollama_host:
+                    get_ollama_service().configure(host=self.ollama_host)
+                
                 messagebox.showinfo("Success", "Ollama settings saved successfully!")
                 settings_window.destroy()
                 
@@ -620,6 +751,40 @@ GOOGLE_CSE_ID = '{self.google_cse_id}'
         tk.Button(button_frame, text="❌ Cancel", command=cancel_web, 
                  bg="#9E9E9E", fg="white").pack(side=tk.LEFT, padx=5)
 
+    def _on_model_warm_status(self, model, state, detail=""):
+        """Called from the warm-up thread; only the currently selected model is shown"""
+        texts = {
+            "loading": f"⏳ Loading {model} into memory...",
+            "ready": f"✅ {model} loaded ({detail})",
+            "failed": f"⚠️ Could not preload {model}: {detail}",
+        }
+        def update():
+            if model == self.selected_model.get():
+                self.model_status_label.configure(text=texts.get(state, ""))
+        self.ui.post(update, key="model_status")
+
+    def _show_model_info(self, model_name, warn=False):
+        self.model_metadata = get_model_catalog().get(model_name)
+        meta = self.model_metadata
+        info_lines = meta.describe() if meta else [f"Model: {model_name}", "Details: not known yet (waiting for Ollama)"]
+        if hasattr(self, 'model_info_label'):
+            self.model_info_label.configure(text="\n".join(info_lines))
+        if not warn or not meta:
+            return
+        # Resource check against the model's size on disk
+        try:
+            import psutil
+            available_ram = round(psutil.virtual_memory().total / (1024**3), 1)
+            required_ram = meta.get_ram_requirement()
+            if required_ram and available_ram < required_ram:
+                self.add_message_to_history(f"System Warning: Model needs about {required_ram}GB RAM, but only {available_ram}GB available.", "system")
+        except ImportError:
+            pass
+        
+        # Vision warning
+        if not meta.supports_vision():
+            self.add_message_to_history("System Notice: Selected model does NOT support Vision (image input).", "system")
+
     def _get_character_files(self):
         import os
         if not os.path.exists(CHARACTER_DIR):
@@ -634,47 +799,12 @@ GOOGLE_CSE_ID = '{self.google_cse_id}'
         selected_char_name = self.selected_character_name.get()
         selected_model_name = self.selected_model.get()
         
-        # Load model metadata
-        self.model_metadata = ModelMetadata(selected_model_name)
-        meta = self.model_metadata
-        info_lines = []
-        if meta:
-            ram = meta.get_ram_requirement()
-            gpu = meta.get_gpu_requirement()
-            quant = meta.get_quantization()
-            vision = meta.supports_vision()
-            desc = meta.get_description()
-            info_lines.append(f"Model: {selected_model_name}")
-            if desc:
-                info_lines.append(f"Description: {desc}")
-            if ram:
-                info_lines.append(f"Required RAM: {ram}")
-            if gpu:
-                info_lines.append(f"Required GPU: {gpu}")
-            if quant:
-                info_lines.append(f"Quantization: {quant}")
-            info_lines.append(f"Vision support: {'Yes' if vision else 'No'}")
-            
-        if hasattr(self, 'model_info_label'):
-            self.model_info_label.configure(text="\n".join(info_lines))
-        
-        # Resource check (dummy, for demo)
-        try:
-            import psutil
-            available_ram = round(psutil.virtual_memory().total / (1024**3), 1)
-            if meta and meta.get_ram_requirement():
-                try:
-                    required_ram = float(str(meta.get_ram_requirement()).replace('GB','').strip())
-                    if available_ram < required_ram:
-                        self.add_message_to_history(f"System Warning: Model requires {required_ram}GB RAM, but only {available_ram}GB available.", "system")
-                except Exception:
-                    pass
-        except ImportError:
-            pass
+        # Start loading the model now so the first reply does not wait for it
+        self.model_warmer.warm_up(selected_model_name)
+        self.active_model = selected_model_name  # Plain copy for worker threads (Tk variables are UI-thread only)
         
-        # Vision warning
-        if meta and not meta.supports_vision():
-            self.add_message_to_history("System Notice: Selected model does NOT support Vision (image input).", "system")
+        # Model details come from the in-memory catalog filled by model discovery (no network here)
+        self._show_model_info(selected_model_name, warn=True)
         
         # Update character and system prompt
         if selected_char_name == "Default AI Assistant":
@@ -695,6 +825,8 @@ GOOGLE_CSE_ID = '{self.google_cse_id}'
                 self.add_message_to_history(f"System Error: Failed to load character prompt for '{selected_char_name}'. Using default.", "system")
         
         print(f"[DEBUG] Selected model: {selected_model_name}, Selected character: {self.char_name}")
+        if self.summarizer.char_name != self.char_name:
+            self.summarizer = ConversationSummarizer(self.char_name, scheduler=self.scheduler)
         self.load_character_chat_history()
         
         # Restart proactive manager based on checkbox state
@@ -705,11 +837,9 @@ GOOGLE_CSE_ID = '{self.google_cse_id}'
                 pass
         try:
             self.proactive_manager = ProactiveManager(self)
-            if self.proactive_enabled.get():
-                self.proactive_manager.start()
-                print("[DEBUG] ProactiveManager started (checkbox enabled)")
-            else:
-                print("[DEBUG] ProactiveManager created but not started (checkbox disabled)")
+            # Always started: reminders fire even when the checkbox turns idle messages off
+            self.proactive_manager.start(idle=self.proactive_enabled.get())
+            print(f"[DEBUG] ProactiveManager started (idle messages {'on' if self.proactive_enabled.get() else 'off'})")
         except Exception as e:
             print(f"[WARNING] Could not create proactive manager: {e}")
 
@@ -725,122 +855,310 @@ GOOGLE_CSE_ID = '{self.google_cse_id}'
         if not user_input.strip():
             return
         self.add_message_to_history(user_input, "user")
-        self.messages.append({'role': 'user', 'content': user_input})
+        user_message = {'role': 'user', 'content': user_input}
         
         # Log user message
         if hasattr(self, 'logger') and self.logger:
             try:
-                self.logger.log(get_timestamp(), "user", user_input)
+                self.logger.log("user", user_input, model=self.active_model, character=self.char_name)
             except Exception as e:
                 print(f"[WARNING] Failed to log user message: {e}")
         
         # Add user message у long-term memory
         add_fact_to_memory(self.char_name, user_input)
+        # Timed reminders ("remind me in 20 minutes to ...") fire from the proactive manager's timer queue
+        if getattr(self, 'proactive_manager', None):
+            reminder = self.proactive_manager.notify_user_message(user_input)
+            if reminder:
+                self.add_message_to_history(f"System: Reminder set for {reminder[0].strftime('%Y-%m-%d %H:%M')}: {reminder[1]}", "system")
         # If image is selected для Vision — додаємо у повідомлення
-        if self.vision_image_path and self.model_metadata and self.model_metadata.supports_vision():
-            self.messages[-1]['image'] = self.vision_image_path
-        thread = threading.Thread(target=self.get_ollama_response)
-        thread.start()
+        supports_vision = bool(self.model_metadata and self.model_metadata.supports_vision())
+        # A separate captioning model lets text-only chat models see images too
+        if self.vision_image_path and (supports_vision or self.vision_manager.caption_model):
+            # Attached to this message only; later turns mention it by name instead of resending it
+            user_message['image'] = self.vision_image_path
+            self.vision_image_path = None
+            self.vision_image_label.configure(text="No image selected")
+        with self.history_lock:
+            self.messages.append(user_message)
+        settings = self._generation_settings()
+        try:
+            # Messages typed while a reply is still queued are answered together in one turn
+            self.scheduler.submit("user", lambda request: self.get_ollama_response(settings, request),
+                                  PRIORITY_USER, coalesce=True)
+        except QueueFull:
+            self.add_message_to_history("System: Too many messages are waiting for a reply. Please wait a moment.", "system")
+
+    def stop_generation(self):
+        if self.scheduler.stop_current():
+            self.stop_button.configure(state="disabled")
+            self.add_message_to_history("System: Stopping generation...", "system")
+
+    def _update_queue_status(self):
+        stats = self.scheduler.get_stats()
+        self.stop_button.configure(state="normal" if stats["running"] else "disabled")
+        parts = []
+        if stats["running"] == "user":
+            parts.append("Generating reply")
+        elif stats["running"] == "proactive":
+            parts.append("Proactive message in progress")
+        elif stats["running"] == "reminder":
+            parts.append("Delivering reminder")
+        elif stats["running"] == "caption":
+            parts.append("Describing image")
+        elif stats["running"] == "summary":
+            parts.append("Summarizing earlier messages")
+        if stats["depth"]:
+            parts.append(f"{stats['depth']} queued, oldest waiting {stats['oldest_wait']:.1f}s")
+        if stats["running"] or stats["depth"]:
+            parts.append(f"queue wait p50 {stats['wait_p50']:.1f}s / max {stats['wait_max']:.1f}s")
+        elif getattr(self, 'last_turn_metrics', None) is not None:
+            parts.append(f"Last reply: {self.last_turn_metrics.describe()}")
+        self.queue_status_label.configure(text=" · ".join(parts))
+
+    def _caption_in_background(self, paths, model):
+        """Caption images whose pixels were just sent, so later turns and text-only models can reuse
+        the description; queued behind user replies on the generation worker"""
+        try:
+            self.scheduler.submit("caption", lambda request: self.vision_manager.caption_missing(paths, model, request),
+                                  PRIORITY_PROACTIVE)
+        except QueueFull:
+            print("[INFO] Generation queue full, image captions are made when next needed")
+
+    def _record_turn_metrics(self, metrics):
+        try:
+            get_metrics_store().record(metrics)
+        except Exception as e:
+            print(f"[WARNING] Failed to store turn metrics: {e}")
+        if not metrics.values["cancelled"]:
+            self.last_turn_metrics = metrics
+            self.ui.post(self._update_queue_status, key="queue_status")
 
-    def get_ollama_response(self):
+    def show_performance_summary(self):
+        """p50/p95 latencies and throughput per model and character"""
+        import tkinter as tk
+        window = tk.Toplevel(self)
+        window.title("Performance")
+        window.geometry("620x480")
+        window.transient(self)
+        text = tk.Text(window, font=("Courier", 11), wrap="none")
+        text.pack(fill="both", expand=True, padx=10, pady=10)
+        try:
+            text.insert("1.0", get_metrics_store().format_summary())
+        except Exception as e:
+            text.insert("1.0", f"Failed to read metrics: {e}")
+        text.configure(state="disabled")
+
+    def open_search_panel(self):
+        """Full-text search over all chat histories and logs"""
+        import tkinter as tk
+        import time
+        index = get_search_index()
+        window = tk.Toplevel(self)
+        window.title("Search Chats")
+        window.geometry("760x560")
+        window.transient(self)
+        controls = tk.Frame(window)
+        controls.pack(fill="x", padx=10, pady=(10, 0))
+        query_entry = tk.Entry(controls, font=("Arial", 12))
+        query_entry.grid(row=0, column=0, columnspan=6, sticky="ew", pady=(0, 5))
+        controls.grid_columnconfigure(1, weight=1)
+        tk.Label(controls, text="Character:").grid(row=1, column=0, sticky="w")
+        character_var = tk.StringVar(value="All")
+        tk.OptionMenu(controls, character_var, "All", *index.characters()).grid(row=1, column=1, sticky="w")
+        tk.Label(controls, text="From (YYYY-MM-DD):").grid(row=1, column=2, sticky="e")
+        since_entry = tk.Entry(controls, width=11)
+        since_entry.grid(row=1, column=3)
+        tk.Label(controls, text="To:").grid(row=1, column=4, sticky="e")
+        until_entry = tk.Entry(controls, width=11)
+        until_entry.grid(row=1, column=5)
+        status = tk.Label(window, text='Words must all match; use "exact phrase" or prefix* queries.', anchor="w")
+        results_text = tk.Text(window, font=("Arial", 11), wrap="word")
+        results_text.tag_configure("meta", foreground="#6a6a8a")
+
+        def show(lines, status_text):
+            results_text.configure(state="normal")
+            results_text.delete("1.0", tk.END)
+            for meta, text in lines:
+                results_text.insert(tk.END, meta + "\n", "meta")
+                results_text.insert(tk.END, text + "\n\n")
+            results_text.configure(state="disabled")
+            status.configure(text=status_text)
+
+        def run_search(event=None):
+            try:
+                since = parse_date(since_entry.get())
+                until = parse_date(until_entry.get(), end=True)
+            except ValueError:
+                status.configure(text="Dates must look like 2026-01-31")
+                return
+            start = time.perf_counter()
+            character = character_var.get()
+            results = index.search(query_entry.get(), character=None if character == "All" else character,
+                                   since=since, until=until)
+            elapsed = (time.perf_counter() - start) * 1000
+            show([(f"{r.when} · {r.character or '?'} · {r.role}", r.snippet) for r in results],
+                 f"{len(results)} results in {elapsed:.1f} ms")
+
+        def index_existing():
+            status.configure(text="Indexing existing histories and logs...")
+            log_dir = os.path.dirname(getattr(self.logger, 'log_file', '')) or ''
+            def work():
+                try:
+                    added = index.index_existing(HISTORY_FILES_DIR, log_dir)
+                    text = f"Indexed {added} new messages ({index.count()} in total)"
+                except Exception as e:
+                    text = f"Indexing failed: {e}"
+                self.ui.post(lambda: status.configure(text=text) if status.winfo_exists() else None)
+            threading.Thread(target=work, daemon=True).start()
+
+        tk.Button(controls, text="Search", command=run_search).grid(row=0, column=6, padx=(5, 0), pady=(0, 5))
+        tk.Button(controls, text="Index existing chats", command=index_existing).grid(row=1, column=6, padx=(5, 0))
+        status.pack(fill="x", padx=10, pady=5)
+        results_text.pack(fill="both", expand=True, padx=10, pady=(0, 10))
+        query_entry.bind("<Return>", run_search)
+        query_entry.focus()
+
+    def _generation_settings(self):
+        """Snapshot of the Tk settings variables, read on the UI thread for the generation worker"""
+        return {
+            "model": self.selected_model.get(),
+            "temperature": self.temperature.get(),
+            "top_p": self.top_p.get(),
+            "prompt_format": self.prompt_format.get(),
+            "prompt_layout": self.prompt_layout.get(),
+            "stream": self.stream_replies.get(),
+        }
+
+    def _finish_processing(self):
+        self._update_queue_status()
+        self.user_input_entry.focus()
+
+    def get_ollama_response(self, settings, request=None):
         with self.message_lock:
             import time
+            from core.vision_manager import attached_images
             start_time = time.time()
+            stream_buffer = None
             try:
                 self.is_processing = True
-                self.send_button.configure(state="disabled", text="Thinking...")
-                model_to_use_current = self.selected_model.get()
-                last_user_message = self.messages[-1]
-                user_input_lower = last_user_message['content'].lower()
-                context_messages = list(self.messages[:-1])
-                # Додаємо long-term memory у системний промпт (обмежуємо до 10 фактів)
-                long_term_memory = load_long_term_memory(self.char_name)
-                if long_term_memory:
-                    memory_text = "\nLong-term memory (facts learned from user):\n" + "\n".join(long_term_memory[-10:])
-                    if context_messages and context_messages[0]['role'] == 'system':
-                        context_messages[0]['content'] += memory_text
-                    else:
-                        context_messages.insert(0, {'role': 'system', 'content': self.system_prompt + memory_text})
-                # Configuration option
-                prompt_format = self.prompt_format.get()
-                if prompt_format == "<|system|>":
-                    if context_messages and context_messages[0]['role'] == 'system':
-                        context_messages[0]['content'] = f"<|system|>\n{context_messages[0]['content']}"
-                elif prompt_format == "### System":
-                    if context_messages and context_messages[0]['role'] == 'system':
-                        context_messages[0]['content'] = f"### System\n{context_messages[0]['content']}"
-                url_pattern = r'(https?://[^\s]+)'
-                import re
-                urls_in_input = re.findall(url_pattern, user_input_lower)
-                if urls_in_input:
-                    for url in urls_in_input[:1]:
-                        self.add_message_to_history(f"System: Reading content from {url} ...", "system")
-                        content = fetch_url_content(url)
-                        context_messages.append({
-                            'role': 'system',
-                            'content': f"System note: The user provided a link. Here is the content from {url}:\n{content}"
-                        })
-                        self.add_message_to_history("System: Page content fetched and added to context.", "system")
-                search_required = False
-                search_query = ""
-                search_keywords = [
-                    "сьогодні", "актуальний час", "останні новини", "що відбувається", 
-                    "хто такий", "що таке", "останній", "погода", "новини", 
-                    "what time is it", "what is the time", "current time"
-                ]
-                for keyword in search_keywords:
-                    if keyword in user_input_lower:
-                        search_required = True
-                        search_query = last_user_message['content']
+                model_to_use_current = settings["model"]
+                metrics = TurnMetrics(model_to_use_current, self.char_name, settings["stream"])
+                # Several user messages may have been coalesced into this turn: look at all of them
+                conversation, snapshot = self.snapshot_messages()
+                pending_user, pending_images = [], []
+                for message in reversed(snapshot):
+                    if message.get('role') != 'user':
                         break
-                if search_required:
+                    pending_user.insert(0, message['content'])
+                    pending_images[:0] = attached_images(message)
+                if not pending_user:
+                    return  # Already answered (e.g. the history was cleared meanwhile)
+                user_text = "\n".join(pending_user)
+                user_input_lower = user_text.lower()
+                enrichment_messages = []
+                # Додаємо у системний промпт найбільш релевантні факти з long-term memory
+                memory_text = ""
+                stage_start = time.perf_counter()
+                relevant_facts = get_relevant_facts(self.char_name, user_text, k=MEMORY_TOP_K)
+                metrics.stage("memory", time.perf_counter() - stage_start)
+                if relevant_facts:
+                    memory_text = "\nLong-term memory (facts learned from user):\n" + "\n".join(relevant_facts)
+                # URL fetches and web search run concurrently within the enrichment budget
+                urls_in_input = find_urls(user_text)
+                for url in urls_in_input:
+                    self.add_message_to_history(f"System: Reading content from {url} ...", "system")
+                search_query = None
+                if needs_web_search(user_input_lower):
                     # Check if web search is configured
                     api_key = getattr(self, 'google_api_key', '') or GOOGLE_API_KEY
                     cse_id = getattr(self, 'google_cse_id', '') or GOOGLE_CSE_ID
                     
                     if api_key and cse_id:
+                        search_query = user_text
                         self.add_message_to_history("System: Performing a web search...", "system")
-                        web_results = google_search(search_query, api_key, cse_id)
-                        if web_results:
-                            context_messages.append({
-                                'role': 'system',
-                                'content': "System note: To answer the user's question, I have performed a web search. Here are the results:\n" + "\n".join(web_results[:3])
-                            })
-                            self.add_message_to_history("System: Web search completed. Results provided to AI.", "system")
-                        else:
-                            self.add_message_to_history("System: Web search yielded no relevant results.", "system")
                     else:
                         self.add_message_to_history("System: Web search requested but not configured. Configure in 'Web Search' settings.", "system")
-                updated_system_prompt = self.system_prompt + "\n" + get_datetime_str()
-                if context_messages and context_messages[0]['role'] == 'system':
-                    context_messages[0]['content'] = updated_system_prompt
-                else:
-                    context_messages.insert(0, {'role': 'system', 'content': updated_system_prompt})
-                messages_for_ollama = context_messages + [last_user_message]
-                import ollama
+                if urls_in_input or search_query:
+                    stage_start = time.perf_counter()
+                    cache_before = get_web_cache().counters()
+                    results, pending = run_enrichment(urls_in_input, search_query, api_key if search_query else '', cse_id if search_query else '')
+                    metrics.stage("enrichment", time.perf_counter() - stage_start)
+                    metrics.web_cache(cache_before, get_web_cache().counters())
+                    for result in results:
+                        if result.kind == "search":
+                            if result.ok:
+                                enrichment_messages.append(result.to_message())
+                                self.add_message_to_history("System: Web search completed. Results provided to AI.", "system")
+                            else:
+                                self.add_message_to_history("System: Web search yielded no relevant results.", "system")
+                            continue
+                        # Failed fetches are still passed on so the model can tell the user
+                        enrichment_messages.append(result.to_message())
+                        if result.ok:
+                            self.add_message_to_history(f"System: Page content fetched and added to context ({result.seconds:.1f}s).", "system")
+                        else:
+                            self.add_message_to_history(f"System: Could not read {result.source}.", "system")
+                    if pending:
+                        self.add_message_to_history(f"System: Skipped slow sources after {ENRICHMENT_BUDGET:.0f}s: {', '.join(pending)}", "system")
+                supports_vision = bool(self.model_metadata and self.model_metadata.supports_vision())
+                history = self.vision_manager.messages_for_turn(snapshot, model_to_use_current, vision=supports_vision)
+                stage_start = time.perf_counter()
+                context = build_turn_messages(
+                    self.context_builder, history, self.system_prompt,
+                    prompt_format=settings["prompt_format"], layout=settings["prompt_layout"],
+                    memory_text=memory_text, datetime_text=get_datetime_str(),
+                    summary_message=self.summarizer.get_summary_message(),
+                    enrichment_messages=enrichment_messages)
+                metrics.stage("context", time.perf_counter() - stage_start)
+                if context.dropped:
+                    print(f"[INFO] Context budget: dropped {len(context.dropped)} oldest messages (~{context.tokens} tokens sent)")
+                    self.summarizer.observe(context.dropped, model_to_use_current)
+                messages_for_ollama = context.messages
+                ollama_service = get_ollama_service()
+                if request is not None and request.cancelled:
+                    self.add_message_to_history("System: Generation stopped.", "system")
+                    return
                 
                 # Log generation attempt
-                print(f"[INFO] Starting generation - Model: {model_to_use_current}, Temp: {self.temperature.get()}, Top-P: {self.top_p.get()}")
+                print(f"[INFO] Starting generation - Model: {model_to_use_current}, Temp: {settings['temperature']}, Top-P: {settings['top_p']}")
                 generation_start = time.time()
+                metrics.generation_started()
                 
-                response = ollama.chat(model=model_to_use_current, messages=messages_for_ollama, options={
-                    "temperature": self.temperature.get(),
-                    "top_p": self.top_p.get()
-                })
+                options = {
+                    "temperature": settings["temperature"],
+                    "top_p": settings["top_p"]
+                }
+                if settings["stream"]:
+                    stream_buffer = StreamBuffer()
+                    self.ui.post(self._start_stream_view, stream_buffer)
+                    response = self._stream_chat(model_to_use_current, messages_for_ollama, options, stream_buffer, request, metrics)
+                    assistant_response = stream_buffer.get_text()
+                else:
+                    response = ollama_service.chat(model_to_use_current, messages_for_ollama, options=options)
+                    assistant_response = response['message']['content']
                 generation_time = time.time() - generation_start
-                print(f"[INFO] Generation completed in {generation_time:.2f} seconds")
+                metrics.finish(response, cancelled=request is not None and request.cancelled)
+                self._record_turn_metrics(metrics)
+                print(f"[INFO] Generation completed in {generation_time:.2f} seconds ({metrics.describe() or 'no timing data'})")
                 
-                assistant_response = response['message']['content']
+                if request is not None and request.cancelled:
+                    # Keep whatever was already streamed; a non-streamed reply cannot be aborted and is discarded
+                    partial = assistant_response.strip() if stream_buffer is not None else ""
+                    if partial:
+                        self.store_message(conversation, {'role': 'assistant', 'content': partial}, len(snapshot))
+                    self.add_message_to_history("System: Generation stopped.", "system")
+                    return
                 
                 # Enhanced empty response handling
                 if not assistant_response or assistant_response.strip() == "":
-                    print(f"[WARNING] AI generated empty response - Model: {model_to_use_current}, Temp: {self.temperature.get()}, Top-P: {self.top_p.get()}")
+                    print(f"[WARNING] AI generated empty response - Model: {model_to_use_current}, Temp: {settings['temperature']}, Top-P: {settings['top_p']}")
                     print(f"[DEBUG] Raw response: {response}")
                     
                     # Try fallback with safer parameters
                     print("[INFO] Retrying with safer parameters...")
                     try:
-                        fallback_response = ollama.chat(model=model_to_use_current, messages=messages_for_ollama, options={
+                        fallback_response = ollama_service.chat(model_to_use_current, messages_for_ollama, options={
                             "temperature": 0.7,
                             "top_p": 0.9
                         })
@@ -856,15 +1174,23 @@ GOOGLE_CSE_ID = '{self.google_cse_id}'
                         print(f"[ERROR] Fallback retry failed: {fallback_error}")
                         assistant_response = f"❌ Critical error: Both primary and fallback generation failed. Model: {model_to_use_current}. Please check Ollama status."
                 
-                self.messages.append({'role': 'assistant', 'content': assistant_response})
-                self.add_message_to_history(assistant_response, "assistant")
+                stored = self.store_message(conversation, {'role': 'assistant', 'content': assistant_response}, len(snapshot))
+                if stream_buffer is not None:
+                    # Fallback text replaces an empty stream in the already open reply block
+                    if not stream_buffer.get_text().strip():
+                        stream_buffer.push(assistant_response)
+                elif stored:
+                    self.add_message_to_history(assistant_response, "assistant")
                 
                 # Log assistant response
                 if hasattr(self, 'logger') and self.logger:
                     try:
-                        self.logger.log(get_timestamp(), "assistant", assistant_response)
+                        self.logger.log("assistant", assistant_response, model=model_to_use_current,
+                                        character=self.char_name, latency=generation_time)
                     except Exception as e:
                         print(f"[WARNING] Failed to log assistant response: {e}")
+                if pending_images and supports_vision and self.vision_manager.mode == "pixels":
+                    self._caption_in_background(pending_images, model_to_use_current)
                 
                 end_time = time.time()
                 print(f"[LOG] Generation time: {end_time - start_time:.2f} seconds")
@@ -872,9 +1198,12 @@ GOOGLE_CSE_ID = '{self.google_cse_id}'
                 error_message = f"Ollama Error: {e}. Please check if the model name is correct and if the Ollama server is running."
                 self.add_message_to_history(error_message, "system")
             finally:
+                if stream_buffer is not None:
+                    stream_buffer.finish()
+                # Appends only the new messages of this turn (the session file is append-only JSONL)
+                self.save_current_chat_history()
                 self.is_processing = False
-                self.send_button.configure(state="normal", text="Send")
-                self.user_input_entry.focus()
+                self.ui.post(self._finish_processing, key="input_state")
 
 # Entry point to start the GUI
 if __name__ == "__main__":
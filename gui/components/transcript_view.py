@@ -0,0 +1,226 @@
+import customtkinter as ctk
+
+WINDOW_ROWS = 200  # Messages kept in the text widget; older ones are removed and re-inserted on scroll-up
+PAGE_ROWS = 50  # Messages inserted per lazy load when scrolling past the top or bottom of the window
+IMPORT_CHUNK_ROWS = 25  # Messages rendered per after() tick when a history is loaded
+IMPORT_ROWS = 100  # Messages rendered right away for a loaded history; the rest load on scroll-up
+
+class TranscriptView(ctk.CTkTextbox):
+    """Chat transcript that keeps only a window of messages in the Tk text widget.
+
+    Every message is kept as a [text, tag, lines] row in Python; only rows[first:last] are inserted
+    into the widget. Scrolling to the top inserts the previous page (and drops rows at the
+    bottom), scrolling back down does the reverse. Loaded histories are formatted lazily:
+    only the newest rows are rendered, in small after() chunks, the rest on scroll-up.
+    """
+    def __init__(self, master, window_rows=WINDOW_ROWS, page_rows=PAGE_ROWS, **kwargs):
+        kwargs.setdefault("wrap", "word")
+        kwargs.setdefault("font", ("Arial", 14))
+        super().__init__(master, state="disabled", **kwargs)
+        self.tag_config("user_tag", foreground="#FAF7F3", lmargin1=20, lmargin2=20, rmargin=100)
+        self.tag_config("assistant_tag", foreground="#D9A299", lmargin1=100, lmargin2=100, rmargin=20)
+        self.tag_config("system_tag", foreground="#722323")
+        self.window_rows = window_rows
+        self.page_rows = page_rows
+        self._reset_rows()
+        self.import_job = None
+        self.edge_check_pending = False
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>", "<KeyRelease>", "<ButtonRelease-1>"):
+            self._textbox.bind(sequence, self._on_scroll, add="+")
+        self._y_scrollbar.bind("<B1-Motion>", self._on_scroll, add="+")
+        self._y_scrollbar.bind("<ButtonRelease-1>", self._on_scroll, add="+")
+
+    def _reset_rows(self):
+        self.rows = []  # [text, tag, line count] per message, oldest first; every text ends with "\n"
+        self.first = 0  # rows[first:last] are currently in the widget
+        self.last = 0
+        self.older = []  # History messages not formatted into rows yet (oldest first)
+        self.formatter = None
+        self.stream_index = None  # Row receiving stream() chunks
+
+    # --- Public API -----------------------------------------------------------------------
+
+    def clear(self):
+        self._cancel_import()
+        self._reset_rows()
+        self._edit(lambda: self._textbox.delete("1.0", "end"))
+
+    def append(self, text, tag):
+        """Add a message at the bottom and scroll to it"""
+        if not text.endswith("\n"):
+            text += "\n"
+        self.rows.append([text, tag, text.count("\n")])
+        if self.last != len(self.rows) - 1:
+            self._render_tail()  # The user was reading older messages: jump back to the latest ones
+        else:
+            self._edit(lambda: self._textbox.insert("end", text, tag))
+            self.last += 1
+            self._trim_top()
+        self._textbox.see("end")
+
+    def set_history(self, messages, formatter):
+        """Show a loaded history: formatter(message) -> (text, tag), applied only to rows that get displayed"""
+        self.clear()
+        self.older = list(messages)
+        self.formatter = formatter
+        self._import_step(min(IMPORT_ROWS, self.window_rows))
+
+    def begin_stream(self, header, tag):
+        """Start a message whose text arrives in chunks through stream()"""
+        self.append(header, tag)
+        self.stream_index = len(self.rows) - 1
+        self._set_stream_mark()
+
+    def stream(self, text):
+        if self.stream_index is None or not text:
+            return
+        row = self.rows[self.stream_index]
+        row[0] = row[0][:-1] + text + "\n"
+        row[2] += text.count("\n")
+        if self._stream_rendered():
+            self._edit(lambda: self._textbox.insert("stream_insert", text, row[1]))
+            if self.last == len(self.rows):
+                self._textbox.see("end")
+
+    def end_stream(self):
+        if self.stream_index is not None:
+            self.stream_index = None
+            self._textbox.mark_unset("stream_insert")
+
+    # --- Rendering ------------------------------------------------------------------------
+
+    def _edit(self, func):
+        self._textbox.configure(state="normal")
+        try:
+            func()
+        finally:
+            self._textbox.configure(state="disabled")
+
+    def _insert_rows(self, index, start, end):
+        """Insert rows[start:end] at a text index with a single Tk call"""
+        args = []
+        for text, tag, _ in self.rows[start:end]:
+            args.extend((text, tag))
+        if args:
+            self._edit(lambda: self._textbox.insert(index, *args))
+
+    def _lines(self, start, end):
+        return sum(row[2] for row in self.rows[start:end])
+
+    def _stream_rendered(self):
+        return self.stream_index is not None and self.first <= self.stream_index < self.last
+
+    def _set_stream_mark(self):
+        if not self._stream_rendered():
+            return
+        # Chunks go just before the row's trailing newline so messages added meanwhile stay below it
+        next_line = self._lines(self.first, self.stream_index + 1) + 1
+        self._textbox.mark_set("stream_insert", f"{next_line}.0-1c")
+        self._textbox.mark_gravity("stream_insert", "right")
+
+    def _top_line(self):
+        return int(self._textbox.index("@0,0").split(".")[0])
+
+    def _render_tail(self):
+        self.first = max(0, len(self.rows) - self.window_rows)
+        self.last = len(self.rows)
+        self._edit(lambda: self._textbox.delete("1.0", "end"))
+        self._insert_rows("end", self.first, self.last)
+        self._set_stream_mark()
+
+    def _trim_top(self, keep_view=False):
+        excess = (self.last - self.first) - self.window_rows
+        if excess < self.page_rows:
+            return  # Trim in page-sized steps, not on every message
+        lines = self._lines(self.first, self.first + excess)
+        top = self._top_line()
+        self._edit(lambda: self._textbox.delete("1.0", f"{lines + 1}.0"))
+        self.first += excess
+        if keep_view:
+            self._textbox.yview(f"{max(1, top - lines)}.0")
+
+    def _trim_bottom(self):
+        excess = (self.last - self.first) - self.window_rows
+        if excess < self.page_rows:
+            return
+        start_line = self._lines(self.first, self.last - excess) + 1
+        self._edit(lambda: self._textbox.delete(f"{start_line}.0", "end-1c"))
+        self.last -= excess
+
+    def _materialize_older(self, count):
+        """Format up to `count` of the newest not-yet-formatted history messages into rows"""
+        if not self.older or count <= 0:
+            return 0
+        batch = self.older[-count:]
+        del self.older[-count:]
+        new_rows = []
+        for message in batch:
+            text, tag = self.formatter(message)
+            if not text.endswith("\n"):
+                text += "\n"
+            new_rows.append([text, tag, text.count("\n")])
+        self.rows[0:0] = new_rows
+        self.first += len(new_rows)
+        self.last += len(new_rows)
+        if self.stream_index is not None:
+            self.stream_index += len(new_rows)
+        return len(new_rows)
+
+    def _load_older(self):
+        if self.first == 0:
+            self._materialize_older(self.page_rows)
+        if self.first == 0:
+            return False
+        start = max(0, self.first - self.page_rows)
+        lines = self._lines(start, self.first)
+        top = self._top_line()
+        self._insert_rows("1.0", start, self.first)
+        self.first = start
+        self._textbox.yview(f"{top + lines}.0")  # Keep showing what the user was looking at
+        self._trim_bottom()
+        self._set_stream_mark()
+        return True
+
+    def _load_newer(self):
+        if self.last >= len(self.rows):
+            return False
+        end = min(len(self.rows), self.last + self.page_rows)
+        self._insert_rows("end", self.last, end)
+        self.last = end
+        self._trim_top(keep_view=True)
+        self._set_stream_mark()
+        return True
+
+    def _import_step(self, remaining):
+        """Render the newest history rows a chunk per tick so a big import never blocks the UI"""
+        self.import_job = None
+        if self.first != 0:
+            return  # The window moved away from the top meanwhile; the rest loads on scroll-up
+        loaded = self._materialize_older(min(IMPORT_CHUNK_ROWS, remaining))
+        if not loaded:
+            return
+        self._insert_rows("1.0", self.first - loaded, self.first)
+        self.first -= loaded
+        self._textbox.see("end")
+        if remaining - loaded > 0 and self.older:
+            self.import_job = self.after(1, lambda: self._import_step(remaining - loaded))
+
+    def _cancel_import(self):
+        if self.import_job is not None:
+            self.after_cancel(self.import_job)
+            self.import_job = None
+
+    # --- Scrolling ------------------------------------------------------------------------
+
+    def _on_scroll(self, event=None):
+        if not self.edge_check_pending:
+            self.edge_check_pending = True
+            self.after_idle(self._check_edges)
+
+    def _check_edges(self):
+        self.edge_check_pending = False
+        top, bottom = self._textbox.yview()
+        if top <= 0.0:
+            self._load_older()
+        elif bottom >= 1.0:
+            self._load_newer()
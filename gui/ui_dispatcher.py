@@ -0,0 +1,80 @@
+# ui_dispatcher.py
+# Tk is not thread-safe: worker threads post UI operations here and the Tk main loop runs them
+# in batches every poll interval. Posts with the same key replace each other while pending,
+# so e.g. a burst of status updates results in a single widget update.
+import time
+import threading
+from collections import deque
+from core.config import UI_POLL_MS
+
+MAX_BATCH_MS = 12  # Time budget per drain; the rest waits for the next tick so the UI stays responsive
+
+class UIDispatcher:
+    def __init__(self, root, poll_ms=UI_POLL_MS):
+        self.root = root
+        self.poll_ms = poll_ms
+        self.ui_thread = threading.get_ident()
+        self.lock = threading.Lock()
+        self.queue = deque()  # [key, func, args, kwargs]
+        self.pending = {}  # key -> queued entry, for coalescing
+        self.job = None
+        self.stats = {"posted": 0, "coalesced": 0, "executed": 0, "errors": 0, "max_batch": 0}
+
+    def start(self):
+        if self.job is None:
+            self.job = self.root.after(self.poll_ms, self._drain)
+
+    def stop(self):
+        if self.job is not None:
+            try:
+                self.root.after_cancel(self.job)
+            except Exception:
+                pass
+            self.job = None
+
+    def on_ui_thread(self):
+        return threading.get_ident() == self.ui_thread
+
+    def post(self, func, *args, key=None, **kwargs):
+        """Queue func(*args, **kwargs) for the Tk thread; a pending post with the same key is replaced"""
+        with self.lock:
+            self.stats["posted"] += 1
+            if key is not None:
+                entry = self.pending.get(key)
+                if entry is not None:
+                    entry[1:] = [func, args, kwargs]  # Keeps its place in the queue
+                    self.stats["coalesced"] += 1
+                    return
+                entry = [key, func, args, kwargs]
+                self.pending[key] = entry
+            else:
+                entry = [None, func, args, kwargs]
+            self.queue.append(entry)
+
+    def _drain(self):
+        self.job = None
+        deadline = time.perf_counter() + MAX_BATCH_MS / 1000.0
+        executed = 0
+        while True:
+            with self.lock:
+                if not self.queue:
+                    break
+                key, func, args, kwargs = self.queue.popleft()
+                if key is not None:
+                    self.pending.pop(key, None)
+            try:
+                func(*args, **kwargs)
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"[ERROR] UI update {getattr(func, '__name__', func)} failed: {e}")
+            executed += 1
+            if time.perf_counter() >= deadline:
+                break
+        self.stats["executed"] += executed
+        self.stats["max_batch"] = max(self.stats["max_batch"], executed)
+        with self.lock:
+            backlog = bool(self.queue)
+        try:
+            self.job = self.root.after(1 if backlog else self.poll_ms, self._drain)
+        except Exception:
+            pass  # Window destroyed
@@ -0,0 +1,27 @@
+import threading
+
+from core.generation_queue import PRIORITY_PROACTIVE, PRIORITY_USER, GenerationScheduler
+
+
+def test_dropped_and_cancelled_requests_notify_their_owner():
+    scheduler = GenerationScheduler(max_pending=1)
+    running, release = threading.Event(), threading.Event()
+    dropped = []
+
+    def block(request):
+        running.set()
+        release.wait(5)
+
+    try:
+        scheduler.submit("user", block)
+        assert running.wait(5)
+        scheduler.submit("reminder", lambda request: None, PRIORITY_PROACTIVE,
+                         on_dropped=lambda request: dropped.append(request.kind))
+        # A full queue makes room for user input by dropping the proactive request
+        scheduler.submit("user", lambda request: None, PRIORITY_USER, on_dropped=lambda request: dropped.append("user"))
+        assert dropped == ["reminder"]
+        assert scheduler.cancel_pending() == 1
+        assert dropped == ["reminder", "user"]
+    finally:
+        release.set()
+        scheduler.shutdown()
@@ -0,0 +1,35 @@
+from core.history_store import HistoryStore
+
+
+def test_new_messages_are_appended(tmp_path):
+    path = tmp_path / "session.jsonl"
+    store = HistoryStore(str(path))
+    records = [{'role': 'user', 'content': 'hi'}, {'role': 'assistant', 'content': 'hello'}]
+    store.sync(records)
+    records.append({'role': 'user', 'content': 'how are you?'})
+    store.sync(records)
+    assert len(path.read_text(encoding='utf-8').splitlines()) == 3
+    assert HistoryStore(str(path)).load() == records
+
+
+def test_edit_inside_saved_prefix_is_persisted_after_mark_dirty(tmp_path):
+    path = tmp_path / "session.jsonl"
+    store = HistoryStore(str(path))
+    records = [{'role': 'user', 'content': 'hi'}, {'role': 'assistant', 'content': 'hello'},
+               {'role': 'user', 'content': 'bye'}]
+    store.sync(records)
+    records[0] = {'role': 'user', 'content': 'hi, edited'}
+    store.mark_dirty()
+    store.sync(records)
+    assert HistoryStore(str(path)).load() == records
+
+
+def test_replaced_last_record_is_rewritten(tmp_path):
+    path = tmp_path / "session.jsonl"
+    store = HistoryStore(str(path))
+    store.sync([{'role': 'user', 'content': 'hi'}, {'role': 'assistant', 'content': 'hello'}])
+    # A fresh store instance compares against the last record on disk
+    records = [{'role': 'user', 'content': 'hi'}, {'role': 'assistant', 'content': 'welcome'},
+               {'role': 'user', 'content': 'thanks'}]
+    HistoryStore(str(path)).sync(records)
+    assert HistoryStore(str(path)).load() == records
@@ -0,0 +1,23 @@
+import pytest
+
+from core.html_extract import extract_text_from_chunks
+
+PAGE = ('<html><head><style>p { color: red }</style></head><body><p>Before</p>'
+        '<!-- <script> in a comment --><p>Middle text</p>'
+        '<SCRIPT type="text/javascript">var s = "</p><p>not text";</SCRIPT><p>After</p></body></html>')
+
+
+def _extract(html, chunk_size, max_chars=3000):
+    data = html.encode("utf-8")
+    chunks = (data[i:i + chunk_size] for i in range(0, len(data), chunk_size))
+    return extract_text_from_chunks(chunks, max_chars, "text/html; charset=utf-8")
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 7, 64, 16384])
+def test_script_style_and_comments_split_across_chunks(chunk_size):
+    assert _extract(PAGE, chunk_size) == "Before\nMiddle text\nAfter"
+
+
+def test_unterminated_script_is_dropped():
+    html = "<p>Intro text</p><script>" + "var x = 1;\n" * 20000
+    assert _extract(html, 16384) == "Intro text"
@@ -0,0 +1,100 @@
+import threading
+import time
+from datetime import datetime, timedelta
+
+from core.reminders import ReminderStore, parse_reminder
+
+NOW = datetime(2026, 3, 10, 14, 0, 0)
+
+
+def test_relative_reminder():
+    due, text = parse_reminder("Remind me in 20 minutes to check the oven", now=NOW)
+    assert due == NOW + timedelta(minutes=20)
+    assert text == "check the oven"
+
+
+def test_absolute_reminder_later_today_and_tomorrow():
+    due, text = parse_reminder("remind me at 18:30 to call mom", now=NOW)
+    assert due == datetime(2026, 3, 10, 18, 30)
+    assert text == "call mom"
+    due, _ = parse_reminder("remind me at 7:30 to run", now=NOW)
+    assert due == datetime(2026, 3, 11, 7, 30)
+    due, _ = parse_reminder("remind me tomorrow at 9am about the meeting", now=NOW)
+    assert due == datetime(2026, 3, 11, 9, 0)
+
+
+def test_ukrainian_reminder():
+    due, text = parse_reminder("Нагадай мені через 2 години про зустріч", now=NOW)
+    assert due == NOW + timedelta(hours=2)
+    assert text == "зустріч"
+
+
+def test_attached_trigger_needs_time_right_after_it():
+    due, _ = parse_reminder("text me in 10 minutes", now=NOW)
+    assert due == NOW + timedelta(minutes=10)
+    due, _ = parse_reminder("Напиши мені о 18:30", now=NOW)
+    assert due == datetime(2026, 3, 10, 18, 30)
+
+
+def test_ordinary_requests_are_not_reminders():
+    assert parse_reminder("Write me a poem about a man who wakes at 7:30", now=NOW) is None
+    assert parse_reminder("Message me a summary of what happened in 2 hours of the film", now=NOW) is None
+    assert parse_reminder("Напиши мені вірш про ранок о 7:30", now=NOW) is None
+    assert parse_reminder("I woke up at 7:30 today", now=NOW) is None
+
+
+def test_bare_hour_is_ambiguous():
+    assert parse_reminder("remind me at 5 to stretch", now=NOW) is None
+
+
+def test_claimed_reminder_survives_until_completed(tmp_path):
+    path = str(tmp_path / "reminders.json")
+    store = ReminderStore(path)
+    store.add(NOW, "stretch")
+    entry, = store.claim_due(NOW.timestamp())
+    assert store.claim_due(NOW.timestamp()) == []
+    assert len(ReminderStore(path)) == 1  # Still on disk while in flight
+    store.release(entry, NOW.timestamp() + 30)
+    assert store.next_due() == NOW.timestamp() + 30
+    entry, = store.claim_due(NOW.timestamp() + 30)
+    store.complete(entry)
+    assert len(store) == 0
+    assert len(ReminderStore(path)) == 0
+
+
+class FakeApp:
+    def __init__(self):
+        self.message_lock = threading.Lock()
+        self.messages = []
+
+    def snapshot_messages(self):
+        return self.messages, list(self.messages)
+
+    def store_message(self, conversation, message):
+        conversation.append(message)
+        return True
+
+    def add_message_to_history(self, message, role):
+        pass
+
+
+def test_reminder_fires_with_idle_messages_off(tmp_path, monkeypatch):
+    from core import proactive_manager
+    monkeypatch.setattr(proactive_manager, "NOTIFICATIONS_AVAILABLE", False)
+    app = FakeApp()
+    store = ReminderStore(str(tmp_path / "reminders.json"))
+    manager = proactive_manager.ProactiveManager(app, reminders=store)
+    monkeypatch.setattr(manager, "_stream_reply", lambda system_text, history, request: "Time to stretch!")
+    manager.start(idle=False)
+    try:
+        store.add(datetime.now().timestamp() + 0.1, "stretch")
+        with manager.cond:
+            manager.cond.notify_all()
+        deadline = time.monotonic() + 5
+        while not app.messages and time.monotonic() < deadline:
+            time.sleep(0.02)
+    finally:
+        manager.stop()
+    assert app.messages == [{'role': 'assistant', 'content': 'Time to stretch!'}]
+    assert len(store) == 0
+    assert manager.stats["idle_attempts"] == 0
@@ -0,0 +1,56 @@
+from core.search_index import SearchIndex, parse_date, to_fts_query
+
+
+def test_query_syntax():
+    assert to_fts_query('green tea') == '"green" "tea"'
+    assert to_fts_query('"green tea" conf*') == '"green tea" "conf"*'
+    assert to_fts_query("don't") == '"don t"'
+    assert to_fts_query('*** ""') == ''
+
+
+def test_incremental_history_is_not_indexed_twice(tmp_path):
+    index = SearchIndex(str(tmp_path / "search.sqlite3"))
+    history = [{'role': 'user', 'content': 'hi'}, {'role': 'assistant', 'content': 'hello there'}]
+    assert index.add_history("last_session.jsonl", "Bob", history, ts=1000.0) == 2
+    assert index.add_history("last_session.jsonl", "Bob", history, ts=2000.0) == 0
+    history.append({'role': 'user', 'content': 'hi'})
+    assert index.add_history("last_session.jsonl", "Bob", history, ts=3000.0) == 1
+
+
+def test_repeated_message_after_clear_is_indexed(tmp_path):
+    index = SearchIndex(str(tmp_path / "search.sqlite3"))
+    old_session = [{'role': 'user', 'content': 'hi'}, {'role': 'assistant', 'content': 'hello'},
+                   {'role': 'user', 'content': 'bye'}]
+    index.add_history("last_session.jsonl", "Bob", old_session, ts=parse_date("2026-01-05"))
+    # The history was cleared and the new session starts with the same greeting
+    new_session = [{'role': 'user', 'content': 'hi'}, {'role': 'assistant', 'content': 'welcome back'}]
+    assert index.add_history("last_session.jsonl", "Bob", new_session, ts=parse_date("2026-02-10")) == 2
+    results = index.search("hi", since=parse_date("2026-02-10"))
+    assert [result.text for result in results] == ["hi"]
+
+
+def test_character_switch_does_not_reindex_shared_history(tmp_path):
+    index = SearchIndex(str(tmp_path / "search.sqlite3"))
+    history = [{'role': 'user', 'content': 'hi'}, {'role': 'assistant', 'content': 'hello there'}]
+    assert index.add_history("last_session.jsonl", "Lumin", history) == 2
+    history.append({'role': 'user', 'content': 'are you Ahri now?'})
+    assert index.add_history("last_session.jsonl", "Ahri", history) == 1
+    assert index.count() == 3
+    assert [result.text for result in index.search("hello", character="Ahri")] == []
+    assert [result.text for result in index.search("Ahri", character="Ahri")] == ["are you Ahri now?"]
+
+
+def test_restarted_history_with_same_opening_is_indexed(tmp_path):
+    index = SearchIndex(str(tmp_path / "search.sqlite3"))
+    index.add_history("last_session.jsonl", "Bob", [{'role': 'user', 'content': 'hi'}])
+    index.restart_history("last_session.jsonl")
+    new_session = [{'role': 'user', 'content': 'hi'}, {'role': 'assistant', 'content': 'hello again'}]
+    assert index.add_history("last_session.jsonl", "Bob", new_session) == 2
+
+
+def test_index_existing_includes_last_session(tmp_path):
+    from core.history_store import HistoryStore
+    HistoryStore(str(tmp_path / "last_session.jsonl")).sync([{'role': 'user', 'content': 'backfilled message'}])
+    index = SearchIndex(str(tmp_path / "search.sqlite3"))
+    assert index.index_existing(history_dir=str(tmp_path), log_dir=str(tmp_path)) == 1
+    assert [result.text for result in index.search("backfilled")] == ["backfilled message"]
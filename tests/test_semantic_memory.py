@@ -0,0 +1,101 @@
+import threading
+import zlib
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from core import memory
+from core.memory import fact_key, get_memory_index, get_relevant_facts
+from core.semantic_memory import SemanticMemory
+
+DIM = 64
+
+
+class FakeEmbedder:
+    """Deterministic bag-of-words embedding: every word adds 1 to a crc32-chosen dimension"""
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        vectors = []
+        for text in texts:
+            vector = [0.0] * DIM
+            for word in memory.tokenize(text):
+                vector[zlib.crc32(word.encode("utf-8")) % DIM] += 1.0
+            vectors.append(vector)
+        return vectors
+
+
+@pytest.fixture(autouse=True)
+def isolated_memory(tmp_path, monkeypatch):
+    # Memory files are created under ./chat_histories
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(memory, "_indexes", {})
+
+
+def test_facts_are_embedded_once_and_reloaded(tmp_path):
+    embedder = FakeEmbedder()
+    semantic = SemanticMemory(str(tmp_path / "facts"), embedder=embedder, model="fake")
+    facts = ["user likes green tea", "user has a dog named Rex", "user works as a nurse"]
+    semantic.enqueue([(fact_key(fact), fact) for fact in facts])
+    semantic.wait(5)
+    assert sum(len(batch) for batch in embedder.calls) == 3
+
+    reloaded_embedder = FakeEmbedder()
+    reloaded = SemanticMemory(str(tmp_path / "facts"), embedder=reloaded_embedder, model="fake")
+    reloaded.enqueue([(fact_key(fact), fact) for fact in facts])
+    reloaded.wait(5)
+    assert reloaded_embedder.calls == []
+    assert reloaded.search("what does the dog Rex eat", k=1)[0][0] == fact_key("user has a dog named Rex")
+
+
+def test_failed_batch_is_retried(tmp_path):
+    embedder = FakeEmbedder()
+    failures = []
+
+    def flaky(texts):
+        if not failures:
+            failures.append(texts)
+            raise ConnectionError("ollama is restarting")
+        return embedder(texts)
+
+    semantic = SemanticMemory(str(tmp_path / "facts"), embedder=flaky, model="fake", retry_delay=0.01)
+    semantic.enqueue([(fact_key("user likes jazz"), "user likes jazz")])
+    semantic.wait(5)
+    assert failures
+    assert semantic.missing([fact_key("user likes jazz")]) == set()
+
+
+def test_enqueue_after_worker_finished_starts_a_new_one(tmp_path):
+    semantic = SemanticMemory(str(tmp_path / "facts"), embedder=FakeEmbedder(), model="fake")
+    semantic.enqueue([(fact_key("first fact"), "first fact")])
+    semantic.wait(5)
+    semantic.enqueue([(fact_key("second fact"), "second fact")])
+    semantic.wait(5)
+    assert semantic.missing([fact_key("first fact"), fact_key("second fact")]) == set()
+
+
+def test_partial_vector_cache_is_merged_with_bm25():
+    index = get_memory_index("tester")
+    for fact in ("user likes green tea", "user has a dog named Rex"):
+        index.add(fact)
+    embedder = FakeEmbedder()
+    release = threading.Event()
+
+    def slow_for_new_facts(texts):
+        if any("weekends" in text for text in texts):
+            release.wait(5)
+        return embedder(texts)
+
+    index.enable_semantic(embedder=slow_for_new_facts).wait(5)
+    index.add("user plays the violin on weekends")  # Embedding blocks until released
+    try:
+        facts = get_relevant_facts("tester", "violin lessons", k=3, mode="semantic")
+        assert "user plays the violin on weekends" in facts
+    finally:
+        release.set()
+        index.semantic.wait(5)
+    assert index.unembedded() == set()
+    assert get_relevant_facts("tester", "violin lessons", k=1, mode="semantic") == ["user plays the violin on weekends"]